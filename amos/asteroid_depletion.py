@@ -0,0 +1,110 @@
+import logging
+import threading
+import time
+from datetime import datetime, UTC
+from typing import Dict, Optional, Tuple
+import numpy as np
+from bson.int64 import Int64
+from pymongo import ReturnDocument
+from config import MongoDBConfig
+from utils.metrics import record_cache
+from amos.element_vector import ElementIndex, ElementVector
+
+ASTEROID_CACHE_TTL_SECONDS = 300
+MAX_DEPLETION_ATTEMPTS = 3
+
+db = MongoDBConfig.get_database()
+_cache: Dict[str, Tuple[float, dict]] = {}
+_cache_lock = threading.Lock()
+
+def _store(asteroid: dict):
+    with _cache_lock:
+        _cache[asteroid["full_name"]] = (time.monotonic(), asteroid)
+
+def invalidate_asteroid(full_name: str):
+    with _cache_lock:
+        _cache.pop(full_name, None)
+
+def get_asteroid(full_name: str) -> Optional[dict]:
+    """
+    Asteroid document from the in-process cache. Entries are refreshed from every depletion
+    write, so a simulating worker only re-reads the asteroid after the TTL expires.
+    """
+    with _cache_lock:
+        cached = _cache.get(full_name)
+    hit = bool(cached) and time.monotonic() - cached[0] < ASTEROID_CACHE_TTL_SECONDS
+    record_cache("asteroid", hit)
+    if hit:
+        return cached[1]
+    asteroid = db.asteroids.find_one({"full_name": full_name})
+    if asteroid:
+        _store(asteroid)
+    return asteroid
+
+def remaining_mass(asteroid: dict, index: ElementIndex) -> ElementVector:
+    return index.vector({e["name"]: e.get("mass_kg", 0) for e in asteroid.get("elements", [])})
+
+def reserve_cached_mass(full_name: str, requested: ElementVector) -> ElementVector:
+    """
+    Take up to `requested` kg out of the cached composition only and return what was available.
+    The database is written once per mission by deplete_asteroid after the mission write wins;
+    until then later days and other missions in this process see the reduced cache entry.
+    """
+    taken = ElementVector(requested.index)
+    asteroid = get_asteroid(full_name)
+    if not asteroid:
+        return taken
+    with _cache_lock:
+        available = np.maximum(remaining_mass(asteroid, requested.index).mass, 0)
+        taken.mass = np.minimum(np.maximum(requested.mass, 0), available)
+        left = available - taken.mass
+        for elem in asteroid.get("elements", []):
+            number = requested.index.numbers.get(elem["name"])
+            if number is not None:
+                elem["mass_kg"] = Int64(int(left[number]))
+    return taken
+
+def _element_update(amounts: np.ndarray) -> Tuple[dict, list]:
+    numbers = np.flatnonzero(amounts)
+    inc = {f"elements.$[e{n}].mass_kg": Int64(-int(amounts[n])) for n in numbers}
+    filters = [{f"e{n}.number": int(n), f"e{n}.mass_kg": {"$gte": int(amounts[n])}} for n in numbers]
+    return inc, filters
+
+def deplete_asteroid(full_name: str, requested: ElementVector) -> ElementVector:
+    """
+    Remove `requested` kg from the asteroid's elements in one atomic update and return what was actually taken.
+
+    Each array element is decremented with $inc only if it still holds at least the requested mass,
+    so concurrent miners can never drive it negative. Elements that came up short are retried
+    with whatever mass the pre-image showed was left.
+    """
+    taken = ElementVector(requested.index)
+    pending = np.maximum(requested.mass, 0)
+    for _ in range(MAX_DEPLETION_ATTEMPTS):
+        if not pending.any():
+            break
+        inc, filters = _element_update(pending)
+        before = db.asteroids.find_one_and_update(
+            {"full_name": full_name},
+            {"$inc": inc, "$set": {"last_mined": datetime.now(UTC)}},
+            array_filters=filters,
+            return_document=ReturnDocument.BEFORE
+        )
+        if not before:
+            logging.error(f"Asteroid {full_name} not found while depleting elements")
+            break
+        available = remaining_mass(before, requested.index).mass
+        applied = np.where(available >= pending, pending, 0)
+        taken.mass += applied
+        # Keep the cached composition in step with the write instead of re-reading it
+        after = available - applied
+        for elem in before.get("elements", []):
+            number = requested.index.numbers.get(elem["name"])
+            if number is not None:
+                elem["mass_kg"] = Int64(int(after[number]))
+        _store(before)
+        pending = np.where(applied > 0, 0, np.minimum(pending, available))
+    short = requested.total() - taken.total()
+    if short:
+        logging.info(f"Asteroid {full_name}: {short} kg of requested elements already depleted")
+    return taken
@@ -0,0 +1,82 @@
+import logging
+from typing import List
+import numpy as np
+import pymongo
+from bson.int64 import Int64
+from pymongo import UpdateOne
+from config import MongoDBConfig
+from amos.element_vector import COMMODITY_NUMBERS, INT64_CEILING, VECTOR_WIDTH, price_vector
+from amos.job_queue import enqueue_job, find_open_job, register_job_handler, update_job_progress
+
+REVALUE_ASTEROIDS_JOB = "revalue_asteroids"
+REVALUE_BATCH_SIZE = 50_000
+VALUATION_PROJECTION = {"value": 1, "elements.number": 1, "elements.mass_kg": 1}
+# Only priced elements contribute to value, so the mass matrix holds just their columns
+PRICED_NUMBERS = np.array(sorted(COMMODITY_NUMBERS.values()), dtype=np.intp)
+_PRICED_COLUMN = np.full(VECTOR_WIDTH, -1, dtype=np.intp)
+_PRICED_COLUMN[PRICED_NUMBERS] = np.arange(PRICED_NUMBERS.size)
+
+db = MongoDBConfig.get_database()
+
+def priced_mass_matrix(asteroids: List[dict]) -> np.ndarray:
+    """
+    Remaining kg of each priced element per asteroid, one row per asteroid and one column per PRICED_NUMBERS entry.
+    """
+    elements = [asteroid.get("elements") or [] for asteroid in asteroids]
+    rows = np.repeat(np.arange(len(asteroids), dtype=np.intp), [len(listed) for listed in elements])
+    numbers = np.clip(np.fromiter((element.get("number") or 0 for listed in elements for element in listed), dtype=np.intp, count=rows.size), 0, VECTOR_WIDTH - 1)
+    masses = np.fromiter((element.get("mass_kg") or 0 for listed in elements for element in listed), dtype=np.float64, count=rows.size)
+    columns = _PRICED_COLUMN[numbers]
+    priced = columns >= 0
+    matrix = np.zeros((len(asteroids), PRICED_NUMBERS.size), dtype=np.float64)
+    np.add.at(matrix, (rows[priced], columns[priced]), masses[priced])
+    return matrix
+
+def asteroid_values(mass_matrix: np.ndarray, prices: dict) -> np.ndarray:
+    return np.minimum(mass_matrix @ price_vector(prices)[PRICED_NUMBERS], INT64_CEILING).astype(np.int64)
+
+def revalue_asteroids(job_id=None, prices: dict = None, batch_size: int = REVALUE_BATCH_SIZE) -> dict:
+    """
+    Recompute every asteroid's value from its remaining elements at `prices` (the cached market prices by default),
+    a page of the catalog per matrix-vector product, and write back only the values that changed.
+    """
+    if prices is None:
+        cache = db.market_prices.find_one({"name": "commodity_prices"})
+        if not cache:
+            logging.warning("No cached market prices, skipping asteroid revaluation")
+            return {"scanned": 0, "changed": 0}
+        prices = cache["prices"]
+    scanned = changed = 0
+    last_id = None
+    while True:
+        page = {"_id": {"$gt": last_id}} if last_id else {}
+        batch = list(db.asteroids.find(page, VALUATION_PROJECTION).sort("_id", pymongo.ASCENDING).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        values = asteroid_values(priced_mass_matrix(batch), prices)
+        stored = np.array([-1 if asteroid.get("value") is None else asteroid["value"] for asteroid in batch], dtype=np.int64)
+        stale = np.flatnonzero(values != stored)
+        if stale.size:
+            values = values.tolist()
+            db.asteroids.bulk_write([UpdateOne({"_id": batch[i]["_id"]}, {"$set": {"value": Int64(values[i])}}) for i in stale.tolist()], ordered=False)
+        scanned += len(batch)
+        changed += int(stale.size)
+        if job_id:
+            update_job_progress(job_id, asteroids_done=scanned, asteroids_changed=changed)
+    logging.info(f"Revalued {scanned} asteroids, {changed} changed")
+    return {"scanned": scanned, "changed": changed}
+
+def schedule_revaluation():
+    """
+    Queue a revaluation unless one is already waiting; a running one may have read the previous prices, so it does not count.
+    """
+    if not find_open_job(REVALUE_ASTEROIDS_JOB, None, statuses=("queued",)):
+        enqueue_job(REVALUE_ASTEROIDS_JOB)
+
+@register_job_handler(REVALUE_ASTEROIDS_JOB)
+def handle_revalue_asteroids(job: dict) -> dict:
+    return revalue_asteroids(job_id=job["_id"], **job.get("params", {}))
+
+if __name__ == "__main__":
+    print(revalue_asteroids())
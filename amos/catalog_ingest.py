@@ -0,0 +1,265 @@
+"""
+Load or refresh the asteroids collection from a small-body catalog file.
+
+    python -m amos.catalog_ingest PATH [--chunk-size N] [--workers N] [--recompose] [--restart]
+
+PATH is a CSV file (JPL SBDB column names such as full_name, spkid, pdes, neo, pha, H, diameter,
+albedo, moid, class, or this collection's own field names) or JSON Lines, optionally gzipped. Rows are
+read a chunk at a time; moid_days, mass, composition and value are derived for the whole chunk with
+array operations, and each chunk is upserted by full_name with one unordered bulk_write on a small
+thread pool with a bounded number of chunks in flight, so memory does not grow with the file.
+
+Progress is recorded per file after every contiguous run of written chunks, and a re-run of the same
+file resumes after the last recorded row. Orbital and physical fields are refreshed on every load, but
+the composition of an asteroid that already exists is left alone (mining has depleted it) unless
+--recompose is given.
+"""
+import argparse
+import csv
+import gc
+import gzip
+import itertools
+import json
+import logging
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, UTC
+from typing import Dict, Iterator, List, Optional
+import numpy as np
+import pymongo
+from bson.int64 import Int64
+from pymongo import UpdateOne
+from config import MongoDBConfig
+from amos.element_vector import INT64_CEILING, price_vector
+from amos.mine_asteroid import fetch_market_prices
+
+INGEST_CHUNK_SIZE = 5000
+INGEST_WORKERS = 4
+CHUNKS_IN_FLIGHT_PER_WORKER = 2
+# Chunks allocate tens of thousands of acyclic dicts; at the default gen-0 threshold the collector
+# rescans them constantly and more than doubles the time to build a chunk
+INGEST_GC_THRESHOLD = 50_000
+AU_KM = 149_597_870.7
+CRUISE_KM_PER_DAY = 1_500_000  # ~17 km/s, so 1 AU of MOID is about 100 travel days
+
+# Mass fractions and bulk properties of each composition, and the catalog classes mapped to them.
+# Orbit classes (SBDB 3-letter codes) are matched first, then the first letter of a spectral class.
+COMPOSITIONS = {
+    "carbonaceous": {
+        "density": 1400, "albedo": 0.06,
+        "elements": {"Carbon": (6, 0.03), "Oxygen": (8, 0.40), "Magnesium": (12, 0.11), "Silicon": (14, 0.12), "Sulfur": (16, 0.05),
+                     "Iron": (26, 0.18), "Nickel": (28, 0.011), "Cobalt": (27, 0.0005), "Copper": (29, 0.00012), "Palladium": (46, 0.0000006),
+                     "Silver": (47, 0.0000002), "Platinum": (78, 0.000001), "Gold": (79, 0.00000015)}
+    },
+    "stony": {
+        "density": 2700, "albedo": 0.25,
+        "elements": {"Oxygen": (8, 0.36), "Magnesium": (12, 0.15), "Aluminium": (13, 0.012), "Silicon": (14, 0.18), "Calcium": (20, 0.013),
+                     "Iron": (26, 0.25), "Nickel": (28, 0.016), "Cobalt": (27, 0.0008), "Copper": (29, 0.0001), "Palladium": (46, 0.0000008),
+                     "Silver": (47, 0.0000001), "Platinum": (78, 0.0000015), "Gold": (79, 0.0000002)}
+    },
+    "metallic": {
+        "density": 5300, "albedo": 0.14,
+        "elements": {"Iron": (26, 0.88), "Nickel": (28, 0.10), "Cobalt": (27, 0.005), "Copper": (29, 0.0003), "Palladium": (46, 0.000004),
+                     "Silver": (47, 0.000001), "Platinum": (78, 0.00002), "Gold": (79, 0.000001), "Sulfur": (16, 0.01)}
+    }
+}
+DEFAULT_COMPOSITION = "stony"
+CLASS_COMPOSITIONS = {
+    "ATE": "stony", "APO": "stony", "AMO": "stony", "IEO": "stony", "MCA": "stony", "IMB": "stony",
+    "MBA": "carbonaceous", "OMB": "carbonaceous", "TJN": "carbonaceous", "CEN": "carbonaceous", "TNO": "carbonaceous",
+    "HYA": "carbonaceous", "PAA": "carbonaceous", "AST": "carbonaceous"
+}
+SPECTRAL_COMPOSITIONS = {
+    **dict.fromkeys("BCDFGPT", "carbonaceous"),
+    **dict.fromkeys("AKLOQRSV", "stony"),
+    **dict.fromkeys("EMX", "metallic")
+}
+# Catalog column -> asteroid field, for SBDB exports
+FIELD_ALIASES = {"pha": "hazard", "H": "abs_magnitude"}
+FLOAT_FIELDS = ("abs_magnitude", "diameter", "albedo", "diameter_sigma", "moid")
+FLAG_FIELDS = ("neo", "hazard")
+TEXT_FIELDS = ("pdes", "name", "orbit_id", "class")
+
+db = MongoDBConfig.get_database()
+
+def _composition_matrix():
+    names = list(COMPOSITIONS)
+    elements = sorted({(number, name) for c in COMPOSITIONS.values() for name, (number, _) in c["elements"].items()})
+    fractions = np.zeros((len(names), len(elements)))
+    for row, composition in enumerate(COMPOSITIONS.values()):
+        for column, (_, name) in enumerate(elements):
+            fractions[row, column] = composition["elements"].get(name, (0, 0.0))[1]
+    return names, elements, fractions
+
+COMPOSITION_NAMES, ELEMENT_COLUMNS, FRACTIONS = _composition_matrix()
+DENSITIES = np.array([COMPOSITIONS[name]["density"] for name in COMPOSITION_NAMES], dtype=np.float64)
+ALBEDOS = np.array([COMPOSITIONS[name]["albedo"] for name in COMPOSITION_NAMES], dtype=np.float64)
+# (matrix column, name, atomic number) of the elements each composition contains
+COMPOSITION_ELEMENTS = [[(column, name, number) for column, (number, name) in enumerate(ELEMENT_COLUMNS) if FRACTIONS[row, column] > 0] for row in range(len(COMPOSITION_NAMES))]
+
+def composition_for(asteroid_class: Optional[str]) -> int:
+    code = (asteroid_class or "").strip().upper()
+    name = CLASS_COMPOSITIONS.get(code) or SPECTRAL_COMPOSITIONS.get(code[:1]) or DEFAULT_COMPOSITION
+    return COMPOSITION_NAMES.index(name)
+
+def _float(value) -> float:
+    try:
+        return float(value) if value not in (None, "") else np.nan
+    except (TypeError, ValueError):
+        return np.nan
+
+def _flag(value) -> Optional[bool]:
+    if isinstance(value, bool) or value is None:
+        return value
+    text = str(value).strip().upper()
+    return True if text in ("Y", "TRUE", "1") else False if text in ("N", "FALSE", "0") else None
+
+def normalize_row(raw: dict) -> dict:
+    row = {FIELD_ALIASES.get(key, key): value for key, value in raw.items()}
+    row["full_name"] = " ".join(str(row.get("full_name") or "").split())
+    return row
+
+def derive_chunk(rows: List[dict], price_per_kg: np.ndarray) -> Dict[str, np.ndarray]:
+    """
+    Parsed and derived columns for a chunk of normalized rows, as arrays aligned with `rows`.
+
+    moid_days is the MOID flown at CRUISE_KM_PER_DAY, at least one day, or 0 when the MOID is unknown.
+    The diameter comes from the catalog or else from H and the albedo (the composition's typical albedo
+    when none is given); mass is a sphere at the composition's density; element masses split it by the
+    composition's fractions, and value prices those at `price_per_kg`.
+    """
+    columns = {field: np.array([_float(row.get(field)) for row in rows]) for field in FLOAT_FIELDS}
+    composition = np.array([composition_for(row.get("class")) for row in rows], dtype=np.intp)
+
+    moid = columns["moid"]
+    moid_days = np.where(np.isnan(moid), 0, np.maximum(1, np.ceil(np.nan_to_num(moid) * AU_KM / CRUISE_KM_PER_DAY))).astype(np.int64)
+    albedo = np.where(np.isnan(columns["albedo"]) | (columns["albedo"] <= 0), ALBEDOS[composition], columns["albedo"])
+    estimated_km = 1329.0 / np.sqrt(albedo) * 10 ** (-columns["abs_magnitude"] / 5)
+    diameter_km = np.where(np.isnan(columns["diameter"]), estimated_km, columns["diameter"])
+    radius_m = np.nan_to_num(diameter_km) * 500.0
+    mass = np.minimum(4.0 / 3.0 * np.pi * radius_m ** 3 * DENSITIES[composition], INT64_CEILING)
+    element_mass = np.minimum(mass[:, None] * FRACTIONS[composition], INT64_CEILING)
+    value = np.minimum(element_mass @ price_per_kg, INT64_CEILING)
+    return {
+        **columns,
+        "moid_days": moid_days,
+        "composition": composition,
+        "mass": mass.astype(np.int64),
+        "element_mass": element_mass.astype(np.int64),
+        "value": value.astype(np.int64)
+    }
+
+def chunk_operations(rows: List[dict], price_per_kg: np.ndarray, recompose: bool = False) -> List[UpdateOne]:
+    derived = derive_chunk(rows, price_per_kg)
+    # Whole columns go back to Python objects once per chunk; the per-row loop only assembles documents
+    floats = {field: [None if value != value else value for value in derived[field].tolist()] for field in FLOAT_FIELDS}
+    moid_days, mass, value = derived["moid_days"].tolist(), derived["mass"].tolist(), derived["value"].tolist()
+    element_mass, composition = derived["element_mass"].tolist(), derived["composition"].tolist()
+    now = datetime.now(UTC)
+    operations = []
+    for i, row in enumerate(rows):
+        refreshed = {"full_name": row["full_name"], "moid_days": moid_days[i], "ingested_at": now}
+        for field in FLOAT_FIELDS:
+            refreshed[field] = floats[field][i]
+        for field in FLAG_FIELDS:
+            refreshed[field] = _flag(row.get(field))
+        for field in TEXT_FIELDS:
+            refreshed[field] = str(row.get(field) or "").strip() or None
+        if str(row.get("spkid") or "").strip().isdigit():
+            refreshed["spkid"] = int(row["spkid"])
+        masses = element_mass[i]
+        mined = {
+            "mass": Int64(mass[i]),
+            "value": Int64(value[i]),
+            "elements": [{"name": name, "number": number, "mass_kg": Int64(masses[column])} for column, name, number in COMPOSITION_ELEMENTS[composition[i]] if masses[column] > 0]
+        }
+        update = {"$set": {**refreshed, **mined}} if recompose else {"$set": refreshed, "$setOnInsert": mined}
+        operations.append(UpdateOne({"full_name": row["full_name"]}, update, upsert=True))
+    return operations
+
+def read_catalog(path: str) -> Iterator[dict]:
+    """
+    Raw rows of a CSV or JSON Lines catalog, streamed.
+    """
+    opener = gzip.open if path.endswith(".gz") else open
+    stem = path[:-3] if path.endswith(".gz") else path
+    with opener(path, "rt", newline="", encoding="utf-8") as handle:
+        if stem.endswith(".csv"):
+            yield from csv.DictReader(handle)
+        else:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+def _fingerprint(path: str) -> str:
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}:{stat.st_size}:{stat.st_mtime_ns}"
+
+def write_chunk(operations: List[UpdateOne]) -> dict:
+    try:
+        result = db.asteroids.bulk_write(operations, ordered=False)
+        return {"upserted": result.upserted_count, "modified": result.modified_count, "errors": 0}
+    except pymongo.errors.BulkWriteError as e:
+        # Unordered, so every other row of the chunk was still applied
+        details = e.details
+        logging.error(f"Catalog chunk had {len(details['writeErrors'])} failed rows, first: {details['writeErrors'][0].get('errmsg')}")
+        return {"upserted": details.get("nUpserted", 0), "modified": details.get("nModified", 0), "errors": len(details["writeErrors"])}
+
+def ingest_catalog(path: str, chunk_size: int = INGEST_CHUNK_SIZE, workers: int = INGEST_WORKERS, recompose: bool = False, restart: bool = False) -> dict:
+    """
+    Stream `path` into the asteroids collection and return row counts. Resumes an interrupted run of the same file.
+    """
+    progress_id = _fingerprint(path)
+    progress = db.ingest_progress.find_one({"_id": progress_id}) if not restart else None
+    if progress and progress.get("finished_at"):
+        logging.info(f"Catalog {path} was already loaded at {progress['finished_at']}, use --restart to load it again")
+        return progress["totals"]
+    skip = progress["rows_done"] if progress else 0
+    totals = progress["totals"] if progress else {"rows": 0, "rejected": 0, "upserted": 0, "modified": 0, "errors": 0}
+    db.ingest_progress.update_one({"_id": progress_id}, {"$set": {"path": path, "rows_done": skip, "totals": totals, "updated_at": datetime.now(UTC)}, "$unset": {"finished_at": ""}}, upsert=True)
+    db.asteroids.create_index("full_name", unique=True)
+    price_per_kg = price_vector(fetch_market_prices())[[number for number, _ in ELEMENT_COLUMNS]]
+    if skip:
+        logging.info(f"Resuming catalog {path} after row {skip:,}")
+
+    rows = itertools.islice(read_catalog(path), skip, None)
+    rows_read = skip
+    pending = deque()  # (future, rows in the chunk, rows rejected, rows read once the chunk is written), in file order
+
+    def settle(entry):
+        future, rows, rejected, rows_done = entry
+        totals["rows"] += rows
+        totals["rejected"] += rejected
+        for key, count in future.result().items():
+            totals[key] += count
+        db.ingest_progress.update_one({"_id": progress_id}, {"$set": {"rows_done": rows_done, "totals": totals, "updated_at": datetime.now(UTC)}})
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            chunk = list(itertools.islice(rows, chunk_size))
+            if not chunk:
+                break
+            rows_read += len(chunk)
+            valid = [row for row in map(normalize_row, chunk) if row["full_name"]]
+            future = pool.submit(write_chunk, chunk_operations(valid, price_per_kg, recompose)) if valid else pool.submit(dict)
+            pending.append((future, len(chunk), len(chunk) - len(valid), rows_read))
+            # Record progress only up to the oldest unfinished chunk, so a resume never skips unwritten rows
+            while pending and (pending[0][0].done() or len(pending) >= workers * CHUNKS_IN_FLIGHT_PER_WORKER):
+                settle(pending.popleft())
+        while pending:
+            settle(pending.popleft())
+    db.ingest_progress.update_one({"_id": progress_id}, {"$set": {"finished_at": datetime.now(UTC)}})
+    logging.info(f"Catalog {path}: {totals['rows']:,} rows, {totals['upserted']:,} new, {totals['modified']:,} updated, {totals['rejected']:,} without a name, {totals['errors']:,} failed")
+    return totals
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Load or refresh the asteroid catalog from a CSV or JSON Lines file")
+    parser.add_argument("path", help="Catalog file (.csv, .jsonl, optionally .gz)")
+    parser.add_argument("--chunk-size", type=int, default=INGEST_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS)
+    parser.add_argument("--recompose", action="store_true", help="Overwrite mass, value and elements of asteroids that already exist")
+    parser.add_argument("--restart", action="store_true", help="Ignore recorded progress and load the whole file")
+    args = parser.parse_args()
+    gc.set_threshold(INGEST_GC_THRESHOLD)
+    print(ingest_catalog(args.path, args.chunk_size, args.workers, args.recompose, args.restart))
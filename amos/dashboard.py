@@ -0,0 +1,58 @@
+import logging
+from typing import Dict, List
+from bson import ObjectId
+from config import MongoDBConfig
+from amos.event_feed import EVENT_FEED_COLLECTION, RECENT_EVENTS, recent_feed_pipeline
+
+ACTIVE_MISSION_PROJECTION = {
+    "name": 1, "status": 1, "asteroid_full_name": 1, "ship_name": 1, "ship_id": 1, "days_into_mission": 1, "scheduled_days": 1,
+    "total_yield_kg": 1, "elements_mined": 1
+}
+SHIP_PROJECTION = {"name": 1, "capacity": 1, "mining_power": 1, "location": 1, "active": 1, "destroyed": 1, "missions": 1}
+
+db = MongoDBConfig.get_database()
+
+def dashboard_pipeline(user_id: str, known_asteroids: bool = True, recent_events: int = RECENT_EVENTS) -> List[dict]:
+    """
+    Everything the landing page shows for a user, joined onto their user document: active missions, ships, the
+    newest event feed entries and (unless searching) the asteroids of all their missions. Each join is an indexed
+    match on user_id or full_name.
+    """
+    pipeline = [
+        {"$match": {"_id": ObjectId(user_id)}},
+        {"$project": {"_id": 1}},
+        {"$lookup": {"from": "missions", "pipeline": [{"$match": {"user_id": user_id, "status": 0}}, {"$project": ACTIVE_MISSION_PROJECTION}], "as": "missions"}},
+        {"$lookup": {"from": "ships", "pipeline": [{"$match": {"user_id": user_id}}, {"$project": SHIP_PROJECTION}], "as": "ships"}},
+        {"$lookup": {"from": EVENT_FEED_COLLECTION, "pipeline": recent_feed_pipeline(user_id, recent_events), "as": "recent_events"}}
+    ]
+    if known_asteroids:
+        pipeline += [
+            {"$lookup": {"from": "missions", "pipeline": [{"$match": {"user_id": user_id}}, {"$group": {"_id": "$asteroid_full_name"}}], "as": "asteroid_names"}},
+            {"$lookup": {"from": "asteroids", "localField": "asteroid_names._id", "foreignField": "full_name", "as": "asteroids"}},
+            {"$project": {"asteroid_names": 0}}
+        ]
+    return pipeline
+
+def is_available(ship: dict) -> bool:
+    return ship.get("location") == 0 and not ship.get("active") and not ship.get("destroyed")
+
+def load_dashboard(user_id: str, prices: Dict[str, int], known_asteroids: bool = True, recent_events: int = RECENT_EVENTS) -> dict:
+    """
+    The landing page read model from one aggregation: active missions with their ship id and estimated cargo value,
+    available ships, known asteroids, and the newest event feed entries.
+    """
+    dashboard = next(db.users.aggregate(dashboard_pipeline(user_id, known_asteroids, recent_events)), None) or {}
+    ships = dashboard.get("ships", [])
+    ship_ids = {ship["name"]: str(ship["_id"]) for ship in ships}
+    missions = dashboard.get("missions", [])
+    for mission in missions:
+        mission["estimated_value"] = sum(mass_kg * prices.get(name, 0) for name, mass_kg in (mission.get("elements_mined") or {}).items())
+        mission["ship_id"] = ship_ids.get(mission["ship_name"], mission.get("ship_id"))
+    logging.info(f"User {user_id}: Dashboard has {len(missions)} active missions, {len(ships)} ships, {len(dashboard.get('asteroids', []))} known asteroids")
+    return {
+        "missions": missions,
+        "ships": ships,
+        "available_ships": [ship for ship in ships if is_available(ship)],
+        "asteroids": sorted(dashboard.get("asteroids", []), key=lambda asteroid: asteroid.get("value") or 0, reverse=True),
+        "recent_events": dashboard.get("recent_events", [])
+    }
@@ -0,0 +1,223 @@
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from bson import Binary
+from amos.element_vector import ElementVector
+from amos.sim_state import DayResult
+
+SERIES_FORMAT = 1
+INT_WIDTHS = (np.int16, np.int32)
+NO_VALUE = -1  # daily_value of a day that has none; values are never negative
+SERIES_KEYS = ("day", "total_kg", "note", "events", "elements_mined", "daily_value")
+
+class SeriesDay:
+    """
+    One day of a DaySeries, read in place. Has the attributes of DayResult and the dict access of a
+    stored summary, so the accessors in manage_mission and the templates work on it unchanged.
+    """
+    __slots__ = ("series", "row")
+
+    def __init__(self, series: "DaySeries", row: int):
+        self.series = series
+        self.row = row
+
+    @property
+    def day(self) -> int:
+        return self.series.days[self.row]
+
+    @property
+    def total_kg(self) -> int:
+        return self.series.total_kg[self.row]
+
+    @total_kg.setter
+    def total_kg(self, value: int):
+        self.series.total_kg[self.row] = int(value)
+
+    @property
+    def daily_value(self) -> Optional[int]:
+        return self.series.values[self.row]
+
+    @daily_value.setter
+    def daily_value(self, value: Optional[int]):
+        self.series.values[self.row] = int(value) if value is not None else None
+
+    @property
+    def note(self) -> str:
+        return self.series.notes[self.series.note_ids[self.row]]
+
+    @property
+    def events(self) -> List[dict]:
+        return [self.series.event_table[code] for code in self.series.event_codes[self.row]]
+
+    @property
+    def elements_mined(self) -> Dict[str, int]:
+        return {name: kg for name, kg in zip(self.series.elements, self.series.masses[self.row]) if kg}
+
+    @elements_mined.setter
+    def elements_mined(self, elements: Dict[str, int]):
+        # Only rewrites the row; every element must already have a column in the series
+        self.series.masses[self.row] = [int(elements.get(name, 0)) for name in self.series.elements]
+
+    def get(self, key: str, default=None):
+        if key in SERIES_KEYS:
+            return getattr(self, key)
+        return self.series.extra.get(self.row, {}).get(key, default)
+
+    def __getitem__(self, key: str):
+        if key in SERIES_KEYS:
+            return getattr(self, key)
+        return self.series.extra[self.row][key]
+
+    def __contains__(self, key: str) -> bool:
+        return key in SERIES_KEYS or key in self.series.extra.get(self.row, {})
+
+    def to_dict(self) -> dict:
+        summary = {key: getattr(self, key) for key in SERIES_KEYS}
+        summary.update(self.series.extra.get(self.row, {}))
+        return summary
+
+def _pack(values: List[int]) -> dict:
+    # Smallest signed width that holds the column; most day, kg and note columns fit in two bytes
+    array = np.asarray(values, dtype=np.int64)
+    for dtype in INT_WIDTHS:
+        info = np.iinfo(dtype)
+        if not array.size or (array.min() >= info.min and array.max() <= info.max):
+            return {"dtype": np.dtype(dtype).str, "data": Binary(array.astype(dtype).tobytes())}
+    return {"dtype": np.dtype(np.int64).str, "data": Binary(array.tobytes())}
+
+def _unpack(column: dict) -> np.ndarray:
+    return np.frombuffer(column["data"], dtype=column["dtype"])
+
+class DaySeries:
+    """
+    A mission's daily summaries stored column-wise in the `day_series` field.
+
+    Element names are listed once per mission. Each numeric column (delta-encoded days, total_kg,
+    daily values, note indexes and the element x day mass matrix, whose entries are themselves the
+    daily deltas of elements_mined) is a little-endian integer buffer at the narrowest width that
+    holds it. Notes are indexes into a string table and events small integer codes into an event
+    table. Keys a summary has beyond the standard ones (e.g. hourly_kg) are kept per row in `extra`.
+    In memory the columns are plain lists, decoded once, with masses held one list per day.
+    """
+    __slots__ = ("elements", "days", "total_kg", "values", "notes", "note_ids", "event_table", "event_codes", "masses", "extra")
+
+    def __init__(self, elements, days, total_kg, values, notes, note_ids, event_table, event_codes, masses, extra):
+        self.elements = elements
+        self.days = days
+        self.total_kg = total_kg
+        self.values = values
+        self.notes = notes
+        self.note_ids = note_ids
+        self.event_table = event_table
+        self.event_codes = event_codes
+        self.masses = masses
+        self.extra = extra
+
+    def __len__(self) -> int:
+        return len(self.days)
+
+    def __iter__(self):
+        return (SeriesDay(self, row) for row in range(len(self.days)))
+
+    def __getitem__(self, item):
+        rows = range(len(self.days))[item]
+        if isinstance(rows, range):
+            return [SeriesDay(self, row) for row in rows]
+        return SeriesDay(self, rows)
+
+    def summaries(self) -> List[dict]:
+        return [day.to_dict() for day in self]
+
+    @classmethod
+    def from_summaries(cls, summaries: Iterable) -> "DaySeries":
+        elements: List[str] = []
+        element_columns: Dict[str, int] = {}
+        notes: List[str] = []
+        note_index: Dict[str, int] = {}
+        event_table: List[dict] = []
+        days, total_kg, values, note_ids, event_codes, extra, mined = [], [], [], [], [], {}, []
+        for row, summary in enumerate(summaries):
+            if isinstance(summary, (DayResult, SeriesDay)):
+                summary = summary.to_dict()
+            note = summary.get("note", "")
+            if note not in note_index:
+                note_index[note] = len(notes)
+                notes.append(note)
+            codes = []
+            for event in summary.get("events") or []:
+                if event not in event_table:
+                    event_table.append(event)
+                codes.append(event_table.index(event))
+            elements_mined = summary.get("elements_mined") or {}
+            if isinstance(elements_mined, ElementVector):
+                elements_mined = elements_mined.to_dict()
+            for name in elements_mined:
+                if name not in element_columns:
+                    element_columns[name] = len(elements)
+                    elements.append(name)
+            days.append(int(summary.get("day", 0)))
+            total_kg.append(int(summary.get("total_kg", 0)))
+            values.append(int(summary["daily_value"]) if summary.get("daily_value") is not None else None)
+            note_ids.append(note_index[note])
+            event_codes.append(codes)
+            mined.append(elements_mined)
+            others = {key: value for key, value in summary.items() if key not in SERIES_KEYS}
+            if others:
+                extra[row] = others
+        masses = [[int(elements_mined.get(name, 0)) for name in elements] for elements_mined in mined]
+        return cls(elements, days, total_kg, values, notes, note_ids, event_table, event_codes, masses, extra)
+
+    @classmethod
+    def from_document(cls, series: dict) -> "DaySeries":
+        elements = series["elements"]
+        days = np.cumsum(_unpack(series["day"]), dtype=np.int64).tolist()
+        values = _unpack(series["value"]).tolist()
+        if NO_VALUE in values:
+            values = [None if value == NO_VALUE else value for value in values]
+        return cls(
+            elements,
+            days,
+            _unpack(series["total_kg"]).tolist(),
+            values,
+            series["notes"],
+            _unpack(series["note"]).tolist(),
+            series["event_table"],
+            series["events"],
+            _unpack(series["mass"]).reshape(len(elements), len(days)).T.tolist(),
+            {int(row): fields for row, fields in series["extra"].items()} if "extra" in series else {}
+        )
+
+    def to_document(self) -> dict:
+        document = {
+            "format": SERIES_FORMAT,
+            "elements": self.elements,
+            "day": _pack(np.diff(np.asarray(self.days, dtype=np.int64), prepend=0)),
+            "total_kg": _pack(self.total_kg),
+            "value": _pack([NO_VALUE if value is None else value for value in self.values]),
+            "notes": self.notes,
+            "note": _pack(self.note_ids),
+            "event_table": self.event_table,
+            "events": self.event_codes,
+            "mass": _pack(np.asarray(self.masses, dtype=np.int64).reshape(len(self.days), len(self.elements)).T.ravel())
+        }
+        if self.extra:
+            document["extra"] = {str(row): fields for row, fields in self.extra.items()}
+        return document
+
+def mission_days(mission_raw: dict):
+    """
+    The mission's daily summaries as a sequence: a DaySeries view for missions stored in the columnar
+    format, otherwise the legacy list of summary dicts. Either supports len, iteration and slicing.
+    """
+    series = mission_raw.get("day_series")
+    if series is not None:
+        return series if isinstance(series, DaySeries) else DaySeries.from_document(series)
+    return mission_raw.get("daily_summaries") or []
+
+def summary_dicts(mission_raw: dict) -> List[dict]:
+    return [summary if isinstance(summary, dict) else summary.to_dict() for summary in mission_days(mission_raw)]
+
+def day_count(mission_raw: dict) -> int:
+    series = mission_raw.get("day_series")
+    if series is not None:
+        return len(series) if isinstance(series, DaySeries) else len(series["day"]["data"]) // np.dtype(series["day"]["dtype"]).itemsize
+    return len(mission_raw.get("daily_summaries") or [])
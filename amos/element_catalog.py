@@ -0,0 +1,97 @@
+import logging
+import threading
+import time
+from types import MappingProxyType
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+import numpy as np
+from pydantic import ValidationError
+from config import MongoDBConfig
+from utils.metrics import record_cache
+from models.models import ElementModel
+from amos.element_vector import COMMODITY_MASK, MAX_ATOMIC_NUMBER, VECTOR_WIDTH
+
+USE_CASES = ["fuel", "lifesupport", "energystorage", "construction", "electronics", "coolants", "industrial", "medical", "propulsion", "shielding", "agriculture", "mining"]
+USE_CASE_BITS = {use: 1 << bit for bit, use in enumerate(USE_CASES)}
+# The periodic table does not change while the app runs; reloading daily only picks up edits to the collection
+ELEMENT_CATALOG_TTL_SECONDS = 24 * 3600
+
+db = MongoDBConfig.get_database()
+_catalog: Optional[Tuple[float, "ElementCatalog"]] = None
+_catalog_lock = threading.Lock()
+
+def use_mask(uses: Iterable[str]) -> int:
+    mask = 0
+    for use in uses:
+        mask |= USE_CASE_BITS.get(use, 0)
+    return mask
+
+def mask_uses(mask: int) -> List[str]:
+    return [use for use, bit in USE_CASE_BITS.items() if mask & bit]
+
+class ElementCatalog:
+    """
+    Read-only view of the elements collection: each element's model by name, and per atomic number a bitmask
+    of its USE_CASES and whether it is a traded commodity. Built once and shared by every request in the process.
+    """
+    __slots__ = ("elements", "numbers", "use_masks", "commodity", "use_matrix")
+
+    def __init__(self, documents: Iterable[dict]):
+        elements: Dict[str, ElementModel] = {}
+        numbers: Dict[str, int] = {}
+        use_masks = np.zeros(VECTOR_WIDTH, dtype=np.uint16)
+        for document in documents:
+            try:
+                element = ElementModel(**document)
+            except ValidationError as e:
+                logging.error(f"Skipping element {document.get('name')} in catalog: {e}")
+                continue
+            elements[element.name] = element
+            if 0 < element.number <= MAX_ATOMIC_NUMBER:
+                numbers[element.name] = element.number
+                use_masks[element.number] = use_mask(element.uses)
+        self.elements: Mapping[str, ElementModel] = MappingProxyType(elements)
+        self.numbers: Mapping[str, int] = MappingProxyType(numbers)
+        self.use_masks = use_masks
+        self.commodity = COMMODITY_MASK.copy()
+        # One 0/1 column per use case, so use-case masses of element mass vectors are a single matrix product
+        self.use_matrix = ((use_masks[:, None] >> np.arange(len(USE_CASES), dtype=np.uint16)) & 1).astype(np.float64)
+        for array in (self.use_masks, self.commodity, self.use_matrix):
+            array.flags.writeable = False
+
+    def element(self, name: str) -> Optional[ElementModel]:
+        return self.elements.get(name)
+
+    def uses(self, number: int) -> List[str]:
+        return mask_uses(int(self.use_masks[number])) if 0 < number <= MAX_ATOMIC_NUMBER else []
+
+    def mass_matrix(self, masses: List[Dict[str, int]]) -> np.ndarray:
+        """
+        One row per {element name: kg} mapping, laid out by atomic number. Names not in the catalog are dropped.
+        """
+        rows = np.repeat(np.arange(len(masses), dtype=np.intp), [len(by_name) for by_name in masses])
+        numbers = np.fromiter((self.numbers.get(name, 0) for by_name in masses for name in by_name), dtype=np.intp, count=rows.size)
+        kg = np.fromiter((kg or 0 for by_name in masses for kg in by_name.values()), dtype=np.float64, count=rows.size)
+        matrix = np.zeros((len(masses), VECTOR_WIDTH), dtype=np.float64)
+        np.add.at(matrix, (rows, numbers), kg)
+        matrix[:, 0] = 0  # Slot 0 collected the unknown names
+        return matrix
+
+    def use_case_mass(self, mass_matrix: np.ndarray) -> np.ndarray:
+        """
+        Kg per use case for each row of a (rows, VECTOR_WIDTH) mass matrix; an element counts towards every use it has.
+        """
+        return mass_matrix @ self.use_matrix
+
+def element_catalog() -> ElementCatalog:
+    global _catalog
+    with _catalog_lock:
+        cached = _catalog
+    hit = bool(cached) and time.monotonic() - cached[0] < ELEMENT_CATALOG_TTL_SECONDS
+    record_cache("element_catalog", hit)
+    if hit:
+        return cached[1]
+    catalog = ElementCatalog(db.elements.find())
+    logging.info(f"Loaded element catalog with {len(catalog.elements)} elements")
+    with _catalog_lock:
+        _catalog = (time.monotonic(), catalog)
+    return catalog
@@ -0,0 +1,95 @@
+from typing import Dict, Iterable, List, Optional
+import logging
+import numpy as np
+
+MAX_ATOMIC_NUMBER = 118
+VECTOR_WIDTH = MAX_ATOMIC_NUMBER + 1  # slot 0 unused so atomic numbers index directly
+COMMODITY_NUMBERS = {"Copper": 29, "Palladium": 46, "Silver": 47, "Platinum": 78, "Gold": 79}
+INT64_CEILING = np.nextafter(2.0 ** 63, 0)  # Largest float that still converts to int64; clip masses and values to it
+
+COMMODITY_MASK = np.zeros(VECTOR_WIDTH, dtype=bool)
+COMMODITY_MASK[list(COMMODITY_NUMBERS.values())] = True
+
+def price_vector(prices: Dict[str, int]) -> np.ndarray:
+    """
+    Per-kg commodity prices laid out by atomic number. Non-commodities are priced at 0.
+    """
+    vector = np.zeros(VECTOR_WIDTH, dtype=np.float64)
+    for name, number in COMMODITY_NUMBERS.items():
+        vector[number] = float(prices.get(name, 0) or 0)
+    return vector
+
+class ElementIndex:
+    """
+    Name <-> atomic number lookup built from an asteroid's `elements` list.
+    """
+    __slots__ = ("numbers", "names")
+
+    def __init__(self, elements: Iterable[dict]):
+        self.numbers: Dict[str, int] = {}
+        self.names: Dict[int, str] = {}
+        for elem in elements:
+            number = int(elem.get("number", 0) or 0)
+            if 0 < number <= MAX_ATOMIC_NUMBER:
+                self.numbers[elem["name"]] = number
+                self.names[number] = elem["name"]
+
+    def vector(self, masses: Optional[Dict[str, int]] = None) -> "ElementVector":
+        vector = ElementVector(self)
+        for name, kg in (masses or {}).items():
+            number = self.numbers.get(name)
+            if number is None:
+                logging.warning(f"Element {name} is not part of this asteroid, dropping {kg} kg")
+                continue
+            vector.mass[number] += int(kg)
+        return vector
+
+class ElementVector:
+    """
+    Fixed-width kg vector indexed by atomic number (1-118).
+    Accumulation, scaling and valuation are array operations; to_dict()/to_elements() produce the stored BSON shapes.
+    """
+    __slots__ = ("index", "mass")
+
+    def __init__(self, index: ElementIndex, mass: Optional[np.ndarray] = None):
+        self.index = index
+        self.mass = mass if mass is not None else np.zeros(VECTOR_WIDTH, dtype=np.int64)
+
+    def __iadd__(self, other: "ElementVector") -> "ElementVector":
+        self.mass += other.mass
+        return self
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    def copy(self) -> "ElementVector":
+        return ElementVector(self.index, self.mass.copy())
+
+    def scale(self, factor: float, mask: Optional[np.ndarray] = None):
+        """
+        Multiply masses by `factor` (truncating to whole kg), optionally only where `mask` is set.
+        """
+        scaled = (self.mass * factor).astype(np.int64)
+        if mask is None:
+            self.mass = scaled
+        else:
+            self.mass = np.where(mask, scaled, self.mass)
+
+    def total(self, mask: Optional[np.ndarray] = None) -> int:
+        return int(self.mass[mask].sum() if mask is not None else self.mass.sum())
+
+    def present(self) -> np.ndarray:
+        return self.mass > 0
+
+    def value(self, prices: np.ndarray) -> int:
+        return int(self.mass @ prices)
+
+    def to_dict(self, mask: Optional[np.ndarray] = None) -> Dict[str, int]:
+        selected = self.present() if mask is None else self.present() & mask
+        return {self.index.names[int(number)]: int(self.mass[number]) for number in np.flatnonzero(selected)}
+
+    def to_elements(self) -> List[dict]:
+        return [
+            {"name": self.index.names[int(number)], "mass_kg": int(self.mass[number]), "number": int(number)}
+            for number in np.flatnonzero(self.present())
+        ]
@@ -0,0 +1,79 @@
+import logging
+from datetime import datetime, UTC
+from typing import List
+import pymongo
+from pymongo import ReturnDocument
+from config import MongoDBConfig
+
+EVENT_FEED_COLLECTION = "event_feed"
+FEED_TTL_SECONDS = 7 * 24 * 3600
+RECENT_EVENTS = 10
+MAX_EVENTS_PER_POLL = 100
+FEED_PROJECTION = {"_id": 0, "seq": 1, "mission_name": 1, "day": 1, "elements_mined": 1, "event": 1}
+
+db = MongoDBConfig.get_database()
+_indexes_ready = False
+
+def ensure_feed_indexes():
+    """
+    (user_id, seq) serves both the newest-first page and polling after a seq; the TTL index keeps each user's feed bounded.
+    """
+    global _indexes_ready
+    if not _indexes_ready:
+        db[EVENT_FEED_COLLECTION].create_index([("user_id", pymongo.ASCENDING), ("seq", pymongo.DESCENDING)], unique=True)
+        db[EVENT_FEED_COLLECTION].create_index("created_at", expireAfterSeconds=FEED_TTL_SECONDS)
+        _indexes_ready = True
+
+def reserve_feed_seqs(user_id: str, count: int) -> int:
+    """
+    Atomically reserve `count` consecutive feed positions for a user and return the first.
+    """
+    counter = db.event_feed_counters.find_one_and_update(
+        {"_id": user_id},
+        {"$inc": {"last": count}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["last"] - count + 1
+
+def day_headline(mission_name: str, summary) -> dict:
+    return {
+        "mission_name": mission_name,
+        "day": summary["day"],
+        "elements_mined": summary.get("elements_mined", {}),
+        "event": summary.get("event", "Mining in progress")
+    }
+
+def append_feed(user_id: str, mission_name: str, summaries, username: str = None):
+    """
+    Add one headline per newly simulated day to the user's feed, after the mission write has won.
+    """
+    if not summaries:
+        return
+    try:
+        ensure_feed_indexes()
+        first_seq = reserve_feed_seqs(user_id, len(summaries))
+        now = datetime.now(UTC)
+        db[EVENT_FEED_COLLECTION].insert_many([
+            {"user_id": user_id, "seq": first_seq + i, "created_at": now, **day_headline(mission_name, summary)}
+            for i, summary in enumerate(summaries)
+        ], ordered=False)
+    except pymongo.errors.PyMongoError as e:
+        # The feed is a convenience view; the mission's own days stay authoritative
+        logging.error(f"User {username}: Failed to append {len(summaries)} days of {mission_name} to the event feed: {e}")
+
+def recent_feed_pipeline(user_id: str, limit: int = RECENT_EVENTS) -> List[dict]:
+    return [{"$match": {"user_id": user_id}}, {"$sort": {"seq": -1}}, {"$limit": limit}, {"$project": FEED_PROJECTION}]
+
+def recent_events(user_id: str, limit: int = RECENT_EVENTS) -> List[dict]:
+    """
+    The user's newest `limit` headlines, newest first.
+    """
+    return list(db[EVENT_FEED_COLLECTION].aggregate(recent_feed_pipeline(user_id, limit)))
+
+def events_after(user_id: str, after_seq: int, limit: int = MAX_EVENTS_PER_POLL) -> List[dict]:
+    """
+    Headlines added since `after_seq`, oldest first, for incremental polling.
+    """
+    cursor = db[EVENT_FEED_COLLECTION].find({"user_id": user_id, "seq": {"$gt": after_seq}}, FEED_PROJECTION).sort("seq", pymongo.ASCENDING).limit(limit)
+    return list(cursor)
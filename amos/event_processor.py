@@ -1,8 +1,11 @@
-import random
 import logging
 from bson import ObjectId, Int64
-from models.models import EventModel, MissionModel, MissionDay
+from models.models import EventModel
+from amos.sim_state import DayResult, MissionState
+from amos.element_vector import ElementVector
+from amos.sim_rng import mission_rng
 from config import MongoDBConfig
+from utils.metrics import MISSION_PHASE_LATENCY
 
 class EventProcessor:
     @staticmethod
@@ -12,20 +15,20 @@ class EventProcessor:
         return [EventModel(**event) for event in events]
 
     @staticmethod
-    def apply_daily_events(mission: MissionModel, day_summary: MissionDay, elements_mined: dict, ship: dict, api_event: dict = None) -> tuple[MissionDay, bool]:
+    @MISSION_PHASE_LATENCY.time("events")
+    def apply_daily_events(mission: MissionState, day_summary: DayResult, elements_mined: ElementVector, ship: dict, events: list, api_event: dict = None) -> tuple[DayResult, bool]:
         """
-        Apply daily events to the mission and ship.
+        Apply daily events to the mission and ship. `events` is the events collection, loaded once per mission context.
         Returns a tuple of (updated day_summary, ship_destroyed flag).
         """
-        db = MongoDBConfig.get_database()
-        events = list(db.events.find())
         applied_events = day_summary.events
         phase = "travel" if day_summary.total_kg == 0 else "mining"
         ship_destroyed = False
+        rng = mission_rng(mission.seed, day_summary.day, "events")
 
         if api_event:
             event = {"name": api_event["name"], "effect": api_event["effect"], "probability": 1.0, "target": "mission", "phase": phase}
-            events.append(event)
+            events = [*events, event]  # The shared list stays as loaded
 
         # Calculate the day's yield multiplier based on events for this day only
         day_yield_multiplier = 1.0
@@ -35,7 +38,7 @@ class EventProcessor:
         hull = ship.get("hull", 100)
 
         for event in events:
-            if event.get("phase") == phase and random.random() < event["probability"]:
+            if event.get("phase") == phase and rng.random() < event["probability"]:
                 effect = event.get("effect", {})
                 applied_events.append({"type": event["name"], "effect": effect})
                 if event["target"] == "mission":
@@ -89,8 +92,7 @@ class EventProcessor:
         # Apply the day's yield multiplier to this day's yield only
         if phase == "mining":
             day_summary.total_kg = Int64(int(day_summary.total_kg * day_yield_multiplier))
-            for name in elements_mined:
-                elements_mined[name] = Int64(int(elements_mined[name] * day_yield_multiplier))
+            elements_mined.scale(day_yield_multiplier)
 
         day_summary.events = applied_events
         logging.info(f"Day {day_summary.day}: Applied {len(applied_events)} events")
@@ -0,0 +1,300 @@
+import logging
+from collections import Counter
+from typing import Dict, List, Optional
+import numpy as np
+from bson import ObjectId
+import pymongo
+from pymongo import UpdateOne
+from config import MongoDBConfig
+from models.models import PyInt64, User
+from amos.mine_asteroid import confidence_from_inputs, fetch_market_prices, HOURS_PER_DAY
+from amos.mission_planner import load_catalog, score_asteroids
+from amos.sim_rng import new_mission_seed
+from amos.mission_numbers import reserve_mission_number_blocks
+
+MAX_FLEET_SIZE = 100
+CANDIDATES_PER_SHIP = 3
+
+db = MongoDBConfig.get_database()
+
+def solve_assignment(profit: np.ndarray) -> List[tuple]:
+    """
+    Maximum-profit one-to-one assignment of rows (ships) to columns (asteroids), as (row, col) pairs.
+
+    Hungarian algorithm with potentials, O(n^2 m) with the inner scan over columns vectorized.
+    When there are more ships than asteroids the surplus ships are left unassigned.
+    """
+    rows, cols = profit.shape
+    if not rows or not cols:
+        return []
+    transposed = rows > cols
+    cost = -(profit.T if transposed else profit).astype(np.float64)
+    n, m = cost.shape
+    u = np.zeros(n + 1)
+    v = np.zeros(m + 1)
+    p = np.zeros(m + 1, dtype=np.intp)  # p[j]: row assigned to column j, 0 for none
+    way = np.zeros(m + 1, dtype=np.intp)
+    for i in range(1, n + 1):
+        p[0] = i
+        j0 = 0
+        minv = np.full(m + 1, np.inf)
+        used = np.zeros(m + 1, dtype=bool)
+        while True:
+            used[j0] = True
+            i0 = p[j0]
+            free = ~used
+            free[0] = False
+            reduced = np.full(m + 1, np.inf)
+            reduced[1:] = cost[i0 - 1] - u[i0] - v[1:]
+            better = free & (reduced < minv)
+            minv[better] = reduced[better]
+            way[better] = j0
+            j1 = int(np.argmin(np.where(free, minv, np.inf)))
+            delta = minv[j1]
+            u[p[used]] += delta
+            v[used] -= delta
+            minv[free] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0] = p[j1]
+            j0 = j1
+    pairs = [(int(p[j]) - 1, j - 1) for j in range(1, m + 1) if p[j]]
+    if transposed:
+        pairs = [(col, row) for row, col in pairs]
+    return sorted(pairs)
+
+def plan_fleet(user: User, ships: List[dict], config_vars: Dict, prices: Dict[str, int], travel_days: int, asteroid_names: Optional[List[str]] = None, max_budget: Optional[int] = None, max_loans: Optional[int] = None) -> dict:
+    """
+    Choose one asteroid per ship to maximize total expected profit.
+
+    Candidates are `asteroid_names`, or else the best CANDIDATES_PER_SHIP asteroids per ship within
+    `travel_days`. Each asteroid takes at most one ship so a fleet does not pile onto one rock.
+    The solve values each pair at its expected profit (less the next loan's repayment when the user
+    needs one), floored at zero, so a ship only goes where it earns something.
+    Budget and loan limits are not part of the solve: afterwards, missions are accepted greedily in
+    order of expected profit while the summed budgets stay within `max_budget` and, for a user below
+    minimum_funding, while loans stay within `max_loans`; a loan-funded mission must still clear its
+    repayment at the loan count it actually gets.
+    """
+    catalog = load_catalog(config_vars)
+    if asteroid_names:
+        candidates = catalog.positions(dict.fromkeys(asteroid_names))
+    else:
+        reachable = np.flatnonzero((catalog.moid_days > 0) & (catalog.moid_days <= travel_days) & (catalog.total_weight > 0))
+        candidates = reachable
+    if not candidates.size or not ships:
+        return {"assignments": [], "skipped": [{"ship_name": s["name"], "reason": "No reachable asteroid"} for s in ships]}
+
+    # One scoring pass per distinct ship spec; fleets are usually a few identical models
+    profit = np.empty((len(ships), candidates.size))
+    budgets = np.empty((len(ships), candidates.size))
+    mission_days = np.empty((len(ships), candidates.size))
+    specs: Dict[tuple, List[int]] = {}
+    for row, ship in enumerate(ships):
+        specs.setdefault((ship["mining_power"], ship["capacity"], bool(ship.get("missions"))), []).append(row)
+    for (mining_power, capacity, reused), spec_rows in specs.items():
+        _, revenue, cost, days = score_asteroids(catalog, candidates, config_vars, prices, mining_power, capacity, reused)
+        profit[spec_rows] = revenue - cost
+        budgets[spec_rows] = cost
+        mission_days[spec_rows] = days
+
+    minimum_funding = config_vars["minimum_funding"]
+    rates = config_vars["loan_interest_rates"]
+    needs_loan = user.bank < minimum_funding
+    loan_count = user.loan_count
+    # Solve on profit net of the next loan's repayment, floored at zero so leaving a ship idle beats a losing mission
+    net_profit = profit - budgets * rates[min(loan_count, len(rates) - 1)] if needs_loan else profit
+    value = np.maximum(net_profit, 0)
+
+    if not asteroid_names and candidates.size > len(ships) * CANDIDATES_PER_SHIP:
+        # Only the union of each ship's best few asteroids can appear in an optimal assignment worth keeping
+        k = len(ships) * CANDIDATES_PER_SHIP
+        keep = np.unique(np.argpartition(-net_profit, k - 1, axis=1)[:, :k])
+        candidates, profit, budgets, mission_days, value = candidates[keep], profit[:, keep], budgets[:, keep], mission_days[:, keep], value[:, keep]
+
+    pairs = solve_assignment(value)
+    pairs.sort(key=lambda pair: -value[pair])
+
+    spent = 0
+    assignments, skipped = [], []
+    assigned_rows = set()
+    for row, col in pairs:
+        assigned_rows.add(row)
+        ship = ships[row]
+        budget = int(budgets[row, col])
+        repayment = int(budget * rates[min(loan_count, len(rates) - 1)]) if needs_loan else 0
+        expected_profit = int(profit[row, col]) - repayment
+        if expected_profit <= 0:
+            skipped.append({"ship_name": ship["name"], "reason": "No assignment with positive expected profit"})
+        elif max_budget is not None and spent + budget > max_budget:
+            skipped.append({"ship_name": ship["name"], "reason": "Over budget"})
+        elif needs_loan and max_loans is not None and loan_count - user.loan_count >= max_loans:
+            skipped.append({"ship_name": ship["name"], "reason": "Loan limit reached"})
+        else:
+            spent += budget
+            assignments.append({
+                "ship": ship,
+                "asteroid_full_name": catalog.names[candidates[col]],
+                "travel_days": int(catalog.moid_days[candidates[col]]),
+                "budget": budget,
+                "repayment": repayment,
+                "expected_profit": expected_profit
+            })
+            if needs_loan:
+                loan_count += 1
+    skipped.extend({"ship_name": ship["name"], "reason": "More ships than candidate asteroids"} for row, ship in enumerate(ships) if row not in assigned_rows)
+    return {"assignments": assignments, "skipped": skipped}
+
+def release_ship_claims(mission_ids: Dict[ObjectId, ObjectId]):
+    """
+    Undo launch claims: make each ship idle again and drop the mission id pushed onto it.
+    """
+    if not mission_ids:
+        return
+    try:
+        db.ships.bulk_write([
+            UpdateOne({"_id": ship_id, "missions": str(mission_id)}, {"$set": {"active": False}, "$pull": {"missions": str(mission_id)}})
+            for ship_id, mission_id in mission_ids.items()
+        ], ordered=False)
+    except pymongo.errors.PyMongoError as e:
+        logging.error(f"Failed to release {len(mission_ids)} claimed ships {list(mission_ids)}: {e}")
+
+def launch_fleet(user: User, travel_days: int, ship_names: Optional[List[str]] = None, asteroid_names: Optional[List[str]] = None, max_budget: Optional[int] = None, max_loans: Optional[int] = None) -> dict:
+    """
+    Assign idle ships to asteroids and start all the missions at once.
+
+    Round trips: config, idle ships, market prices (cached), one bulk write claiming the ships, one
+    read confirming the claims, one bulk write and one read reserving mission numbers for all
+    asteroids, one insert_many and one user update, however many ships launch.
+    Ships claimed by a concurrent request in between are reported as skipped. If a later step fails the
+    claimed ships are released; ships whose mission alone was rejected by insert_many are released and skipped.
+    """
+    config_vars = db.config.find_one({"name": "mining_globals"})["variables"]
+    query = {"user_id": user.id, "location": 0.0, "active": False, "destroyed": {"$ne": True}}
+    if ship_names is not None:
+        query["name"] = {"$in": ship_names}
+    ships = list(db.ships.find(query).limit(MAX_FLEET_SIZE))
+    if not ships:
+        return {"launched": [], "skipped": [], "error": "No idle ships available at Earth"}
+    prices = fetch_market_prices()
+    plan = plan_fleet(user, ships, config_vars, prices, travel_days, asteroid_names, max_budget, max_loans)
+    assignments = plan["assignments"]
+    if not assignments:
+        return {"launched": [], "skipped": plan["skipped"]}
+
+    mission_ids = {assignment["ship"]["_id"]: ObjectId() for assignment in assignments}
+    db.ships.bulk_write([
+        UpdateOne({"_id": ship_id, "active": False}, {"$set": {"active": True}, "$push": {"missions": str(mission_id)}})
+        for ship_id, mission_id in mission_ids.items()
+    ], ordered=False)
+    claimed = {ship["_id"] for ship in db.ships.find({"_id": {"$in": list(mission_ids)}, "missions": {"$in": [str(m) for m in mission_ids.values()]}}, {"_id": 1})}
+
+    try:
+        per_asteroid = Counter(a["asteroid_full_name"] for a in assignments if a["ship"]["_id"] in claimed)
+        mission_numbers = reserve_mission_number_blocks(user.id, dict(per_asteroid))
+        user_debt = user.current_loan if user.current_loan else PyInt64(0)
+        documents, launched, skipped = [], [], plan["skipped"]
+        for assignment in assignments:
+            ship = assignment["ship"]
+            if ship["_id"] not in claimed:
+                skipped.append({"ship_name": ship["name"], "reason": "Ship was engaged by another request"})
+                continue
+            travel = assignment["travel_days"]
+            mining_power = ship["mining_power"]
+            target_yield_kg = ship["capacity"]
+            average_daily_yield = mining_power * HOURS_PER_DAY * config_vars["max_element_percentage"] / 2
+            estimated_mining_days = int(target_yield_kg / average_daily_yield)
+            scheduled_days = PyInt64((travel * 2) + estimated_mining_days)
+            confidence, profit_min, profit_max = confidence_from_inputs(config_vars, prices, travel, mining_power, target_yield_kg, user.max_overrun_days, len(ship["missions"]) > 0)
+            # The user's outstanding debt rolls into the first mission only, as start_mission does
+            previous_debt = PyInt64(user_debt + assignment["repayment"])
+            user_debt = PyInt64(0)
+            asteroid_full_name = assignment["asteroid_full_name"]
+            mission_number = mission_numbers[asteroid_full_name]
+            mission_numbers[asteroid_full_name] += 1
+            documents.append({
+                "_id": mission_ids[ship["_id"]],
+                "user_id": user.id,
+                "company": user.company_name,
+                "ship_name": ship["name"],
+                "ship_id": str(ship["_id"]),
+                "asteroid_full_name": asteroid_full_name,
+                "name": f"{asteroid_full_name} Mission {mission_number}",
+                "travel_days_allocated": travel,
+                "mining_days_allocated": 0,
+                "total_duration_days": 0,
+                "scheduled_days": scheduled_days,
+                "budget": PyInt64(assignment["budget"]),
+                "status": 0,
+                "elements": [],
+                "elements_mined": {},
+                "cost": 0,
+                "revenue": 0,
+                "profit": 0,
+                "penalties": 0,
+                "investor_repayment": 0,
+                "ship_repair_cost": 0,
+                "previous_debt": previous_debt,
+                "events": [],
+                "daily_summaries": [],
+                "rocket_owned": True,
+                "yield_multiplier": 1.0,
+                "revenue_multiplier": 1.0,
+                "travel_yield_mod": 1.0,
+                "travel_delays": 0,
+                "target_yield_kg": PyInt64(target_yield_kg),
+                "ship_location": 0.0,
+                "total_yield_kg": PyInt64(0),
+                "days_into_mission": 0,
+                "days_left": scheduled_days,
+                "mission_cost": PyInt64(0),
+                "mission_projection": profit_max,
+                "confidence": confidence,
+                "completed_at": None,
+                "version": 0,
+                "seed": new_mission_seed()
+            })
+            launched.append({
+                "mission_id": str(mission_ids[ship["_id"]]),
+                "ship_name": ship["name"],
+                "asteroid_full_name": asteroid_full_name,
+                "travel_days": travel,
+                "budget": assignment["budget"],
+                "loan_repayment": assignment["repayment"],
+                "expected_profit": assignment["expected_profit"],
+                "confidence": confidence
+            })
+        if not documents:
+            return {"launched": [], "skipped": skipped}
+
+        failed = set()
+        try:
+            db.missions.insert_many(documents, ordered=False)
+        except pymongo.errors.BulkWriteError as e:
+            failed = {documents[error["index"]]["_id"] for error in e.details.get("writeErrors", [])}
+            logging.error(f"User {user.username}: {len(failed)} of {len(documents)} fleet missions were not inserted: {e.details.get('writeErrors', [])[:3]}")
+            release_ship_claims({ship_id: mission_id for ship_id, mission_id in mission_ids.items() if mission_id in failed})
+            skipped.extend({"ship_name": entry["ship_name"], "reason": "Mission could not be stored"} for entry in launched if ObjectId(entry["mission_id"]) in failed)
+            launched = [entry for entry in launched if ObjectId(entry["mission_id"]) not in failed]
+            if not launched:
+                return {"launched": [], "skipped": skipped}
+    except Exception:
+        # Hand the ships back rather than leave them engaged on missions that may not exist, and drop any that do
+        logging.exception(f"User {user.username}: Fleet launch failed after claiming {len(claimed)} ships, releasing them")
+        release_ship_claims({ship_id: mission_id for ship_id, mission_id in mission_ids.items() if ship_id in claimed})
+        try:
+            db.missions.delete_many({"_id": {"$in": list(mission_ids.values())}, "days_into_mission": 0})
+        except pymongo.errors.PyMongoError as e:
+            logging.error(f"User {user.username}: Failed to remove partially launched missions: {e}")
+        raise
+    loans = sum(1 for entry in launched if entry["loan_repayment"])
+    # The outstanding debt rode on the first mission; keep it on the user if that mission was not stored
+    user_update = {"$inc": {"loan_count": loans}}
+    if documents[0]["_id"] not in failed:
+        user_update["$set"] = {"current_loan": PyInt64(0)}
+    db.users.update_one({"_id": ObjectId(user.id)}, user_update)
+    logging.info(f"User {user.username}: Launched {len(launched)} missions ({loans} loan-funded), {len(skipped)} ships skipped, expected profit ${sum(e['expected_profit'] for e in launched):,}")
+    return {"launched": launched, "skipped": skipped}
@@ -0,0 +1,110 @@
+from typing import Dict, List, Optional
+import numpy as np
+
+HOURS_PER_DAY = 24
+MAX_ELEMENT_PERCENTAGE = 0.5
+
+# Hour-level events: (name, probability per hour, yield multiplier for that hour)
+DEFAULT_HOURLY_EVENTS = [
+    ("Drill Jam", 0.02, 0.0),
+    ("Dust Storm", 0.03, 0.5),
+    ("Rich Vein", 0.01, 2.0)
+]
+
+class HourlyYield:
+    """
+    Result of mining a run of hours. Every field is an array with one row per hour;
+    element columns follow the order of `numbers` (atomic numbers).
+    """
+    __slots__ = ("numbers", "extracted_kg", "element_kg", "elements_kg", "multipliers", "event_mask", "event_names")
+
+    def __init__(self, numbers, extracted_kg, element_kg, elements_kg, multipliers, event_mask, event_names):
+        self.numbers = numbers
+        self.extracted_kg = extracted_kg
+        self.element_kg = element_kg
+        self.elements_kg = elements_kg
+        self.multipliers = multipliers
+        self.event_mask = event_mask
+        self.event_names = event_names
+
+    @property
+    def hours(self) -> int:
+        return len(self.extracted_kg)
+
+    def hour_events(self, hour: int) -> List[str]:
+        return [self.event_names[i] for i in np.flatnonzero(self.event_mask[hour])]
+
+    def daily_rollup(self, hours_per_day: int = HOURS_PER_DAY) -> "DailyRollup":
+        """
+        Downsample to whole days for storage. Trailing hours that do not fill a day are dropped.
+        """
+        days = self.hours // hours_per_day
+        span = days * hours_per_day
+        return DailyRollup(
+            numbers=self.numbers,
+            extracted_kg=self.extracted_kg[:span].reshape(days, hours_per_day).sum(axis=1),
+            element_kg=self.element_kg[:span].reshape(days, hours_per_day).sum(axis=1),
+            elements_kg=self.elements_kg[:span].reshape(days, hours_per_day, len(self.numbers)).sum(axis=1),
+            event_counts=self.event_mask[:span].reshape(days, hours_per_day, len(self.event_names)).sum(axis=1),
+            event_names=self.event_names
+        )
+
+class DailyRollup:
+    """
+    Per-day totals of an HourlyYield, shaped (days,) and (days, elements) / (days, events).
+    """
+    __slots__ = ("numbers", "extracted_kg", "element_kg", "elements_kg", "event_counts", "event_names")
+
+    def __init__(self, numbers, extracted_kg, element_kg, elements_kg, event_counts, event_names):
+        self.numbers = numbers
+        self.extracted_kg = extracted_kg
+        self.element_kg = element_kg
+        self.elements_kg = elements_kg
+        self.event_counts = event_counts
+        self.event_names = event_names
+
+    def day_events(self, day_index: int) -> List[dict]:
+        return [
+            {"type": self.event_names[i], "effect": {"hours": int(count)}}
+            for i, count in enumerate(self.event_counts[day_index]) if count
+        ]
+
+def mine_hours(hours: int, mining_power: int, numbers, weights, rng: np.random.Generator, hourly_events: Optional[List[tuple]] = None, max_element_percentage: float = MAX_ELEMENT_PERCENTAGE) -> HourlyYield:
+    """
+    Simulate `hours` consecutive mining hours as array operations.
+
+    Each hour extracts 1..mining_power kg of material, of which up to `max_element_percentage`
+    is recoverable elements. Hourly events scale that hour's extraction. Element kg per hour are
+    split by `weights` with a multinomial draw, so each hour's breakdown sums exactly to its element yield.
+Every draw comes from `rng`, so a seeded generator reproduces the run.
+    """
+    hourly_events = DEFAULT_HOURLY_EVENTS if hourly_events is None else hourly_events
+    numbers = np.asarray(numbers, dtype=np.intp)
+    weights = np.asarray(weights, dtype=np.float64)
+
+    extracted_kg = rng.integers(1, mining_power, size=hours, endpoint=True)
+
+    probabilities = np.array([p for _, p, _ in hourly_events], dtype=np.float64)
+    effects = np.array([m for _, _, m in hourly_events], dtype=np.float64)
+    event_mask = rng.random((hours, len(hourly_events))) < probabilities
+    multipliers = np.where(event_mask, effects, 1.0).prod(axis=1)
+
+    element_fraction = rng.uniform(0.0, max_element_percentage, size=hours)
+    element_kg = (extracted_kg * element_fraction * multipliers).astype(np.int64)
+
+    if len(numbers) and weights.sum() > 0:
+        elements_kg = rng.multinomial(element_kg, weights / weights.sum())
+    else:
+        elements_kg = np.zeros((hours, len(numbers)), dtype=np.int64)
+        element_kg = np.zeros(hours, dtype=np.int64)
+
+    return HourlyYield(numbers, extracted_kg, element_kg, elements_kg, multipliers, event_mask, [name for name, _, _ in hourly_events])
+
+def hourly_events_from_config(config: Dict) -> Optional[List[tuple]]:
+    """
+    Read `hourly_events` from mining_globals ([{name, probability, yield_multiplier}, ...]); None keeps the defaults.
+    """
+    events = config.get("hourly_events")
+    if events is None:
+        return None
+    return [(e["name"], float(e["probability"]), float(e.get("yield_multiplier", 1.0))) for e in events]
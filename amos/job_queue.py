@@ -0,0 +1,184 @@
+import logging
+import os
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta, UTC
+from typing import Callable, Dict, Optional
+from bson import ObjectId
+from pymongo import ReturnDocument
+from config import MongoDBConfig
+
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+JOB_POLL_INTERVAL_SECONDS = 1.0
+JOB_HEARTBEAT_TIMEOUT_SECONDS = 120
+JOB_MAX_ATTEMPTS = 3
+
+db = MongoDBConfig.get_database()
+JOB_HANDLERS: Dict[str, Callable[[dict], Optional[dict]]] = {}
+
+def register_job_handler(job_type: str):
+    """
+    Decorator registering the function that processes jobs of `job_type`.
+    The handler receives the job document and may return a result dict stored on the job.
+    """
+    def decorator(func):
+        JOB_HANDLERS[job_type] = func
+        return func
+    return decorator
+
+def enqueue_job(job_type: str, params: dict = None, user_id: str = None, progress: dict = None, run_after: datetime = None) -> str:
+    """
+    Queue a job; with `run_after` no worker claims it before that time, which is how periodic jobs schedule their next run.
+    """
+    now = datetime.now(UTC)
+    job = {
+        "_id": ObjectId(),
+        "type": job_type,
+        "user_id": user_id,
+        "params": params or {},
+        "status": "queued",
+        "progress": progress or {},
+        "attempts": 0,
+        "created_at": now,
+        "run_after": run_after,
+        "started_at": None,
+        "heartbeat_at": None,
+        "finished_at": None,
+        "error": None
+    }
+    db.jobs.insert_one(job)
+    logging.info(f"Queued {job_type} job {job['_id']} for user {user_id}")
+    return str(job["_id"])
+
+def find_open_job(job_type: str, user_id: str, statuses: tuple = ("queued", "running")) -> Optional[dict]:
+    """
+    A queued or running job of this type for the user. Running jobs whose worker stopped heartbeating do not count.
+    """
+    stale = datetime.now(UTC) - timedelta(seconds=JOB_HEARTBEAT_TIMEOUT_SECONDS)
+    clauses = [{"status": status} if status != "running" else {"status": "running", "heartbeat_at": {"$gte": stale}} for status in statuses]
+    return db.jobs.find_one({"type": job_type, "user_id": user_id, "$or": clauses})
+
+def reap_dead_jobs(now: datetime = None) -> int:
+    """
+    Fail running jobs whose worker stopped heartbeating on their last attempt; nothing would ever claim them again.
+    """
+    now = now or datetime.now(UTC)
+    stale = now - timedelta(seconds=JOB_HEARTBEAT_TIMEOUT_SECONDS)
+    result = db.jobs.update_many(
+        {"status": "running", "heartbeat_at": {"$lt": stale}, "attempts": {"$gte": JOB_MAX_ATTEMPTS}},
+        {"$set": {"status": "failed", "error": f"Worker stopped responding after {JOB_MAX_ATTEMPTS} attempts", "finished_at": now}}
+    )
+    if result.modified_count:
+        logging.warning(f"Failed {result.modified_count} jobs abandoned on their last attempt")
+    return result.modified_count
+
+def claim_next_job(worker_id: str) -> Optional[dict]:
+    """
+    Atomically claim the oldest queued job that is due, or a running job whose worker stopped heartbeating.
+    """
+    now = datetime.now(UTC)
+    stale = now - timedelta(seconds=JOB_HEARTBEAT_TIMEOUT_SECONDS)
+    reap_dead_jobs(now)
+    return db.jobs.find_one_and_update(
+        {"$or": [{"status": "queued", "run_after": {"$not": {"$gt": now}}}, {"status": "running", "heartbeat_at": {"$lt": stale}}], "attempts": {"$lt": JOB_MAX_ATTEMPTS}},
+        {"$set": {"status": "running", "worker": worker_id, "started_at": now, "heartbeat_at": now}, "$inc": {"attempts": 1}},
+        sort=[("created_at", 1)],
+        return_document=ReturnDocument.AFTER
+    )
+
+def update_job_progress(job_id, **progress):
+    fields = {f"progress.{key}": value for key, value in progress.items()}
+    fields["heartbeat_at"] = datetime.now(UTC)
+    db.jobs.update_one({"_id": ObjectId(job_id)}, {"$set": fields})
+
+def finish_job(job_id, result: dict = None, error: str = None):
+    db.jobs.update_one(
+        {"_id": ObjectId(job_id)},
+        {"$set": {"status": "failed" if error else "done", "result": result or {}, "error": error, "finished_at": datetime.now(UTC)}}
+    )
+
+def get_job(job_id: str, user_id: str = None) -> Optional[dict]:
+    query = {"_id": ObjectId(job_id)}
+    if user_id is not None:
+        query["user_id"] = user_id
+    return db.jobs.find_one(query)
+
+def job_status(job: dict) -> dict:
+    """
+    Public view of a job: status, progress counters and an ETA extrapolated from the days simulated so far.
+    """
+    progress = job.get("progress", {})
+    eta_seconds = None
+    started_at = job.get("started_at")
+    if job["status"] == "running" and started_at:
+        if started_at.tzinfo is None:
+            started_at = started_at.replace(tzinfo=UTC)
+        elapsed = (datetime.now(UTC) - started_at).total_seconds()
+        done = progress.get("days_simulated", 0)
+        remaining = max(0, progress.get("days_estimated", 0) - done)
+        if done > 0:
+            eta_seconds = round(elapsed / done * remaining, 1)
+    elif job["status"] == "done":
+        eta_seconds = 0
+    return {
+        "job_id": str(job["_id"]),
+        "type": job["type"],
+        "status": job["status"],
+        "missions_total": progress.get("missions_total", 0),
+        "missions_done": progress.get("missions_done", 0),
+        "days_simulated": progress.get("days_simulated", 0),
+        "eta_seconds": eta_seconds,
+        "error": job.get("error"),
+        "created_at": job["created_at"].isoformat() if job.get("created_at") else None,
+        "finished_at": job["finished_at"].isoformat() if job.get("finished_at") else None
+    }
+
+def run_job(job: dict):
+    handler = JOB_HANDLERS.get(job["type"])
+    if not handler:
+        finish_job(job["_id"], error=f"No handler registered for job type {job['type']}")
+        return
+    try:
+        result = handler(job)
+        finish_job(job["_id"], result=result)
+        logging.info(f"Job {job['_id']} ({job['type']}) finished")
+    except Exception as e:
+        logging.exception(f"Job {job['_id']} ({job['type']}) failed: {e}")
+        finish_job(job["_id"], error=str(e))
+
+class JobWorkerPool:
+    """
+    Background threads that poll the `jobs` collection and run registered handlers.
+    Each uvicorn worker process runs its own pool; claiming is atomic so jobs run once.
+    """
+    def __init__(self, workers: int = JOB_WORKERS):
+        self.workers = workers
+        self._stop = threading.Event()
+        self._threads = []
+        self._prefix = f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+
+    def start(self):
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._loop, args=(f"{self._prefix}-{i}",), name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        logging.info(f"Started {self.workers} job workers ({self._prefix})")
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        for thread in self._threads:
+            thread.join(timeout)
+        self._threads = []
+
+    def _loop(self, worker_id: str):
+        while not self._stop.is_set():
+            try:
+                job = claim_next_job(worker_id)
+            except Exception as e:
+                logging.error(f"Job worker {worker_id}: Failed to claim job: {e}")
+                job = None
+            if job:
+                run_job(job)
+            else:
+                self._stop.wait(JOB_POLL_INTERVAL_SECONDS)
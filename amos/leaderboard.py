@@ -0,0 +1,108 @@
+import logging
+import time
+import uuid
+from datetime import datetime, timedelta, UTC
+from typing import List, Tuple
+import numpy as np
+import pymongo
+from pymongo import ReturnDocument
+from config import MongoDBConfig
+from utils.metrics import record_cache
+from amos.element_catalog import USE_CASES, element_catalog
+
+LEADERBOARD_COLLECTION = "leaderboard"
+LEADERBOARD_SIZE = 10
+LEADERBOARD_TTL_SECONDS = 60
+# A refresh that has not finished within this long is presumed dead and may be claimed again
+REFRESH_CLAIM_SECONDS = 30
+
+db = MongoDBConfig.get_database()
+
+def leaderboard_pipeline() -> List[dict]:
+    """
+    Rank every user by total profit over their finished missions and write the ranking to the leaderboard collection.
+
+    Missions are unwound per element and summed per user and element, so each row carries the user's mined kg by
+    element name; profit is taken from the first element row only. Users are unioned in with no missions, so
+    everyone is ranked as before.
+    """
+    return [
+        {"$match": {"status": {"$in": [1, 2]}}},
+        {"$project": {"_id": 0, "user_id": 1, "profit": 1, "elements.name": 1, "elements.mass_kg": 1}},
+        {"$unwind": {"path": "$elements", "includeArrayIndex": "element_index", "preserveNullAndEmptyArrays": True}},
+        {"$unionWith": {"coll": "users", "pipeline": [{"$project": {"_id": 0, "user_id": {"$toString": "$_id"}, "username": 1, "company": "$company_name", "bank": 1}}]}},
+        {"$group": {
+            "_id": {"user_id": "$user_id", "element": "$elements.name"},
+            "username": {"$max": "$username"},
+            "company": {"$max": "$company"},
+            "bank": {"$max": "$bank"},
+            "profit": {"$sum": {"$cond": [{"$gt": ["$element_index", 0]}, 0, "$profit"]}},
+            "mass_kg": {"$sum": "$elements.mass_kg"}
+        }},
+        {"$group": {
+            "_id": "$_id.user_id",
+            "username": {"$max": "$username"},
+            "company": {"$max": "$company"},
+            "bank": {"$max": "$bank"},
+            "total_profit": {"$sum": "$profit"},
+            "total_mass": {"$sum": "$mass_kg"},
+            "elements": {"$push": {"name": "$_id.element", "mass_kg": "$mass_kg"}}
+        }},
+        {"$match": {"username": {"$ne": None}}},  # Missions of deleted users
+        {"$setWindowFields": {"sortBy": {"total_profit": -1}, "output": {"rank": {"$rank": {}}}}},
+        {"$project": {
+            "user_id": "$_id", "username": 1, "company": 1, "bank": 1, "total_profit": 1, "rank": 1,
+            "elements": {"$filter": {"input": "$elements", "cond": {"$ne": ["$$this.name", None]}}},
+            "score": {"$add": ["$total_profit", {"$multiply": ["$total_mass", 1000]}]}
+        }},
+        {"$out": LEADERBOARD_COLLECTION}
+    ]
+
+def refresh_leaderboard():
+    started = time.perf_counter()
+    db.missions.aggregate(leaderboard_pipeline(), allowDiskUse=True)
+    db[LEADERBOARD_COLLECTION].create_index([("rank", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)])  # $out keeps it across refreshes
+    db.leaderboard_meta.update_one({"_id": LEADERBOARD_COLLECTION}, {"$set": {"refreshed_at": datetime.now(UTC)}, "$unset": {"claimed_by": "", "claim_expires_at": ""}}, upsert=True)
+    logging.info(f"Refreshed leaderboard in {time.perf_counter() - started:.2f}s")
+
+def claim_refresh(ttl_seconds: int) -> bool:
+    """
+    Claim the next leaderboard refresh if the current one is older than `ttl_seconds`, so only one worker runs the aggregation.
+    """
+    now = datetime.now(UTC)
+    try:
+        meta = db.leaderboard_meta.find_one_and_update(
+            {"_id": LEADERBOARD_COLLECTION,
+             "$and": [{"$or": [{"refreshed_at": {"$exists": False}}, {"refreshed_at": {"$lte": now - timedelta(seconds=ttl_seconds)}}]},
+                      {"$or": [{"claim_expires_at": {"$exists": False}}, {"claim_expires_at": {"$lte": now}}]}]},
+            {"$set": {"claimed_by": uuid.uuid4().hex, "claim_expires_at": now + timedelta(seconds=REFRESH_CLAIM_SECONDS)}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        return meta is not None
+    except pymongo.errors.DuplicateKeyError:
+        return False
+
+def load_leaderboard(user_id: str, size: int = LEADERBOARD_SIZE, ttl_seconds: int = LEADERBOARD_TTL_SECONDS) -> Tuple[List[dict], int]:
+    """
+    The top `size` leaderboard rows plus the caller's own row if it is not among them, and the caller's rank.
+    Each row's use_case_mass is derived from its element masses with the element catalog's use-case masks.
+    The ranking is shared by all workers and recomputed by whichever first finds it older than `ttl_seconds`;
+    the others keep serving the previous one meanwhile.
+    """
+    stale = claim_refresh(ttl_seconds) or not db.leaderboard_meta.find_one({"_id": LEADERBOARD_COLLECTION, "refreshed_at": {"$exists": True}})
+    record_cache("leaderboard", not stale)
+    if stale:
+        refresh_leaderboard()
+    rows = list(db[LEADERBOARD_COLLECTION].find({}).sort([("rank", pymongo.ASCENDING), ("_id", pymongo.ASCENDING)]).limit(size))
+    user_entry = next((row for row in rows if row["user_id"] == user_id), None)
+    if not user_entry:
+        user_entry = db[LEADERBOARD_COLLECTION].find_one({"_id": user_id})
+        if user_entry:
+            rows.append(user_entry)
+    user_rank = user_entry["rank"] if user_entry else db[LEADERBOARD_COLLECTION].estimated_document_count() + 1
+    catalog = element_catalog()
+    use_case_mass = catalog.use_case_mass(catalog.mass_matrix([{element["name"]: element["mass_kg"] for element in row["elements"]} for row in rows]))
+    for row, masses in zip(rows, use_case_mass.astype(np.int64).tolist()):
+        row["use_case_mass"] = dict(zip(USE_CASES, masses))
+    return rows, user_rank
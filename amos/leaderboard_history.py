@@ -0,0 +1,96 @@
+import logging
+from datetime import datetime, timedelta, UTC
+from typing import List, Optional
+import pymongo
+from pymongo import UpdateOne
+from config import MongoDBConfig
+from utils.helpers import ensure_time_series
+from amos.job_queue import enqueue_job, find_open_job, register_job_handler
+from amos.leaderboard import LEADERBOARD_COLLECTION, refresh_leaderboard
+
+SNAPSHOT_LEADERBOARD_JOB = "snapshot_leaderboard"
+RANK_HISTORY_COLLECTION = "leaderboard_history"
+SNAPSHOT_INTERVAL_SECONDS = 3600
+SNAPSHOT_BATCH_SIZE = 1000
+RANK_HISTORY_DAYS = 90
+
+db = MongoDBConfig.get_database()
+_history_ready = False
+
+def ensure_rank_history_collection():
+    global _history_ready
+    if not _history_ready:
+        ensure_time_series(RANK_HISTORY_COLLECTION, "company")
+        _history_ready = True
+
+def changed_rows_pipeline() -> List[dict]:
+    """
+    Leaderboard rows whose score or rank differs from the last snapshot taken of that user, joined on _id.
+    A rank moves whenever someone above overtakes, so it is compared along with the score.
+    """
+    return [
+        {"$lookup": {"from": "leaderboard_snapshot_state", "localField": "_id", "foreignField": "_id", "as": "previous"}},
+        {"$set": {"previous": {"$ifNull": [{"$first": "$previous"}, {}]}}},
+        {"$match": {"$expr": {"$or": [{"$ne": ["$score", "$previous.score"]}, {"$ne": ["$rank", "$previous.rank"]}]}}},
+        {"$project": {"company": 1, "score": 1, "rank": 1, "total_profit": 1}}
+    ]
+
+def snapshot_leaderboard(refresh: bool = True) -> dict:
+    """
+    Record a score and rank point for every company whose standing changed since the previous snapshot.
+    A company's trajectory is its points in time order; between points its standing is that of the last one.
+    """
+    ensure_rank_history_collection()
+    if refresh:
+        refresh_leaderboard()
+    now = datetime.now(UTC)
+    recorded = 0
+    batch = []
+
+    def flush():
+        db[RANK_HISTORY_COLLECTION].insert_many([
+            {"timestamp": now, "company": row["company"], "user_id": row["_id"], "score": row["score"], "rank": row["rank"], "total_profit": row["total_profit"]}
+            for row in batch
+        ])
+        db.leaderboard_snapshot_state.bulk_write([UpdateOne({"_id": row["_id"]}, {"$set": {"score": row["score"], "rank": row["rank"], "snapshot_at": now}}, upsert=True) for row in batch], ordered=False)
+
+    for row in db[LEADERBOARD_COLLECTION].aggregate(changed_rows_pipeline(), batchSize=SNAPSHOT_BATCH_SIZE):
+        batch.append(row)
+        if len(batch) == SNAPSHOT_BATCH_SIZE:
+            flush()
+            recorded += len(batch)
+            batch = []
+    if batch:
+        flush()
+        recorded += len(batch)
+    logging.info(f"Leaderboard snapshot recorded {recorded} changed companies")
+    return {"recorded": recorded}
+
+def rank_history(company: str, since: Optional[datetime] = None) -> List[dict]:
+    """
+    A company's score and rank points since `since` (RANK_HISTORY_DAYS ago by default), oldest first, from one range query on the history index.
+    """
+    ensure_rank_history_collection()
+    since = since or datetime.now(UTC) - timedelta(days=RANK_HISTORY_DAYS)
+    cursor = db[RANK_HISTORY_COLLECTION].find(
+        {"company": company, "timestamp": {"$gte": since}},
+        {"_id": 0, "timestamp": 1, "score": 1, "rank": 1, "total_profit": 1}
+    ).sort("timestamp", pymongo.ASCENDING)
+    return list(cursor)
+
+def schedule_leaderboard_snapshots(delay_seconds: int = 0):
+    """
+    Queue a snapshot unless one is already waiting. Each snapshot queues its successor this way, so there is one chain across workers.
+    """
+    if not find_open_job(SNAPSHOT_LEADERBOARD_JOB, None, statuses=("queued",)):
+        enqueue_job(SNAPSHOT_LEADERBOARD_JOB, run_after=datetime.now(UTC) + timedelta(seconds=delay_seconds))
+
+@register_job_handler(SNAPSHOT_LEADERBOARD_JOB)
+def handle_snapshot_leaderboard(job: dict) -> dict:
+    try:
+        return snapshot_leaderboard(**job.get("params", {}))
+    finally:
+        schedule_leaderboard_snapshots(SNAPSHOT_INTERVAL_SECONDS)
+
+if __name__ == "__main__":
+    print(snapshot_leaderboard())
@@ -1,15 +1,27 @@
 import pymongo
 from bson import ObjectId
 from datetime import datetime, UTC
+import itertools
 import logging
+from typing import Union
 import re
-import random
+import time
+import numpy as np
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
-from models.models import MissionModel, AsteroidElementModel, MissionDay, ShipModel, PyInt64, User
+from models.models import MissionDay, ShipModel, PyInt64, User
 from config import MongoDBConfig, LoggingConfig
-from amos.mine_asteroid import fetch_market_prices, simulate_travel_day, simulate_mining_day, HOURS_PER_DAY, calculate_confidence
+from utils.metrics import MISSION_PHASE_LATENCY
+from amos.mine_asteroid import fetch_market_prices, simulate_travel_day, simulate_mining_day, HOURS_PER_DAY, confidence_from_inputs
 from amos.event_processor import EventProcessor
+from amos.mission_concurrency import version_filter, next_version, process_mission_day
+from amos.sim_state import DayResult, MissionState, MissionContext, MissionEffects
+from amos.element_vector import ElementIndex, ElementVector, COMMODITY_MASK, price_vector
+from amos.asteroid_depletion import get_asteroid, deplete_asteroid, invalidate_asteroid, reserve_cached_mass
+from amos.sim_rng import mission_rng
+from amos.mission_log import append_mission_log, step_event
+from amos.day_series import DaySeries, SeriesDay, day_count, mission_days
+from amos.event_feed import append_feed
 
 db = MongoDBConfig.get_database()
 LoggingConfig.setup_logging(log_to_file=False)
@@ -45,37 +57,84 @@ def create_new_ship(user_id: str, ship_name: str, username: str, company_name: s
     return ShipModel(**ship_data)
 
 def get_day(summary) -> int:
-    return summary.day if isinstance(summary, MissionDay) else summary["day"]
+    return summary.day if isinstance(summary, (DayResult, SeriesDay, MissionDay)) else summary["day"]
 
 def get_elements_mined(summary) -> dict:
-    elements = summary.elements_mined if isinstance(summary, MissionDay) else summary.get("elements_mined")
+    elements = summary.elements_mined if isinstance(summary, (DayResult, SeriesDay, MissionDay)) else summary.get("elements_mined")
+    if isinstance(elements, ElementVector):
+        return elements.to_dict()
     return elements if elements is not None else {}
 
 def get_daily_value(summary) -> int:
-    value = summary.daily_value if isinstance(summary, MissionDay) else summary.get("daily_value", 0)
+    value = summary.daily_value if isinstance(summary, (DayResult, SeriesDay, MissionDay)) else summary.get("daily_value", 0)
     return value if value is not None else 0
 
-def process_single_mission(mission_raw: dict, day: int = None, api_event: dict = None, username: str = None, company_name: str = None) -> dict:
-    mission_id = str(mission_raw["_id"])
-    mission_raw_adjusted = mission_raw.copy()
-    if "target_yield_kg" in mission_raw_adjusted:
-        mission_raw_adjusted["target_yield_kg"] = PyInt64(mission_raw_adjusted["target_yield_kg"])
-    mission_raw_adjusted["confidence"] = mission_raw_adjusted.get("confidence", 0.0)
-    mission_raw_adjusted["predicted_profit_max"] = mission_raw_adjusted.get("predicted_profit_max", 0)
-    mission_raw_adjusted["ship_location"] = PyInt64(mission_raw_adjusted.get("ship_location", 0))
-    mission = MissionModel(**mission_raw_adjusted)
-    mission.yield_multiplier = mission_raw.get("yield_multiplier", 1.0)
-    mission.revenue_multiplier = mission_raw.get("revenue_multiplier", 1.0)
-    mission.travel_yield_mod = mission_raw.get("travel_yield_mod", 1.0)
-    mission.ship_repair_cost = PyInt64(mission_raw.get("ship_repair_cost", 0))
-    mission.events = mission_raw.get("events", [])
-    mission.daily_summaries = mission_raw.get("daily_summaries", [])
-    mission.previous_debt = PyInt64(mission_raw.get("previous_debt", 0))
-    mission.travel_delays = PyInt64(mission_raw.get("travel_delays", 0))
-    ship_name = mission_raw.get("ship_name")
-
-    logging.info(f"User {username}: Processing mission {mission_id} to {mission.asteroid_full_name} for company {company_name} with ship {ship_name}")
-
+def get_element_series(daily_summaries) -> dict:
+    """
+    Kg mined per day for each element, in first-mined order. Reads a DaySeries' mass columns directly.
+    """
+    if isinstance(daily_summaries, DaySeries):
+        return {name: list(column) for name, column in zip(daily_summaries.elements, zip(*daily_summaries.masses))} if len(daily_summaries) else {}
+    mined = [get_elements_mined(summary) for summary in daily_summaries]
+    names = list(dict.fromkeys(name for elements in mined for name in elements))
+    return {name: [elements.get(name, 0) for elements in mined] for name in names}
+
+def record_ship_destroyed(mission: MissionState, ship: dict, config_vars: dict, day: int, username: str = None):
+    # Update ship in the database
+    db.ships.update_one(
+        {"_id": ship["_id"]},
+        {"$set": {"active": False, "destroyed": True, "shield": ship["shield"], "hull": ship["hull"]}}
+    )
+    # Calculate cost of new ship and add to user's debt
+    new_ship_cost = config_vars["ship_cost"]
+    db.users.update_one(
+        {"_id": ObjectId(mission.user_id)},
+        {"$inc": {"current_loan": PyInt64(new_ship_cost)}}
+    )
+    logging.info(f"User {username}: Ship {ship['name']} destroyed on day {day}. Mission {mission.id} failed. Added ${new_ship_cost:,} debt for new ship.")
+
+@MISSION_PHASE_LATENCY.time("chart")
+def render_mission_graph(mission_id: str, daily_summaries: list) -> str:
+    fig = make_subplots(specs=[[{"secondary_y": True}]])
+    days = [f"Day {get_day(d)}" for d in daily_summaries]
+    element_series = get_element_series(daily_summaries)
+    colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEEAD'] * (len(element_series) // 5 + 1)
+    for i, (element, kg_per_day) in enumerate(element_series.items()):
+        fig.add_trace(
+            go.Bar(
+                x=days,
+                y=kg_per_day,
+                name=element,
+                marker_color=colors[i % len(colors)]
+            )
+        )
+    value_data = list(itertools.accumulate(get_daily_value(d) for d in daily_summaries))
+    fig.add_trace(
+        go.Scatter(
+            x=days,
+            y=value_data,
+            name="Value Accrued ($)",
+            line=dict(color="#00d4ff", width=2),
+            yaxis="y2"
+        ),
+        secondary_y=True
+    )
+    fig.update_layout(
+        barmode='stack',
+        title_text=f"Mining Progress (All Elements) - Mission {mission_id}",
+        xaxis_title="Day",
+        yaxis_title="Mass Mined (kg)",
+        yaxis2_title="Value ($)",
+        template="plotly_dark",
+        height=400
+    )
+    return fig.to_html(full_html=False, include_plotlyjs='cdn')
+
+def load_mission_context(mission: MissionState, username: str = None, company_name: str = None) -> Union[MissionContext, dict]:
+    """
+    Read everything a mission day needs besides the mission itself. Returns an error dict if the database or a document is unavailable.
+    """
+    ship_name = mission.ship_name
     try:
         config = db.config.find_one({"name": "mining_globals"})
         if not config:
@@ -85,6 +144,12 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
         return {"error": "Trouble accessing the database, please try again later"}
     config_vars = config["variables"]
 
+    try:
+        events = list(db.events.find())
+    except pymongo.errors.AutoReconnect as e:
+        logging.error(f"User {username}: Failed to fetch events from MongoDB: {e}")
+        return {"error": "Trouble accessing the database, please try again later"}
+
     try:
         ship = db.ships.find_one({"user_id": mission.user_id, "name": ship_name})
     except pymongo.errors.AutoReconnect as e:
@@ -92,14 +157,14 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
         return {"error": "Trouble accessing the database, please try again later"}
     
     if not ship:
-        logging.error(f"User {username}: Ship {ship_name} not found for mission {mission_id}")
+        logging.error(f"User {username}: Ship {ship_name} not found for mission {mission.id}")
         return {"error": f"Ship {ship_name} not found"}
-    ship_model = ShipModel(**ship)
-    mission.target_yield_kg = PyInt64(ship_model.capacity)
-    logging.info(f"User {username}: Using ship {ship_name} with capacity {ship_model.capacity} kg, mining_power {ship_model.mining_power} kg/hour for company {company_name}")
+    mining_power = ship["mining_power"]
+    target_yield_kg = PyInt64(ship["capacity"])
+    logging.info(f"User {username}: Using ship {ship_name} with capacity {ship['capacity']} kg, mining_power {mining_power} kg/hour for company {company_name}")
 
     try:
-        asteroid = db.asteroids.find_one({"full_name": mission.asteroid_full_name})
+        asteroid = get_asteroid(mission.asteroid_full_name)
     except pymongo.errors.AutoReconnect as e:
         logging.error(f"User {username}: Failed to fetch asteroid {mission.asteroid_full_name}: {e}")
         return {"error": "Trouble accessing the database, please try again later"}
@@ -107,56 +172,99 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
     if not asteroid:
         logging.error(f"User {username}: No asteroid found with full_name {mission.asteroid_full_name}")
         return {"error": f"400: No asteroid found with full_name {mission.asteroid_full_name}"}
-    logging.info(f"User {username}: Asteroid {mission.asteroid_full_name} loaded, moid_days: {asteroid['moid_days']} for company {company_name}, elements: {asteroid['elements']}")
+    logging.info(f"User {username}: Asteroid {mission.asteroid_full_name} loaded, moid_days: {asteroid['moid_days']} for company {company_name}, {len(asteroid['elements'])} elements")
 
     try:
-        user_dict = db.users.find_one({"_id": ObjectId(mission.user_id)})
-        user = User(**{**user_dict, "_id": str(user_dict["_id"])})  # Convert dict to User object
-        if user and "company_name" in user_dict and not company_name:
-            company_name = user.company_name
+        user_dict = db.users.find_one({"_id": ObjectId(mission.user_id)}, {"company_name": 1, "loan_count": 1, "max_overrun_days": 1}) or {}
+        if "company_name" in user_dict and not company_name:
+            company_name = user_dict["company_name"]
         elif not company_name:
             company_name = mission.company
-        max_overrun_days = user.max_overrun_days if user.max_overrun_days is not None else 10
+        max_overrun_days = user_dict.get("max_overrun_days")
+        max_overrun_days = max_overrun_days if max_overrun_days is not None else 10
     except pymongo.errors.AutoReconnect as e:
         logging.error(f"User {username}: Failed to fetch user for user_id {mission.user_id}: {e}")
         company_name = mission.company
         max_overrun_days = 10
+        user_dict = {}
 
-    daily_yield_rate = PyInt64(ship_model.mining_power * HOURS_PER_DAY * config_vars["max_element_percentage"])
-    confidence, profit_min, profit_max = calculate_confidence(asteroid["moid_days"], ship_model.mining_power, mission.target_yield_kg, daily_yield_rate, max_overrun_days, len(ship_model.missions) > 0)
+    daily_yield_rate = PyInt64(mining_power * HOURS_PER_DAY * config_vars["max_element_percentage"])
+    prices = fetch_market_prices()
+    confidence, profit_min, profit_max = confidence_from_inputs(config_vars, prices, asteroid["moid_days"], mining_power, target_yield_kg, max_overrun_days, len(ship.get("missions", [])) > 0)
     confidence = confidence if confidence is not None else 0.0
     profit_max = PyInt64(profit_max if profit_max is not None else 0)
     logging.info(f"User {username}: Confidence: {confidence:.2f}%, Predicted profit range: ${profit_min:,} to ${profit_max:,} for company {company_name}, ship {ship_name}")
 
-    elements = asteroid["elements"]
-    commodity_factor = asteroid.get("commodity_factor", 1.0)
     base_travel_days = PyInt64(asteroid["moid_days"])
-    estimated_mining_days = PyInt64(int(mission.target_yield_kg / daily_yield_rate))
-    scheduled_days = PyInt64((base_travel_days * 2) + estimated_mining_days)
-
+    estimated_mining_days = PyInt64(int(target_yield_kg / daily_yield_rate))
+    return MissionContext(
+        config_vars=config_vars,
+        events=events,
+        ship=ship,
+        company_name=company_name,
+        max_overrun_days=max_overrun_days,
+        loan_count=user_dict.get("loan_count", 0),
+        prices=prices,
+        confidence=confidence,
+        profit_min=profit_min,
+        profit_max=profit_max,
+        base_travel_days=base_travel_days,
+        estimated_mining_days=estimated_mining_days,
+        scheduled_days=PyInt64((base_travel_days * 2) + estimated_mining_days)
+    )
+
+def simulate_mission_day(mission_raw: dict, ctx: MissionContext, effects: MissionEffects, day: int = None, api_event: dict = None, username: str = None, render_graph: bool = True, dry_run: bool = False) -> dict:
+    """
+    Simulate one day of a mission and return the fields to store; the mission itself is never written here.
+    Mining days reserve asteroid mass in the cache, applied by persist_mission once the write wins, unless `dry_run` is set.
+    Writes that must wait for the mission write (ship loss, ship location) are recorded on `effects`.
+    """
+    mission_id = str(mission_raw["_id"])
+    mission = MissionState.from_document(mission_raw)
+    ship_name = mission.ship_name
+    company_name = ctx.company_name
+    config_vars = ctx.config_vars
+    ship = dict(ctx.ship)  # Shield and hull damage only persist through a destroyed ship
+    mining_power = ship["mining_power"]
+    mission.target_yield_kg = PyInt64(ship["capacity"])
+    max_overrun_days = ctx.max_overrun_days
+    loan_count = ctx.loan_count
+    confidence = ctx.confidence
+    profit_max = ctx.profit_max
+    base_travel_days = ctx.base_travel_days
+    estimated_mining_days = ctx.estimated_mining_days
+    scheduled_days = ctx.scheduled_days
     deadline_overrun_fine_per_day = PyInt64(config_vars["deadline_overrun_fine_per_day"])
-    prices = fetch_market_prices()
+    prices = ctx.prices
+
+    # Composition comes from the depletion-aware cache, so it reflects earlier days of this advance
+    asteroid = get_asteroid(mission.asteroid_full_name)
+    elements = asteroid["elements"]
+    commodity_factor = asteroid.get("commodity_factor", 1.0)
 
     # Include all elements with weights, not repetitions
+    weights_rng = mission_rng(mission.seed, day, "weights")
     weighted_elements = []
     for elem in elements:
         elem_name = elem["name"] if isinstance(elem, dict) else elem
         if elem["mass_kg"] > 0:  # Only include elements present in the asteroid
             if elem_name in ["Platinum", "Gold"]:
-                weight = config_vars["commodity_factor_platinum_gold"] * commodity_factor * random.uniform(5, 10)
+                weight = config_vars["commodity_factor_platinum_gold"] * commodity_factor * weights_rng.uniform(5, 10)
             elif elem_name in COMMODITIES:
-                weight = config_vars["commodity_factor_other"] * commodity_factor * random.uniform(3, 5)
+                weight = config_vars["commodity_factor_other"] * commodity_factor * weights_rng.uniform(3, 5)
             else:
-                weight = config_vars["non_commodity_weight"] * random.uniform(1, 2)
-            weighted_elements.append({"name": elem_name, "mass_kg": elem["mass_kg"], "weight": weight})
+                weight = config_vars["non_commodity_weight"] * weights_rng.uniform(1, 2)
+            weighted_elements.append({"name": elem_name, "number": elem["number"], "mass_kg": elem["mass_kg"], "weight": weight})
 
-    elements_mined = mission_raw.get("elements_mined", {})
-    events = mission_raw.get("events", [])
-    daily_summaries = mission_raw.get("daily_summaries", [])
+    element_index = ElementIndex(elements)
+    elements_mined = element_index.vector(mission_raw.get("elements_mined", {}))
+    events = list(mission_raw.get("events", []))  # Copied so the document before this day keeps its own events
+    # Series rows so settlement can rescale stored days in place, whichever format the mission was read in
+    daily_summaries = list(DaySeries.from_summaries(mission_days(mission_raw)))
 
-    total_yield_kg = PyInt64(mission_raw.get("total_yield_kg", sum(int(kg) for kg in elements_mined.values())))
+    total_yield_kg = PyInt64(mission_raw.get("total_yield_kg", elements_mined.total()))
     days_into_mission = PyInt64(len(daily_summaries))
-    ship_location = PyInt64(mission_raw.get("ship_location", ship_model.location))
+    ship_location = PyInt64(mission_raw.get("ship_location", ship.get("location", 0)))
     mission_cost = PyInt64(mission_raw.get("mission_cost", 0))
     mission_projection = PyInt64(mission_raw.get("mission_projection", profit_max))
 
@@ -170,6 +278,9 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
     confidence_result = ""
     graph_html = ""
     mined_elements = []
+    destroyed_on_day = None
+    depleted = None
+    should_return = False
 
     logging.info(f"User {username}: Day {day}, Ship Location: {ship_location}, Total Yield: {total_yield_kg} kg, Base Travel: {base_travel_days}, Mining Days: {estimated_mining_days}, Scheduled: {scheduled_days}, Delays: {mission.travel_delays}, Elements Mined: {elements_mined}")
 
@@ -188,23 +299,12 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
                 travel_day = day + i
                 day_summary = simulate_travel_day(mission, travel_day, is_return=True)
                 # Apply events for the travel phase
-                day_summary, ship_destroyed = EventProcessor.apply_daily_events(mission, day_summary, elements_mined, ship, api_event)
+                day_summary, ship_destroyed = EventProcessor.apply_daily_events(mission, day_summary, elements_mined, ship, ctx.events, api_event)
                 if ship_destroyed:
-                    # Fail the mission due to ship destruction
+                    # Fail the mission due to ship destruction; ship and debt writes wait for the mission write to win
                     mission.status = 2  # 2 indicates "failed"
                     mission.completed_at = datetime.now(UTC)
-                    # Update ship in the database
-                    db.ships.update_one(
-                        {"_id": ObjectId(ship_model.id)},
-                        {"$set": {"active": False, "destroyed": True, "shield": ship["shield"], "hull": ship["hull"]}}
-                    )
-                    # Calculate cost of new ship and add to user's debt
-                    new_ship_cost = config_vars["ship_cost"]
-                    db.users.update_one(
-                        {"_id": ObjectId(mission.user_id)},
-                        {"$inc": {"current_loan": PyInt64(new_ship_cost)}}
-                    )
-                    logging.info(f"User {username}: Ship {ship_name} destroyed on day {travel_day}. Mission {mission_id} failed. Added ${new_ship_cost:,} debt for new ship.")
+                    destroyed_on_day = travel_day
                     break
                 daily_summaries.append(day_summary)
                 ship_location = PyInt64(max(0, ship_location - 1))
@@ -212,21 +312,16 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
                 logging.info(f"User {username}: Day {travel_day} - Forced return due to overrun, Ship Location: {ship_location}")
             days_into_mission = PyInt64(len(daily_summaries))
             if ship_location == 0 and mission.status != 2:  # Only proceed if mission hasn't failed
-                prices = fetch_market_prices()
-                total_revenue = PyInt64(0)
                 logging.info(f"User {username}: Ship returned to Earth, selling cargo: {elements_mined}")
-                for name, kg in elements_mined.items():
-                    price_per_kg = prices.get(name, 0) if name in COMMODITIES else PyInt64(0)
-                    element_value = PyInt64(kg * price_per_kg)
-                    total_revenue += element_value
-                    logging.info(f"User {username}: Sold {name}: {kg} kg x ${price_per_kg}/kg = ${element_value} for company {company_name}, ship {ship_name}")
+                total_revenue = PyInt64(elements_mined.value(price_vector(prices)))
+                logging.info(f"User {username}: Sold commodities {elements_mined.to_dict(COMMODITY_MASK)} for ${total_revenue:,} for company {company_name}, ship {ship_name}")
                 total_revenue = PyInt64(int(total_revenue * mission.revenue_multiplier))
                 total_cost = PyInt64(mission_cost)
                 profit = PyInt64(total_revenue - total_cost)
                 minimum_funding = PyInt64(config_vars["minimum_funding"])
                 if profit < minimum_funding:
                     investor_loan = PyInt64(config_vars["investor_loan_amount"])
-                    interest_rate = config_vars["loan_interest_rates"][min(user.loan_count, len(config_vars["loan_interest_rates"]) - 1)]
+                    interest_rate = config_vars["loan_interest_rates"][min(loan_count, len(config_vars["loan_interest_rates"]) - 1)]
                     investor_repayment = PyInt64(int(investor_loan * interest_rate))
                     total_cost += investor_repayment
                     profit = PyInt64(total_revenue - total_cost)
@@ -237,48 +332,36 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
         elif day <= base_travel_days:
             day_summary = simulate_travel_day(mission, day)
             # Apply events for the travel phase
-            day_summary, ship_destroyed = EventProcessor.apply_daily_events(mission, day_summary, elements_mined, ship, api_event)
+            day_summary, ship_destroyed = EventProcessor.apply_daily_events(mission, day_summary, elements_mined, ship, ctx.events, api_event)
             if ship_destroyed:
-                # Fail the mission due to ship destruction
+                # Fail the mission due to ship destruction; ship and debt writes wait for the mission write to win
                 mission.status = 2  # 2 indicates "failed"
                 mission.completed_at = datetime.now(UTC)
-                # Update ship in the database
-                db.ships.update_one(
-                    {"_id": ObjectId(ship_model.id)},
-                    {"$set": {"active": False, "destroyed": True, "shield": ship["shield"], "hull": ship["hull"]}}
-                )
-                # Calculate cost of new ship and add to user's debt
-                new_ship_cost = config_vars["ship_cost"]
-                db.users.update_one(
-                    {"_id": ObjectId(mission.user_id)},
-                    {"$inc": {"current_loan": PyInt64(new_ship_cost)}}
-                )
-                logging.info(f"User {username}: Ship {ship_name} destroyed on day {day}. Mission {mission_id} failed. Added ${new_ship_cost:,} debt for new ship.")
+                destroyed_on_day = day
             else:
                 ship_location = PyInt64(ship_location + 1)
                 mission_cost += PyInt64(config_vars["daily_mission_cost"])
                 logging.info(f"User {username}: Day {day} - Travel out, Ship Location: {ship_location}")
         elif total_yield_kg < mission.target_yield_kg:
-            day_summary = simulate_mining_day(mission, day, weighted_elements, elements_mined, api_event, ship_model.mining_power, prices, base_travel_days)
+            day_summary = simulate_mining_day(mission, day, weighted_elements, elements_mined, api_event, mining_power, prices, base_travel_days, config_vars)
             # Apply events for the mining phase
-            day_summary, ship_destroyed = EventProcessor.apply_daily_events(mission, day_summary, elements_mined, ship, api_event)
+            day_summary, ship_destroyed = EventProcessor.apply_daily_events(mission, day_summary, elements_mined, ship, ctx.events, api_event)
             if ship_destroyed:
-                # Fail the mission due to ship destruction
+                # Fail the mission due to ship destruction; ship and debt writes wait for the mission write to win
                 mission.status = 2  # 2 indicates "failed"
                 mission.completed_at = datetime.now(UTC)
-                # Update ship in the database
-                db.ships.update_one(
-                    {"_id": ObjectId(ship_model.id)},
-                    {"$set": {"active": False, "destroyed": True, "shield": ship["shield"], "hull": ship["hull"]}}
-                )
-                # Calculate cost of new ship and add to user's debt
-                new_ship_cost = config_vars["ship_cost"]
-                db.users.update_one(
-                    {"_id": ObjectId(mission.user_id)},
-                    {"$inc": {"current_loan": PyInt64(new_ship_cost)}}
-                )
-                logging.info(f"User {username}: Ship {ship_name} destroyed on day {day}. Mission {mission_id} failed. Added ${new_ship_cost:,} debt for new ship.")
+                destroyed_on_day = day
             else:
+                # Take the day's haul out of the asteroid; anything other companies already removed is not delivered
+                if not dry_run:
+                    depleted = reserve_cached_mass(mission.asteroid_full_name, day_summary.elements_mined)
+                    shortfall = day_summary.elements_mined.mass - depleted.mass
+                if depleted is not None and shortfall.any():
+                    elements_mined.mass = np.maximum(elements_mined.mass - shortfall, 0)
+                    day_summary.elements_mined = depleted
+                    day_summary.total_kg = PyInt64(depleted.total())
+                    day_summary.daily_value = PyInt64(depleted.value(price_vector(prices)))
+                    day_summary.note += f" - {int(shortfall.sum())} kg unavailable (depleted)"
                 ship_location = base_travel_days
                 total_yield_kg = PyInt64(total_yield_kg + day_summary.total_kg)
                 mission_cost += PyInt64(config_vars["daily_mission_cost"])
@@ -288,43 +371,27 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
         else:
             day_summary = simulate_travel_day(mission, day, is_return=True)
             # Apply events for the travel phase
-            day_summary, ship_destroyed = EventProcessor.apply_daily_events(mission, day_summary, elements_mined, ship, api_event)
+            day_summary, ship_destroyed = EventProcessor.apply_daily_events(mission, day_summary, elements_mined, ship, ctx.events, api_event)
             if ship_destroyed:
-                # Fail the mission due to ship destruction
+                # Fail the mission due to ship destruction; ship and debt writes wait for the mission write to win
                 mission.status = 2  # 2 indicates "failed"
                 mission.completed_at = datetime.now(UTC)
-                # Update ship in the database
-                db.ships.update_one(
-                    {"_id": ObjectId(ship_model.id)},
-                    {"$set": {"active": False, "destroyed": True, "shield": ship["shield"], "hull": ship["hull"]}}
-                )
-                # Calculate cost of new ship and add to user's debt
-                new_ship_cost = config_vars["ship_cost"]
-                db.users.update_one(
-                    {"_id": ObjectId(mission.user_id)},
-                    {"$inc": {"current_loan": PyInt64(new_ship_cost)}}
-                )
-                logging.info(f"User {username}: Ship {ship_name} destroyed on day {day}. Mission {mission_id} failed. Added ${new_ship_cost:,} debt for new ship.")
+                destroyed_on_day = day
             else:
                 ship_location = PyInt64(max(0, ship_location - 1))
                 mission_cost += PyInt64(config_vars["daily_mission_cost"])
                 logging.info(f"User {username}: Day {day} - Return, Ship Location: {ship_location}")
                 if ship_location == 0:
-                    prices = fetch_market_prices()
-                    total_revenue = PyInt64(0)
                     logging.info(f"User {username}: Ship returned to Earth, selling cargo: {elements_mined}")
-                    for name, kg in elements_mined.items():
-                        price_per_kg = prices.get(name, 0) if name in COMMODITIES else PyInt64(0)
-                        element_value = PyInt64(kg * price_per_kg)
-                        total_revenue += element_value
-                        logging.info(f"User {username}: Sold {name}: {kg} kg x ${price_per_kg}/kg = ${element_value} for company {company_name}, ship {ship_name}")
+                    total_revenue = PyInt64(elements_mined.value(price_vector(prices)))
+                    logging.info(f"User {username}: Sold commodities {elements_mined.to_dict(COMMODITY_MASK)} for ${total_revenue:,} for company {company_name}, ship {ship_name}")
                     total_revenue = PyInt64(int(total_revenue * mission.revenue_multiplier))
                     total_cost = PyInt64(mission_cost)
                     profit = PyInt64(total_revenue - total_cost)
                     minimum_funding = PyInt64(config_vars["minimum_funding"])
                     if profit < minimum_funding:
                         investor_loan = PyInt64(config_vars["investor_loan_amount"])
-                        interest_rate = config_vars["loan_interest_rates"][min(user.loan_count, len(config_vars["loan_interest_rates"]) - 1)]
+                        interest_rate = config_vars["loan_interest_rates"][min(loan_count, len(config_vars["loan_interest_rates"]) - 1)]
                         investor_repayment = PyInt64(int(investor_loan * interest_rate))
                         total_cost += investor_repayment
                         profit = PyInt64(total_revenue - total_cost)
@@ -352,75 +419,29 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
         days_into_mission = PyInt64(len(daily_summaries))
         days_left = PyInt64(max(0, scheduled_days + mission.travel_delays - days_into_mission) if total_yield_kg < mission.target_yield_kg and not should_return else base_travel_days - ship_location)
 
-        fig = make_subplots(specs=[[{"secondary_y": True}]])
-        days = [f"Day {get_day(d)}" for d in daily_summaries]
-        all_elements = set()
-        for summary in daily_summaries:
-            all_elements.update(get_elements_mined(summary).keys())
-        elements = list(all_elements)
-        colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEEAD'] * (len(elements) // 5 + 1)
-        for i, element in enumerate(elements):
-            fig.add_trace(
-                go.Bar(
-                    x=days,
-                    y=[get_elements_mined(d).get(element, 0) for d in daily_summaries],
-                    name=element,
-                    marker_color=colors[i % len(colors)]
-                )
-            )
-        value_data = [sum(get_daily_value(d) for d in daily_summaries[:i+1]) for i in range(len(daily_summaries))]
-        fig.add_trace(
-            go.Scatter(
-                x=days,
-                y=value_data,
-                name="Value Accrued ($)",
-                line=dict(color="#00d4ff", width=2),
-                yaxis="y2"
-            ),
-            secondary_y=True
-        )
-        fig.update_layout(
-            barmode='stack',
-            title_text=f"Mining Progress (All Elements) - Mission {mission_id}",
-            xaxis_title="Day",
-            yaxis_title="Mass Mined (kg)",
-            yaxis2_title="Value ($)",
-            template="plotly_dark",
-            height=400
-        )
-        graph_html = fig.to_html(full_html=False, include_plotlyjs='cdn')
+        graph_html = render_mission_graph(mission_id, daily_summaries) if render_graph else ""
         
-        mined_elements = [
-            AsteroidElementModel(
-                name=name,
-                mass_kg=kg,
-                number=int([e["number"] for e in elements if isinstance(e, dict) and e.get("name") == name][0]) if any(isinstance(e, dict) and e.get("name") == name for e in elements) else 0
-            )
-            for name, kg in elements_mined.items() if kg > 0
-        ]
+        mined_elements = elements_mined.to_elements()
     else:
-        commodity_total_kg = PyInt64(sum(kg for name, kg in elements_mined.items() if name in COMMODITIES))
-        non_commodity_total_kg = PyInt64(sum(kg for name, kg in elements_mined.items() if name not in COMMODITIES))
-        target_commodity_kg = PyInt64(int(mission.target_yield_kg * random.uniform(0.4, 0.6)))
+        commodity_total_kg = PyInt64(elements_mined.total(COMMODITY_MASK))
+        non_commodity_total_kg = PyInt64(elements_mined.total(~COMMODITY_MASK))
+        target_commodity_kg = PyInt64(int(mission.target_yield_kg * mission_rng(mission.seed, days_into_mission, "settlement").uniform(0.4, 0.6)))
         target_non_commodity_kg = PyInt64(mission.target_yield_kg - target_commodity_kg)
         
+        scale = 1
         if commodity_total_kg != target_commodity_kg:
             scale = target_commodity_kg / commodity_total_kg if commodity_total_kg > 0 else 1
-            for name in list(elements_mined.keys()):
-                if name in COMMODITIES:
-                    elements_mined[name] = PyInt64(int(elements_mined[name] * scale))
-            commodity_total_kg = PyInt64(sum(kg for name, kg in elements_mined.items() if name in COMMODITIES))
+            elements_mined.scale(scale, COMMODITY_MASK)
+            commodity_total_kg = PyInt64(elements_mined.total(COMMODITY_MASK))
         
         total_yield_kg = PyInt64(commodity_total_kg + non_commodity_total_kg)
         if total_yield_kg < mission.target_yield_kg:
             shortfall = PyInt64(mission.target_yield_kg - total_yield_kg)
-            non_commodity_count = sum(1 for n in elements_mined if n not in COMMODITIES)
+            non_commodity_present = elements_mined.present() & ~COMMODITY_MASK
+            non_commodity_count = int(non_commodity_present.sum())
             if non_commodity_count > 0:
-                per_non_commodity = PyInt64(shortfall // non_commodity_count)
-                for name in elements_mined:
-                    if name not in COMMODITIES:
-                        elements_mined[name] += per_non_commodity
-            total_yield_kg = PyInt64(sum(elements_mined.values()))
+                elements_mined.mass[non_commodity_present] += shortfall // non_commodity_count
+            total_yield_kg = PyInt64(elements_mined.total())
         
         for summary in daily_summaries:
             summary_day = get_day(summary)
@@ -429,18 +450,11 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
                 summary.total_kg = PyInt64(int(summary.total_kg * (total_yield_kg / total_kg_sum)) if total_kg_sum > 0 else summary.total_kg)
                 elements_mined_dict = get_elements_mined(summary)
                 if elements_mined_dict:
-                    for elem_name in elements_mined_dict:
-                        elements_mined_dict[elem_name] = int(elements_mined_dict[elem_name] * scale)
-                    summary.daily_value = PyInt64(sum(elements_mined_dict.get(name, 0) * prices.get(name, 0) for name in elements_mined_dict))
-
-        mined_elements = [
-            AsteroidElementModel(
-                name=name,
-                mass_kg=kg,
-                number=int([e["number"] for e in elements if isinstance(e, dict) and e.get("name") == name][0]) if any(isinstance(e, dict) and e.get("name") == name for e in elements) else 0
-            )
-            for name, kg in elements_mined.items() if kg > 0
-        ]
+                    # get_elements_mined returns a copy, so the scaled masses are written back to the row
+                    summary.elements_mined = {elem_name: int(kg * scale) for elem_name, kg in elements_mined_dict.items()}
+                    summary.daily_value = PyInt64(sum(kg * prices.get(name, 0) for name, kg in get_elements_mined(summary).items()))
+
+        mined_elements = elements_mined.to_elements()
 
         total_cost = PyInt64(mission_cost)
         cost_reduction_applied = False
@@ -461,19 +475,14 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
         penalties += budget_overrun
 
         investor_loan = PyInt64(config_vars["investor_loan_amount"]) if not mission.rocket_owned else PyInt64(0)
-        interest_rate = config_vars["loan_interest_rates"][min(user.loan_count, len(config_vars["loan_interest_rates"]) - 1)] if not mission.rocket_owned else 0
+        interest_rate = config_vars["loan_interest_rates"][min(loan_count, len(config_vars["loan_interest_rates"]) - 1)] if not mission.rocket_owned else 0
         investor_repayment = PyInt64(int(investor_loan * interest_rate))
         ship_repair_cost = mission.ship_repair_cost or PyInt64(0)
         total_expenses = PyInt64(total_cost + penalties + investor_repayment + ship_repair_cost + mission.previous_debt)
 
         logging.info(f"User {username}: Calculating revenue from mined elements for company {company_name}, ship {ship_name}")
-        total_revenue = PyInt64(0)
-        for name, kg in elements_mined.items():
-            price_per_kg = prices.get(name, 0) if name in COMMODITIES else PyInt64(0)
-            element_value = PyInt64(kg * price_per_kg)
-            total_revenue += element_value
-            if name in COMMODITIES:
-                logging.info(f"User {username}: {name}: {kg} kg x ${price_per_kg}/kg = ${element_value} for company {company_name}, ship {ship_name}")
+        total_revenue = PyInt64(elements_mined.value(price_vector(prices)))
+        logging.info(f"User {username}: Commodities {elements_mined.to_dict(COMMODITY_MASK)} valued at ${total_revenue:,} for company {company_name}, ship {ship_name}")
         total_revenue = PyInt64(int(total_revenue * mission.revenue_multiplier))
 
         profit = PyInt64(total_revenue - total_expenses)
@@ -482,7 +491,7 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
         if profit < minimum_funding:
             logging.info(f"User {username}: Profit {profit} below {minimum_funding} - taking ${investor_loan:,} loan at {interest_rate}x for company {company_name}, ship {ship_name}")
             investor_loan = PyInt64(config_vars["investor_loan_amount"])
-            interest_rate = config_vars["loan_interest_rates"][min(user.loan_count, len(config_vars["loan_interest_rates"]) - 1)]
+            interest_rate = config_vars["loan_interest_rates"][min(loan_count, len(config_vars["loan_interest_rates"]) - 1)]
             investor_repayment = PyInt64(int(investor_loan * interest_rate))
             total_expenses += investor_repayment
             profit = PyInt64(total_revenue - total_expenses)
@@ -495,58 +504,15 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
         logging.info(f"User {username}: Total cost: {total_cost}, Penalties: {penalties}, Investor repayment: {investor_repayment}, Ship repair: {ship_repair_cost}, Previous debt: {mission.previous_debt}, Total expenses: {total_expenses}, Revenue: {total_revenue} for company {company_name}, ship {ship_name}")
         logging.info(f"User {username}: Confidence result: {confidence_result} for company {company_name}, ship {ship_name}")
 
-        fig = make_subplots(specs=[[{"secondary_y": True}]])
-        days = [f"Day {get_day(d)}" for d in daily_summaries]
-        all_elements = set()
-        for summary in daily_summaries:
-            all_elements.update(get_elements_mined(summary).keys())
-        elements = list(all_elements)
-        colors = ['#FF6B6B', '#4ECDC4', '#45B7D1', '#96CEB4', '#FFEEAD'] * (len(elements) // 5 + 1)
-        for i, element in enumerate(elements):
-            fig.add_trace(
-                go.Bar(
-                    x=days,
-                    y=[get_elements_mined(d).get(element, 0) for d in daily_summaries],
-                    name=element,
-                    marker_color=colors[i % len(colors)]
-                )
-            )
-        value_data = [sum(get_daily_value(d) for d in daily_summaries[:i+1]) for i in range(len(daily_summaries))]
-        fig.add_trace(
-            go.Scatter(
-                x=days,
-                y=value_data,
-                name="Value Accrued ($)",
-                line=dict(color="#00d4ff", width=2),
-                yaxis="y2"
-            ),
-            secondary_y=True
-        )
-        fig.update_layout(
-            barmode='stack',
-            title_text=f"Mining Progress (All Elements) - Mission {mission_id}",
-            xaxis_title="Day",
-            yaxis_title="Mass Mined (kg)",
-            yaxis2_title="Value ($)",
-            template="plotly_dark",
-            height=400
-        )
-        graph_html = fig.to_html(full_html=False, include_plotlyjs='cdn')
+        graph_html = render_mission_graph(mission_id, daily_summaries) if render_graph else ""
 
     days_left = PyInt64(max(0, scheduled_days + mission.travel_delays - days_into_mission) if total_yield_kg < mission.target_yield_kg and not should_return else base_travel_days - ship_location)
 
-    serialized_summaries = []
-    for summary in daily_summaries:
-        if isinstance(summary, MissionDay):
-            serialized_summaries.append(summary.dict())
-        elif isinstance(summary, dict):
-            serialized_summaries.append(summary)
-        else:
-            logging.error(f"Unexpected type in daily_summaries: {type(summary)}")
-            return {"error": "Invalid daily summary format"}
+    day_series = DaySeries.from_summaries(daily_summaries).to_document()
 
     update_data = {
         "user_id": mission.user_id,
+        "seed": mission.seed,
         "company": company_name,
         "ship_name": ship_name,
         "asteroid_full_name": mission.asteroid_full_name,
@@ -557,8 +523,8 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
         "scheduled_days": scheduled_days,
         "budget": mission.budget,
         "status": mission.status,
-        "elements": [elem.model_dump() for elem in mined_elements],
-        "elements_mined": elements_mined,
+        "elements": mined_elements,
+        "elements_mined": elements_mined.to_dict(),
         "cost": total_cost,
         "revenue": total_revenue,
         "profit": profit,
@@ -567,7 +533,7 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
         "ship_repair_cost": ship_repair_cost,
         "previous_debt": mission.previous_debt,
         "events": events,
-        "daily_summaries": serialized_summaries,
+        "day_series": day_series,
         "rocket_owned": True,
         "yield_multiplier": mission.yield_multiplier,
         "revenue_multiplier": mission.revenue_multiplier,
@@ -586,18 +552,151 @@ def process_single_mission(mission_raw: dict, day: int = None, api_event: dict =
         "mission_projection": mission_projection,
         "completed_at": mission.completed_at
     }
+    if destroyed_on_day is not None:
+        effects.destroyed_on_day = destroyed_on_day
+        effects.ship = ship
+    if depleted is not None:
+        effects.depleted.append(depleted)
+    if total_yield_kg < mission.target_yield_kg or (days_into_mission >= scheduled_days + mission.travel_delays and ship_location > 0):
+        effects.ship_location = ship_location
+
+    logging.info(f"User {username}: Mission {mission_id} simulated {total_yield_kg} kg from {mission.asteroid_full_name}, days into mission: {days_into_mission}, days left: {days_left} for company {company_name}, ship {ship_name}")
+    return update_data
+
+def apply_depletion(mission: MissionState, effects: MissionEffects, username: str = None):
+    """
+    Remove everything the stored days mined from the asteroid in one guarded update.
+    """
+    if not effects.depleted:
+        return
+    mined = effects.depleted[0].copy()
+    for depleted in effects.depleted[1:]:
+        mined += depleted
+    taken = deplete_asteroid(mission.asteroid_full_name, mined)
+    if taken.total() < mined.total():
+        # Another worker's miners got there first; the stored days keep what the cache showed as available
+        logging.warning(f"User {username}: Mission {mission.id} delivered {mined.total() - taken.total()} kg more than {mission.asteroid_full_name} still held")
+
+def persist_mission(mission_raw: dict, update_data: dict, ctx: MissionContext, effects: MissionEffects, username: str = None) -> dict:
+    """
+    Compare-and-swap the simulated fields onto the mission as it was read, then apply the collected side effects.
+    Asteroid mass the days reserved is removed only once the mission write wins.
+    """
+    mission_id = str(mission_raw["_id"])
+    mission = MissionState.from_document(mission_raw)
     try:
-        db.missions.update_one({"_id": ObjectId(mission_id)}, {"$set": update_data})
-        if total_yield_kg < mission.target_yield_kg or (days_into_mission >= scheduled_days + mission.travel_delays and ship_location > 0):
-            db.ships.update_one({"_id": ObjectId(ship_model.id)}, {"$set": {"location": ship_location}}, upsert=False)
+        update_result = db.missions.update_one(
+            {"_id": ObjectId(mission_id), **version_filter(mission_raw)},
+            # Missions stored before the columnar format drop their old summary list on first write
+            {"$set": {**update_data, "version": next_version(mission_raw)}, "$unset": {"daily_summaries": ""}}
+        )
+        if update_result.matched_count == 0:
+            logging.warning(f"User {username}: Mission {mission_id} was modified by another worker, discarding simulated days")
+            # The discarded days only reserved mass in the cache; drop the entry so it is re-read
+            invalidate_asteroid(mission.asteroid_full_name)
+            return {"error": f"Mission {mission_id} was updated concurrently, please try again", "conflict": True}
+        apply_depletion(mission, effects, username)
+        if effects.destroyed_on_day is not None:
+            record_ship_destroyed(mission, effects.ship, ctx.config_vars, effects.destroyed_on_day, username)
+        if effects.ship_location is not None:
+            db.ships.update_one({"_id": ctx.ship["_id"]}, {"$set": {"location": effects.ship_location}}, upsert=False)
     except pymongo.errors.AutoReconnect as e:
-        logging.error(f"User {username}: Failed to update mission or ship in MongoDB: {e} for company {company_name}, ship {ship_name}")
+        logging.error(f"User {username}: Failed to update mission or ship in MongoDB: {e} for company {ctx.company_name}, ship {mission.ship_name}")
+        # Whether or not the mission write landed, the cache must stop holding this batch's reservations
+        invalidate_asteroid(mission.asteroid_full_name)
         return {"error": "Trouble accessing the database, please try again later"}
-
-    logging.info(f"User {username}: Mission {mission_id} processed {total_yield_kg} kg from {mission.asteroid_full_name}, days into mission: {days_into_mission}, days left: {days_left} for company {company_name}, ship {ship_name}")
     return update_data
 
-def mine_asteroid(user_id: str, day: int = None, api_event: dict = None, username: str = None, company_name: str = None) -> dict:
+def process_single_mission(mission_raw: dict, day: int = None, api_event: dict = None, username: str = None, company_name: str = None, days: int = 1) -> dict:
+    """
+    Simulate `days` consecutive days starting at `day` in memory and store the mission once.
+    Stops early when the mission completes, fails or reports an error; `days_simulated` on the result says how far it got.
+    Each day sees the same inputs it would have if the days had been advanced one request at a time.
+    """
+    mission_id = str(mission_raw["_id"])
+    mission = MissionState.from_document(mission_raw)
+    logging.info(f"User {username}: Processing mission {mission_id} to {mission.asteroid_full_name} for company {company_name} with ship {mission.ship_name}")
+
+    with MISSION_PHASE_LATENCY.time("load"):
+        ctx = load_mission_context(mission, username, company_name)
+    if isinstance(ctx, dict):
+        return ctx
+    effects = MissionEffects()
+    document = mission_raw
+    update_data = {}
+    steps = []
+    days = max(1, days) if day else 1
+    days_simulated = 0
+    simulate_started = time.perf_counter()
+    for offset in range(days):
+        last_day = offset == days - 1
+        step_day = day + offset if day else None
+        step_api_event = api_event if offset == 0 else None
+        result = simulate_mission_day(document, ctx, effects, step_day, step_api_event, username, render_graph=last_day)
+        if "error" in result:
+            if not update_data:
+                return result
+            break
+        update_data = result
+        days_simulated += 1
+        steps.append((step_day, step_api_event, document, update_data))
+        # Later days read the fields this day produced, exactly as a fresh read after a single-day write would
+        document = {**document, **update_data}
+        if update_data["status"] in (1, 2):
+            break
+    MISSION_PHASE_LATENCY.observe(time.perf_counter() - simulate_started, "simulate")
+    if not update_data.get("graph_html"):
+        update_data["graph_html"] = render_mission_graph(mission_id, mission_days(update_data))
+    log_seq = int(mission_raw.get("log_seq", 0))
+    update_data["log_seq"] = log_seq + len(steps)
+
+    with MISSION_PHASE_LATENCY.time("persist"):
+        result = persist_mission(mission_raw, update_data, ctx, effects, username)
+    if "error" not in result:
+        index = ElementIndex(get_asteroid(mission.asteroid_full_name)["elements"])
+        events = [step_event(mission_id, log_seq + i, step_day, before, after, index, step_api_event) for i, (step_day, step_api_event, before, after) in enumerate(steps)]
+        append_mission_log(mission_raw, events, {**mission_raw, **update_data}, index, username)
+        append_feed(mission.user_id, mission.name, mission_days(update_data)[day_count(mission_raw):], username)
+        result = {**result, "days_simulated": days_simulated}
+    return result
+
+def settle_mission_result(user: User, mission_id: str, ship_id: str, result: dict):
+    """
+    Apply the outcome of a finished mission: release the ship and pay the profit into the bank, repaying any loan first.
+    """
+    if result.get("status") == 2:  # Mission failed (e.g., ship destroyed)
+        logging.info(f"User {user.username}: Mission {mission_id} failed, no profits to distribute")
+        return
+    if result.get("status") != 1:
+        return
+    # Update ship to set active=False and location=0.0
+    update_result = db.ships.update_one(
+        {"_id": ObjectId(ship_id)},
+        {"$set": {"active": False, "location": 0.0}}
+    )
+    if update_result.matched_count == 0:
+        logging.error(f"Ship {ship_id} not found for mission {mission_id}")
+        return
+    logging.info(f"Updated ship {ship_id}: matched={update_result.matched_count}, modified={update_result.modified_count}")
+
+    # Update user's bank with profits
+    profit = result.get("profit", 0)
+    if profit > 0 and user.current_loan > 0:
+        net_profit = max(0, profit - user.current_loan)
+        db.users.update_one(
+            {"_id": ObjectId(user.id)},
+            {"$inc": {"bank": PyInt64(net_profit)}, "$set": {"current_loan": PyInt64(0)}}
+        )
+        logging.info(f"User {user.username}: Mission {mission_id} completed, profit ${profit:,}, repaid loan ${user.current_loan:,}, net to bank ${net_profit:,}")
+        user.current_loan = PyInt64(0)
+    elif profit > 0:
+        db.users.update_one(
+            {"_id": ObjectId(user.id)},
+            {"$inc": {"bank": PyInt64(profit)}}
+        )
+        logging.info(f"User {user.username}: Mission {mission_id} completed, added profit ${profit:,} to bank")
+
+def mine_asteroid(user_id: str, day: int = None, api_event: dict = None, username: str = None, company_name: str = None, days: int = 1) -> dict:
     try:
         active_missions = list(db.missions.find({"user_id": user_id, "status": 0}))
     except pymongo.errors.AutoReconnect as e:
@@ -611,7 +710,7 @@ def mine_asteroid(user_id: str, day: int = None, api_event: dict = None, usernam
     results = {}
     for mission_raw in active_missions:
         mission_id = str(mission_raw["_id"])
-        result = process_single_mission(mission_raw, day, api_event, username, company_name)
+        result = process_mission_day(mission_raw, day, api_event, username, company_name, days)
         results[mission_id] = result
     return results
 
@@ -0,0 +1,207 @@
+"""
+Commodity price sources, the market_price_history collection and an offline price model.
+
+fetch_market_prices asks the source named by PRICE_SOURCE ("yahoo" by default, or "simulated") for
+per-kg prices and records whatever it gets in market_price_history. A commodity the source cannot
+price falls back to its last recorded price, and with no history to the simulator, so a failed
+download no longer zeroes the market.
+
+The simulator is a geometric Brownian motion per commodity, fitted to the daily log returns in the
+history (or to default drift and volatility when there is too little of it), and simulates any
+number of days for all commodities with one cumulative sum:
+
+    python -m amos.market_prices [--days 1095] [--seed 0] [--record]
+
+generates three years of daily prices ending yesterday and, with --record, stores them as history
+so an offline deployment or a load test starts from a realistic market.
+"""
+import argparse
+import logging
+import os
+from datetime import datetime, timedelta, UTC
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+import pymongo
+import yfinance as yf
+from config import MongoDBConfig
+from utils.helpers import ensure_time_series
+
+PRICE_HISTORY_COLLECTION = "market_price_history"
+PRICE_SOURCE = os.getenv("PRICE_SOURCE", "yahoo")
+PRICE_SEED = int(os.getenv("PRICE_SEED", "0"))
+TROY_OUNCES_PER_KG = 32.1507
+TICKERS = {"Copper": "HG=F", "Silver": "SI=F", "Palladium": "PA=F", "Platinum": "PL=F", "Gold": "GC=F"}
+COMMODITIES = list(TICKERS)
+# Per-kg starting prices and annual GBM parameters used where the history is too short to fit
+DEFAULT_PRICES = {"Copper": 145, "Silver": 965, "Palladium": 32000, "Platinum": 32000, "Gold": 77000}
+DEFAULT_ANNUAL_DRIFT = 0.02
+DEFAULT_ANNUAL_VOLATILITY = {"Copper": 0.22, "Silver": 0.28, "Palladium": 0.35, "Platinum": 0.25, "Gold": 0.15}
+DAYS_PER_YEAR = 365
+MIN_FIT_RETURNS = 30
+HISTORY_FIT_DAYS = 3 * DAYS_PER_YEAR
+
+db = MongoDBConfig.get_database()
+_history_ready = False
+
+class PriceSource:
+    """
+    Where fresh prices come from. fetch returns per-kg prices for the commodities it could price and leaves out the rest.
+    """
+    name = "base"
+
+    def fetch(self, commodities: List[str]) -> Dict[str, int]:
+        raise NotImplementedError
+
+class YahooPriceSource(PriceSource):
+    name = "yahoo"
+
+    def fetch(self, commodities: List[str]) -> Dict[str, int]:
+        prices = {}
+        for commodity in commodities:
+            ticker = TICKERS[commodity]
+            try:
+                price_per_oz = float(yf.download(ticker, period="1d", interval="1d")["Close"].iloc[-1])
+                prices[commodity] = int(price_per_oz * TROY_OUNCES_PER_KG)
+                logging.info(f"Fetched {commodity} ({ticker}): ${price_per_oz:.2f}/oz -> ${prices[commodity]}/kg")
+            except Exception as e:
+                logging.error(f"Failed to fetch {commodity} price: {e}")
+        return prices
+
+class SimulatedPriceSource(PriceSource):
+    """
+    Today's prices as one GBM step from the latest recorded ones. The step is keyed by seed and date,
+    so every process asking on the same day gets the same market.
+    """
+    name = "simulated"
+
+    def __init__(self, seed: int = PRICE_SEED):
+        self.seed = seed
+
+    def fetch(self, commodities: List[str]) -> Dict[str, int]:
+        model = fit_gbm(*load_history())
+        today = datetime.now(UTC).date().toordinal()
+        step = simulate_prices(model, 1, self.seed, first_day=today)[0]
+        return {commodity: int(price) for commodity, price in zip(model.commodities, step.tolist()) if commodity in commodities}
+
+PRICE_SOURCES = {source.name: source for source in (YahooPriceSource, SimulatedPriceSource)}
+
+def price_source(name: Optional[str] = None) -> PriceSource:
+    name = name or PRICE_SOURCE
+    if name not in PRICE_SOURCES:
+        raise ValueError(f"Unknown price source '{name}', expected one of {', '.join(PRICE_SOURCES)}")
+    return PRICE_SOURCES[name]()
+
+def ensure_history_collection():
+    """
+    Create market_price_history as a time-series collection keyed by commodity, once per process.
+    """
+    global _history_ready
+    if not _history_ready:
+        ensure_time_series(PRICE_HISTORY_COLLECTION, "commodity")
+        _history_ready = True
+
+def record_prices(prices: Dict[str, int], source: str, timestamp: Optional[datetime] = None):
+    ensure_history_collection()
+    timestamp = timestamp or datetime.now(UTC)
+    db[PRICE_HISTORY_COLLECTION].insert_many([{"timestamp": timestamp, "commodity": commodity, "price_per_kg": int(price), "source": source} for commodity, price in prices.items()])
+
+def latest_prices(commodities: List[str] = COMMODITIES) -> Dict[str, int]:
+    ensure_history_collection()
+    latest = {}
+    for commodity in commodities:
+        entry = db[PRICE_HISTORY_COLLECTION].find_one({"commodity": commodity}, sort=[("timestamp", pymongo.DESCENDING)])
+        if entry:
+            latest[commodity] = int(entry["price_per_kg"])
+    return latest
+
+def load_history(days: int = HISTORY_FIT_DAYS, end: Optional[datetime] = None) -> Tuple[List[str], np.ndarray]:
+    """
+    Daily closing prices for the `days` days before `end`: the commodity names and a (days, commodities) matrix
+    holding each day's last recorded price, NaN where a commodity has none that day.
+    """
+    ensure_history_collection()
+    end = end or datetime.now(UTC)
+    first_day = (end - timedelta(days=days - 1)).date()
+    matrix = np.full((days, len(COMMODITIES)), np.nan)
+    column = {commodity: i for i, commodity in enumerate(COMMODITIES)}
+    cursor = db[PRICE_HISTORY_COLLECTION].find(
+        {"timestamp": {"$gte": datetime.combine(first_day, datetime.min.time(), UTC), "$lt": end}, "commodity": {"$in": COMMODITIES}},
+        {"_id": 0, "timestamp": 1, "commodity": 1, "price_per_kg": 1}
+    ).sort("timestamp", pymongo.ASCENDING)
+    for entry in cursor:
+        matrix[(entry["timestamp"].date() - first_day).days, column[entry["commodity"]]] = entry["price_per_kg"]
+    return COMMODITIES, matrix
+
+class GBMModel:
+    """
+    Daily drift and volatility of log prices per commodity, and the prices simulations start from.
+    """
+    __slots__ = ("commodities", "start", "drift", "volatility")
+
+    def __init__(self, commodities: List[str], start: np.ndarray, drift: np.ndarray, volatility: np.ndarray):
+        self.commodities = commodities
+        self.start = start
+        self.drift = drift
+        self.volatility = volatility
+
+def fit_gbm(commodities: List[str], history: np.ndarray) -> GBMModel:
+    """
+    Fit each commodity's daily log-return mean and deviation from `history` (days x commodities, NaN for
+    gaps). Commodities with fewer than MIN_FIT_RETURNS returns keep the default parameters, and those
+    with no history at all start from DEFAULT_PRICES.
+    """
+    start = np.array([DEFAULT_PRICES[c] for c in commodities], dtype=np.float64)
+    drift = np.full(len(commodities), DEFAULT_ANNUAL_DRIFT / DAYS_PER_YEAR)
+    volatility = np.array([DEFAULT_ANNUAL_VOLATILITY[c] for c in commodities]) / np.sqrt(DAYS_PER_YEAR)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        returns = np.diff(np.log(np.where(history > 0, history, np.nan)), axis=0)
+    for i in range(len(commodities)):
+        observed = history[:, i][~np.isnan(history[:, i]) & (history[:, i] > 0)]
+        if observed.size:
+            start[i] = observed[-1]
+        valid = returns[:, i][~np.isnan(returns[:, i])]
+        if valid.size >= MIN_FIT_RETURNS:
+            volatility[i] = valid.std(ddof=1)
+            # Itô: the mean log return is mu - sigma^2 / 2
+            drift[i] = valid.mean() + volatility[i] ** 2 / 2
+    return GBMModel(list(commodities), start, drift, volatility)
+
+def simulate_prices(model: GBMModel, days: int, seed: int, first_day: int = 0) -> np.ndarray:
+    """
+    `days` consecutive daily prices for every commodity in `model`, as a (days, commodities) matrix.
+    Philox-keyed by `seed` with `first_day` in the counter, so the same seed and start day always give the same path.
+    """
+    rng = np.random.Generator(np.random.Philox(key=seed, counter=np.array([0, 0, 0, first_day], dtype=np.uint64)))
+    shocks = rng.standard_normal((days, len(model.commodities)))
+    log_steps = (model.drift - model.volatility ** 2 / 2) + model.volatility * shocks
+    return model.start * np.exp(np.cumsum(log_steps, axis=0))
+
+def generate_price_history(days: int, seed: int = PRICE_SEED, end: Optional[datetime] = None, record: bool = False) -> Tuple[List[datetime], Dict[str, np.ndarray]]:
+    """
+    Simulate `days` daily prices ending the day before `end` (today by default), continuing from the
+    recorded history. With `record` the simulated days are stored in market_price_history.
+    """
+    end = end or datetime.now(UTC)
+    first = datetime.combine((end - timedelta(days=days)).date(), datetime.min.time(), UTC)
+    model = fit_gbm(*load_history(end=first))
+    prices = simulate_prices(model, days, seed, first_day=first.date().toordinal())
+    dates = [first + timedelta(days=day) for day in range(days)]
+    if record:
+        ensure_history_collection()
+        rounded = prices.astype(np.int64).tolist()
+        db[PRICE_HISTORY_COLLECTION].insert_many([
+            {"timestamp": date, "commodity": commodity, "price_per_kg": price, "source": SimulatedPriceSource.name}
+            for date, row in zip(dates, rounded) for commodity, price in zip(model.commodities, row)
+        ])
+    return dates, {commodity: prices[:, i] for i, commodity in enumerate(model.commodities)}
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Simulate daily commodity prices with the GBM price model")
+    parser.add_argument("--days", type=int, default=HISTORY_FIT_DAYS)
+    parser.add_argument("--seed", type=int, default=PRICE_SEED)
+    parser.add_argument("--record", action="store_true", help=f"Store the simulated days in {PRICE_HISTORY_COLLECTION}")
+    args = parser.parse_args()
+    dates, series = generate_price_history(args.days, args.seed, record=args.record)
+    print(f"{len(dates)} days from {dates[0].date()} to {dates[-1].date()}{' recorded' if args.record else ''}")
+    for commodity, prices in series.items():
+        print(f"  {commodity}: ${prices[0]:,.0f} -> ${prices[-1]:,.0f}/kg (min ${prices.min():,.0f}, max ${prices.max():,.0f})")
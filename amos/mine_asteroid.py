@@ -1,13 +1,15 @@
 import logging
-import random
 from datetime import datetime, timedelta, UTC
 from typing import List, Dict, Optional
-import yfinance as yf
-from models.models import MissionModel, MissionDay, PyInt64
+from models.models import PyInt64
+from amos.sim_state import DayResult, MissionState
+from amos.element_vector import ElementVector, price_vector
+from amos.asteroid_valuation import schedule_revaluation
+from amos.market_prices import COMMODITIES, SimulatedPriceSource, latest_prices, price_source, record_prices
+from amos.hourly_mining import HOURS_PER_DAY, mine_hours, hourly_events_from_config
+from amos.sim_rng import mission_rng
 from config import MongoDBConfig
-
-HOURS_PER_DAY = 24
-COMMODITIES = ["Copper", "Silver", "Palladium", "Platinum", "Gold"]
+from utils.metrics import record_cache
 
 db = MongoDBConfig.get_database()
 
@@ -17,7 +19,7 @@ def fetch_mining_config() -> Dict:
         if not config:
             raise RuntimeError("Mining globals config not found in asteroids.config")
         variables = config["variables"]
-        logging.info(f"Fetched mining_globals: {variables}")
+        logging.debug(f"Fetched mining_globals: {variables}")
         return variables
     except Exception as e:
         logging.error(f"Failed to fetch mining globals from MongoDB: {e}")
@@ -40,29 +42,24 @@ def fetch_market_prices() -> Dict[str, int]:
             timestamp = cache["timestamp"]
         cache_age = (now - timestamp).days
 
-    if cache and cache_age < 4:
+    fresh = bool(cache) and cache_age < 4
+    record_cache("market_prices", fresh)
+    if fresh:
         logging.info(f"Using cached market prices (age: {cache_age} days)")
         return cache["prices"]
 
-    logging.info("Fetching fresh market_prices from yfinance (per troy ounce)...")
-    prices = {}
-    commodity_tickers = {
-        "Copper": "HG=F",
-        "Silver": "SI=F",
-        "Palladium": "PA=F",
-        "Platinum": "PL=F",
-        "Gold": "GC=F"
-    }
-    for commodity, ticker in commodity_tickers.items():
-        try:
-            data = yf.download(ticker, period="1d", interval="1d")["Close"].iloc[-1]
-            price_per_oz = float(data)
-            price_per_kg = PyInt64(int(price_per_oz * 32.1507))
-            prices[commodity] = price_per_kg
-            logging.info(f"Fetched {commodity} ({ticker}): ${price_per_oz:.2f}/oz -> ${price_per_kg}/kg")
-        except Exception as e:
-            logging.error(f"Failed to fetch {commodity} price: {e}")
-            prices[commodity] = PyInt64(0)
+    source = price_source()
+    logging.info(f"Fetching fresh market_prices from {source.name}...")
+    fetched = source.fetch(COMMODITIES)
+    if fetched:
+        record_prices(fetched, source.name, now)
+    missing = [commodity for commodity in COMMODITIES if commodity not in fetched]
+    fallback = latest_prices(missing) if missing else {}
+    if len(fallback) < len(missing):
+        fallback = {**SimulatedPriceSource().fetch(missing), **fallback}
+    for commodity in missing:
+        logging.warning(f"No fresh {commodity} price from {source.name}, using ${fallback[commodity]}/kg from history or the price model")
+    prices = {commodity: PyInt64(int(fetched[commodity] if commodity in fetched else fallback[commodity])) for commodity in COMMODITIES}
 
     # Update cache with UTC-aware timestamp
     db.market_prices.update_one(
@@ -71,10 +68,16 @@ def fetch_market_prices() -> Dict[str, int]:
         upsert=True
     )
     logging.info("Updated market_prices cache")
+    schedule_revaluation()
     return prices
 
 def calculate_confidence(travel_days: int, mining_power: int, target_yield_kg: int, daily_yield_rate: int, max_overrun_days: int, ship_reused: bool) -> tuple[float, int, int]:
-    config = fetch_mining_config()
+    return confidence_from_inputs(fetch_mining_config(), fetch_market_prices(), travel_days, mining_power, target_yield_kg, max_overrun_days, ship_reused)
+
+def confidence_from_inputs(config: Dict, prices: Dict[str, int], travel_days: int, mining_power: int, target_yield_kg: int, max_overrun_days: int, ship_reused: bool) -> tuple[float, int, int]:
+    """
+    calculate_confidence with mining_globals and market prices supplied by the caller, for batch use.
+    """
     daily_mission_cost = config["daily_mission_cost"]
     ship_cost = config["ship_cost"] * (config["ship_reuse_discount"] if ship_reused else 1)
     deadline_overrun_fine_per_day = config["deadline_overrun_fine_per_day"]
@@ -97,7 +100,6 @@ def calculate_confidence(travel_days: int, mining_power: int, target_yield_kg: i
         commodity_yields[commodity] = PyInt64(int(commodity_fraction * (weight / total_weight)))
 
     # Calculate gross revenue from market prices
-    prices = fetch_market_prices()
     gross_revenue = PyInt64(sum(kg * prices.get(commodity, 0) for commodity, kg in commodity_yields.items()))
 
     # Calculate costs
@@ -107,21 +109,19 @@ def calculate_confidence(travel_days: int, mining_power: int, target_yield_kg: i
     profit_min = PyInt64(int(-mission_cost * risk_factor))
     return confidence, profit_min, profit_max
 
-def simulate_travel_day(mission: MissionModel, day: int, is_return: bool = False) -> MissionDay:
-    config = fetch_mining_config()
-    daily_mission_cost = config["daily_mission_cost"]
-
+def simulate_travel_day(mission: MissionState, day: int, is_return: bool = False) -> DayResult:
+    rng = mission_rng(mission.seed, day, "travel")
     events = []
     note = "Travel outbound" if not is_return else "Travel return"
-    if random.random() < 0.05:
-        delay_days = random.randint(1, 3)
+    if rng.random() < 0.05:
+        delay_days = int(rng.integers(1, 3, endpoint=True))
         events.append({"type": "Travel Delay", "effect": {"delay_days": delay_days}})
         note += f" - Delayed {delay_days} days"
-    elif random.random() < 0.02 and not is_return:
+    elif rng.random() < 0.02 and not is_return:
         events.append({"type": "Tailwind", "effect": {"reduce_days": 1}})
         note += " - Speed boost"
     logging.info(f"Day {day}: Applied {len(events)} events")
-    return MissionDay(
+    return DayResult(
         day=day,
         total_kg=PyInt64(0),
         elements_mined={},
@@ -130,74 +130,62 @@ def simulate_travel_day(mission: MissionModel, day: int, is_return: bool = False
         note=note
     )
 
-def simulate_mining_day(mission: MissionModel, day: int, weighted_elements: List, elements_mined: dict, api_event: Optional[dict], mining_power: int, prices: Dict[str, int], base_travel_days: int) -> MissionDay:
-    config = fetch_mining_config()
+def simulate_mining_day(mission: MissionState, day: int, weighted_elements: List, elements_mined: ElementVector, api_event: Optional[dict], mining_power: int, prices: Dict[str, int], base_travel_days: int, config: Dict) -> DayResult:
     max_element_percentage = 0.5  # Increased from 0.1 to 0.5 for higher yield
     element_yield_min = config["element_yield_min"]
 
-    daily_yield = PyInt64(sum(random.randint(1, mining_power) for _ in range(HOURS_PER_DAY)))
-    # Removed mission.yield_multiplier application here, as it's now handled day-specifically in EventProcessor
+    # Filter elements with non-zero mass
+    valid_elements = [e for e in weighted_elements if e["mass_kg"] > 0]
+    logging.debug(f"Day {day}: Weighted elements received: {[e['name'] for e in valid_elements]}")
+    if not valid_elements:
+        logging.warning(f"Day {day}: No elements with mass > 0 provided!")
+
+    # All 24 hours are drawn in one array operation; only the daily rollup is stored
+    hourly = mine_hours(
+        HOURS_PER_DAY,
+        mining_power,
+        [e["number"] for e in valid_elements],
+        [e["weight"] for e in valid_elements],
+        rng=mission_rng(mission.seed, day, "mining"),
+        hourly_events=hourly_events_from_config(config),
+        max_element_percentage=max_element_percentage
+    )
+    rollup = hourly.daily_rollup()
+    daily_yield = PyInt64(int(rollup.extracted_kg[0]))
 
-    max_element_yield = PyInt64(int(daily_yield * max_element_percentage))
-    element_yield = PyInt64(random.randint(element_yield_min, max_element_yield))
+    mined = ElementVector(elements_mined.index)
+    mined.mass[hourly.numbers] = rollup.elements_kg[0]
+    element_yield = PyInt64(mined.total())
+    if valid_elements and element_yield < element_yield_min:
+        # Keep the configured daily floor; the shortfall goes to the most heavily weighted element
+        top_number = valid_elements[max(range(len(valid_elements)), key=lambda i: valid_elements[i]["weight"])]["number"]
+        mined.mass[top_number] += min(element_yield_min, daily_yield) - element_yield
+        element_yield = PyInt64(mined.total())
 
-    regolith = PyInt64(daily_yield - element_yield)
+    regolith = PyInt64(max(0, daily_yield - element_yield))
 
-    mined = {}
-    events = []
+    events = rollup.day_events(0)
     note = f"Mining day - {element_yield} kg elements, {regolith} kg regolith discarded"
+    if events:
+        note += " - " + ", ".join(f"{e['type']} {e['effect']['hours']}h" for e in events)
 
     if api_event:
         events.append(api_event)
         note += f" - {api_event['type']}"
 
-    if weighted_elements and element_yield > 0:
-        # Filter elements with non-zero mass
-        valid_elements = [e for e in weighted_elements if e["mass_kg"] > 0]
-        logging.info(f"Day {day}: Weighted elements received: {[e['name'] for e in valid_elements]}")
-        
-        num_elements = len(valid_elements)
-        if num_elements == 0:
-            logging.warning(f"Day {day}: No elements with mass > 0 provided!")
-            return MissionDay(day=day, total_kg=PyInt64(0), elements_mined={}, events=events, daily_value=PyInt64(0), note=note)
-
-        # Assign base yield of 1 kg to each element
-        base_yield = PyInt64(1)
-        base_total = PyInt64(num_elements * base_yield)
-        remaining_yield = PyInt64(max(0, element_yield - base_total))
-
-        # Calculate total weight for distribution
-        total_weight = sum(e["weight"] for e in valid_elements)
-        if total_weight == 0:
-            total_weight = 1  # Avoid division by zero
-
-        for elem in valid_elements:
-            elem_name = elem["name"]
-            weight = elem["weight"]
-            # Base yield plus weighted share of remaining yield
-            extra_yield = PyInt64(int(remaining_yield * (weight / total_weight)))
-            mined[elem_name] = base_yield + extra_yield
-
-        # Adjust to match element_yield exactly
-        current_total = sum(mined.values())
-        if current_total != element_yield:
-            adjustment = element_yield - current_total
-            adjust_elem = random.choice(list(mined.keys()))
-            mined[adjust_elem] = PyInt64(max(0, mined[adjust_elem] + adjustment))
-
-        logging.info(f"Day {day}: Mined elements: {mined}")
-
-        # Update mission-wide elements_mined
-        for name, kg in mined.items():
-            elements_mined[name] = elements_mined.get(name, 0) + kg
-
-    daily_value = PyInt64(sum(kg * prices.get(name, 0) for name, kg in mined.items() if name in COMMODITIES))
+    logging.info(f"Day {day}: Mined elements: {mined}")
+
+    # Update mission-wide elements_mined
+    elements_mined += mined
+
+    daily_value = PyInt64(mined.value(price_vector(prices)))
     logging.info(f"Day {day}: Applied {len(events)} events")
-    return MissionDay(
+    return DayResult(
         day=day,
         total_kg=element_yield,
         elements_mined=mined,
         events=events,
         daily_value=daily_value,
-        note=note
-    )
\ No newline at end of file
+        note=note,
+        hourly_kg=hourly.element_kg.tolist() if config.get("store_hourly_yield") else None
+    )
@@ -0,0 +1,184 @@
+import json
+import logging
+import struct
+import zlib
+from datetime import datetime, timedelta, UTC
+from typing import Iterable, List
+import numpy as np
+import pymongo
+from bson import Binary
+from config import MongoDBConfig
+from amos.job_queue import enqueue_job, find_open_job, register_job_handler, update_job_progress
+from amos.mission_concurrency import version_filter, next_version
+from amos.day_series import day_count, summary_dicts
+
+COMPACT_MISSIONS_JOB = "compact_missions"
+ARCHIVE_FORMAT = 1
+ARCHIVE_MAGIC = b"AMC1"
+ARCHIVED_FIELDS = ("daily_summaries", "day_series", "events", "graph_html")
+# Projection for list views that never show per-day detail
+HOT_PROJECTION = {field: 0 for field in ARCHIVED_FIELDS}
+ARCHIVE_AFTER_DAYS = 1
+COMPACTION_BATCH_SIZE = 200
+COMPACTION_INTERVAL_SECONDS = 3600
+ABSENT = -1  # Column value for a key missing from that day's summary
+SUMMARY_KEYS = ("day", "total_kg", "note", "events", "elements_mined", "daily_value")
+
+db = MongoDBConfig.get_database()
+
+def pack_mission_detail(mission_raw: dict) -> bytes:
+    """
+    Pack a mission's daily_summaries, events and graph_html into one compressed columnar blob.
+
+    Per-day numbers (day, total_kg, daily_value, note index and one column per element mined) form
+    an int64 matrix written column by column, so each column's runs compress together; notes are
+    a string table, and everything that is not a number travels in a JSON header.
+    """
+    summaries = summary_dicts(mission_raw)
+    element_names = sorted({name for s in summaries for name in (s.get("elements_mined") or {})})
+    column = {name: i for i, name in enumerate(element_names)}
+    notes: List[str] = []
+    note_index = {}
+    matrix = np.full((len(summaries), 4 + len(element_names)), ABSENT, dtype=np.int64)
+    day_events, extra, no_elements = [], {}, []
+    for row, summary in enumerate(summaries):
+        note = summary.get("note", "")
+        if note not in note_index:
+            note_index[note] = len(notes)
+            notes.append(note)
+        matrix[row, 0] = int(summary.get("day", 0))
+        matrix[row, 1] = int(summary.get("total_kg", 0))
+        matrix[row, 2] = ABSENT if summary.get("daily_value") is None else int(summary["daily_value"])
+        matrix[row, 3] = note_index[note]
+        elements_mined = summary.get("elements_mined")
+        if elements_mined is None:
+            no_elements.append(row)
+        for name, kg in (elements_mined or {}).items():
+            matrix[row, 4 + column[name]] = int(kg)
+        day_events.append(summary.get("events", []))
+        others = {key: value for key, value in summary.items() if key not in SUMMARY_KEYS}
+        if others:
+            extra[row] = others
+    header = json.dumps({
+        "format": ARCHIVE_FORMAT,
+        "elements": element_names,
+        "notes": notes,
+        "day_events": day_events,
+        "no_elements": no_elements,
+        "extra": extra,
+        "events": mission_raw.get("events") or [],
+        "graph_html": mission_raw.get("graph_html") or ""
+    }, separators=(",", ":"), default=str).encode()
+    body = struct.pack("<III", len(header), *matrix.shape) + header + np.ascontiguousarray(matrix.T).tobytes()
+    return ARCHIVE_MAGIC + zlib.compress(body, 6)
+
+def unpack_mission_detail(blob: bytes) -> dict:
+    if blob[:4] != ARCHIVE_MAGIC:
+        raise ValueError("Not a mission archive blob")
+    body = zlib.decompress(blob[4:])
+    header_length, rows, columns = struct.unpack_from("<III", body)
+    offset = struct.calcsize("<III")
+    header = json.loads(body[offset:offset + header_length])
+    matrix = np.frombuffer(body, dtype=np.int64, count=rows * columns, offset=offset + header_length).reshape(columns, rows).T
+    no_elements = set(header["no_elements"])
+    summaries = []
+    for row in range(rows):
+        values = matrix[row].tolist()
+        summary = {
+            "day": values[0],
+            "total_kg": values[1],
+            "note": header["notes"][values[3]],
+            "events": header["day_events"][row],
+            "elements_mined": None if row in no_elements else {name: kg for name, kg in zip(header["elements"], values[4:]) if kg != ABSENT},
+            "daily_value": None if values[2] == ABSENT else values[2]
+        }
+        summary.update(header["extra"].get(str(row), {}))
+        summaries.append(summary)
+    return {"daily_summaries": summaries, "events": header["events"], "graph_html": header["graph_html"]}
+
+def load_mission_details(missions: Iterable[dict]) -> List[dict]:
+    """
+    Missions with archived per-day detail restored, one archive read for the whole batch; others pass through.
+    """
+    missions = list(missions)
+    archived_ids = [m["_id"] for m in missions if m.get("archived")]
+    if not archived_ids:
+        return missions
+    blobs = {a["_id"]: a["blob"] for a in db.mission_archives.find({"_id": {"$in": archived_ids}})}
+    restored = []
+    for mission in missions:
+        if mission.get("archived") and mission["_id"] in blobs:
+            mission = {**mission, **unpack_mission_detail(blobs[mission["_id"]])}
+        elif mission.get("archived"):
+            logging.error(f"Mission {mission['_id']} is marked archived but has no archive")
+        restored.append(mission)
+    return restored
+
+def load_mission_detail(mission_raw: dict) -> dict:
+    return load_mission_details([mission_raw])[0]
+
+def archive_mission(mission_raw: dict) -> bool:
+    """
+    Move a finished mission's per-day detail to mission_archives and drop it from the hot document.
+    The archive is written first and the unset is compare-and-swapped on version, so a crash or a racing
+    writer leaves at worst an unused archive, never a mission without its detail.
+    """
+    if mission_raw.get("archived") or mission_raw.get("status") not in (1, 2):
+        return False
+    blob = pack_mission_detail(mission_raw)
+    db.mission_archives.replace_one(
+        {"_id": mission_raw["_id"]},
+        {"_id": mission_raw["_id"], "format": ARCHIVE_FORMAT, "blob": Binary(blob), "days": day_count(mission_raw), "archived_at": datetime.now(UTC)},
+        upsert=True
+    )
+    result = db.missions.update_one(
+        {"_id": mission_raw["_id"], **version_filter(mission_raw)},
+        {"$unset": {field: "" for field in ARCHIVED_FIELDS}, "$set": {"archived": True, "version": next_version(mission_raw)}}
+    )
+    return result.modified_count == 1
+
+def compact_missions(job_id=None, older_than_days: int = ARCHIVE_AFTER_DAYS, batch_size: int = COMPACTION_BATCH_SIZE) -> dict:
+    """
+    Archive every finished mission completed more than `older_than_days` ago, in batches.
+    """
+    cutoff = datetime.now(UTC) - timedelta(days=older_than_days)
+    query = {"status": {"$in": [1, 2]}, "archived": {"$ne": True}, "completed_at": {"$lt": cutoff}}
+    archived = skipped = 0
+    last_id = None
+    while True:
+        # Page by _id so missions that could not be archived are not fetched again
+        page = {**query, "_id": {"$gt": last_id}} if last_id else query
+        batch = list(db.missions.find(page).sort("_id", pymongo.ASCENDING).limit(batch_size))
+        if not batch:
+            break
+        last_id = batch[-1]["_id"]
+        for mission_raw in batch:
+            try:
+                if archive_mission(mission_raw):
+                    archived += 1
+                else:
+                    skipped += 1
+            except pymongo.errors.PyMongoError as e:
+                logging.error(f"Failed to archive mission {mission_raw['_id']}: {e}")
+                skipped += 1
+        if job_id:
+            update_job_progress(job_id, missions_done=archived, missions_total=archived + skipped)
+    logging.info(f"Compaction archived {archived} missions, skipped {skipped}")
+    return {"archived": archived, "skipped": skipped}
+
+def schedule_compaction(delay_seconds: int = 0):
+    """
+    Queue a compaction unless one is already waiting. Each compaction queues its successor this way, so there is one chain across workers.
+    """
+    if not find_open_job(COMPACT_MISSIONS_JOB, None, statuses=("queued",)):
+        enqueue_job(COMPACT_MISSIONS_JOB, run_after=datetime.now(UTC) + timedelta(seconds=delay_seconds))
+
+@register_job_handler(COMPACT_MISSIONS_JOB)
+def handle_compact_missions(job: dict) -> dict:
+    try:
+        return compact_missions(job_id=job["_id"], **job.get("params", {}))
+    finally:
+        schedule_compaction(COMPACTION_INTERVAL_SECONDS)
+
+if __name__ == "__main__":
+    print(compact_missions(older_than_days=0))
@@ -0,0 +1,83 @@
+import logging
+import random
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, UTC
+from typing import Optional
+import pymongo
+from bson import ObjectId
+from config import MongoDBConfig
+
+LEASE_TTL_SECONDS = 60
+MAX_CONFLICT_RETRIES = 5
+CONFLICT_BACKOFF_SECONDS = 0.05
+
+db = MongoDBConfig.get_database()
+
+def version_filter(mission_raw: dict) -> dict:
+    """
+    Build the compare-and-swap filter for a mission document as it was read.
+    Missions created before versioning have no `version` field and match on its absence.
+    """
+    if "version" in mission_raw:
+        return {"version": mission_raw["version"]}
+    return {"version": {"$exists": False}}
+
+def next_version(mission_raw: dict) -> int:
+    return int(mission_raw.get("version", 0)) + 1
+
+def acquire_user_lease(user_id: str, owner: str, ttl_seconds: int = LEASE_TTL_SECONDS) -> bool:
+    """
+    Take (or renew) the advisory simulation lease for a user.
+    Returns False if another owner holds an unexpired lease.
+    """
+    now = datetime.now(UTC)
+    try:
+        db.mission_leases.find_one_and_update(
+            {"_id": user_id, "$or": [{"expires_at": {"$lte": now}}, {"owner": owner}]},
+            {"$set": {"owner": owner, "expires_at": now + timedelta(seconds=ttl_seconds), "acquired_at": now}},
+            upsert=True
+        )
+        return True
+    except pymongo.errors.DuplicateKeyError:
+        return False
+
+def release_user_lease(user_id: str, owner: str):
+    db.mission_leases.delete_one({"_id": user_id, "owner": owner})
+
+@contextmanager
+def user_lease(user_id: str, ttl_seconds: int = LEASE_TTL_SECONDS):
+    """
+    Context manager around acquire/release. Yields the owner token, or None if the lease is held elsewhere.
+    """
+    owner = uuid.uuid4().hex
+    if not acquire_user_lease(user_id, owner, ttl_seconds):
+        logging.info(f"User {user_id}: Simulation lease held by another worker")
+        yield None
+        return
+    try:
+        yield owner
+    finally:
+        release_user_lease(user_id, owner)
+
+def process_mission_day(mission_raw: dict, day: int = None, api_event: dict = None, username: str = None, company_name: str = None, days: int = 1) -> dict:
+    """
+    Run process_single_mission (one day, or `days` days stored in one write) with optimistic concurrency control.
+    On a version conflict the mission is re-read and the day retried with exponential backoff and jitter.
+    """
+    from amos.manage_mission import process_single_mission
+    mission_id = mission_raw["_id"]
+    result = {}
+    for attempt in range(MAX_CONFLICT_RETRIES):
+        result = process_single_mission(mission_raw, day, api_event, username, company_name, days)
+        if not result.get("conflict"):
+            return result
+        delay = CONFLICT_BACKOFF_SECONDS * (2 ** attempt) * (1 + random.random())
+        logging.info(f"User {username}: Mission {mission_id} version conflict on day {day}, retry {attempt + 1} in {delay:.3f}s")
+        time.sleep(delay)
+        mission_raw: Optional[dict] = db.missions.find_one({"_id": ObjectId(mission_id)})
+        if not mission_raw:
+            return {"error": f"Mission {mission_id} not found"}
+    logging.error(f"User {username}: Mission {mission_id} still conflicting after {MAX_CONFLICT_RETRIES} attempts")
+    return result
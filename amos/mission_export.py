@@ -0,0 +1,160 @@
+"""
+Stream a company's mission history out as NDJSON or CSV.
+
+    python -m amos.mission_export USERNAME [--kind missions|days|yields] [--format ndjson|csv] [--status 1 2] [--ship NAME]
+
+Three row kinds: `missions` (one row per mission), `days` (one row per mission day) and `yields`
+(one row per mission day per element mined). Missions are walked in _id order through one server-side
+cursor with a tight projection, archived detail is restored a batch at a time, and rows are encoded
+in chunks as they are pulled, so memory stays flat however long the history is. The same generators
+back the /missions/export endpoints.
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import sys
+from typing import Iterable, Iterator, List, Optional
+import pymongo
+from config import MongoDBConfig
+from amos.day_series import mission_days
+from amos.manage_mission import get_day, get_daily_value, get_elements_mined
+from amos.mission_archive import load_mission_details
+
+EXPORT_BATCH_SIZE = 500
+EXPORT_CHUNK_ROWS = 1000
+MISSION_COLUMNS = (
+    "mission_id", "name", "ship_name", "asteroid_full_name", "status", "days_into_mission", "travel_delays",
+    "total_yield_kg", "cost", "revenue", "profit", "penalties", "investor_repayment", "confidence", "completed_at"
+)
+DAY_COLUMNS = ("mission_id", "mission_name", "day", "total_kg", "daily_value", "note", "events")
+YIELD_COLUMNS = ("mission_id", "mission_name", "day", "element", "kg")
+DETAIL_PROJECTION = {"name": 1, "archived": 1, "day_series": 1, "daily_summaries": 1}
+EXPORT_FORMATS = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+
+db = MongoDBConfig.get_database()
+
+def export_query(user_id: str, statuses: Optional[List[int]] = None, ship_name: Optional[str] = None) -> dict:
+    query = {"user_id": user_id}
+    if statuses:
+        query["status"] = {"$in": statuses}
+    if ship_name:
+        query["ship_name"] = ship_name
+    return query
+
+def iter_missions(query: dict, projection: dict) -> Iterator[dict]:
+    """
+    Missions matching `query` in _id order through a server-side cursor. A consumer slow enough for the
+    server to reap the cursor resumes after the last mission it received instead of failing the export.
+    """
+    last_id = None
+    while True:
+        page = {**query, "_id": {"$gt": last_id}} if last_id else query
+        try:
+            for mission in db.missions.find(page, projection).sort("_id", pymongo.ASCENDING).batch_size(EXPORT_BATCH_SIZE):
+                last_id = mission["_id"]
+                yield mission
+            return
+        except pymongo.errors.CursorNotFound:
+            logging.warning(f"Export cursor expired after mission {last_id}, resuming")
+
+def iter_mission_details(query: dict) -> Iterator[dict]:
+    """
+    Missions with their per-day detail, archived ones restored with one archive read per batch.
+    """
+    batch = []
+    for mission in iter_missions(query, DETAIL_PROJECTION):
+        batch.append(mission)
+        if len(batch) == EXPORT_BATCH_SIZE:
+            yield from load_mission_details(batch)
+            batch = []
+    yield from load_mission_details(batch)
+
+def mission_rows(query: dict) -> Iterator[dict]:
+    projection = {column: 1 for column in MISSION_COLUMNS if column != "mission_id"}
+    for mission in iter_missions(query, projection):
+        yield {"mission_id": str(mission["_id"]), **{column: mission.get(column) for column in MISSION_COLUMNS[1:]}}
+
+def day_rows(query: dict) -> Iterator[dict]:
+    for mission in iter_mission_details(query):
+        mission_id = str(mission["_id"])
+        for summary in mission_days(mission):
+            yield {
+                "mission_id": mission_id,
+                "mission_name": mission.get("name"),
+                "day": get_day(summary),
+                "total_kg": summary.get("total_kg", 0),
+                "daily_value": get_daily_value(summary),
+                "note": summary.get("note", ""),
+                "events": [event.get("type") for event in summary.get("events") or []]
+            }
+
+def yield_rows(query: dict) -> Iterator[dict]:
+    for mission in iter_mission_details(query):
+        mission_id = str(mission["_id"])
+        for summary in mission_days(mission):
+            day = get_day(summary)
+            for element, kg in get_elements_mined(summary).items():
+                if kg:
+                    yield {"mission_id": mission_id, "mission_name": mission.get("name"), "day": day, "element": element, "kg": kg}
+
+EXPORT_KINDS = {
+    "missions": (mission_rows, MISSION_COLUMNS),
+    "days": (day_rows, DAY_COLUMNS),
+    "yields": (yield_rows, YIELD_COLUMNS)
+}
+
+def _chunks(rows: Iterable[dict]) -> Iterator[List[dict]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) == EXPORT_CHUNK_ROWS:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+def encode_ndjson(rows: Iterable[dict]) -> Iterator[str]:
+    for chunk in _chunks(rows):
+        yield "".join(json.dumps(row, default=str, separators=(",", ":")) + "\n" for row in chunk)
+
+def encode_csv(rows: Iterable[dict], columns: tuple) -> Iterator[str]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in _chunks(rows):
+        for row in chunk:
+            writer.writerow([";".join(value) if isinstance(value, list) else value for value in (row.get(column) for column in columns)])
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():  # Header of an empty export
+        yield buffer.getvalue()
+
+def export_history(user_id: str, kind: str, fmt: str = "ndjson", statuses: Optional[List[int]] = None, ship_name: Optional[str] = None) -> Iterator[str]:
+    """
+    Text chunks of the export, produced lazily; raises ValueError for an unknown kind or format.
+    """
+    if kind not in EXPORT_KINDS:
+        raise ValueError(f"Unknown export kind '{kind}', expected one of {', '.join(EXPORT_KINDS)}")
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unknown export format '{fmt}', expected one of {', '.join(EXPORT_FORMATS)}")
+    make_rows, columns = EXPORT_KINDS[kind]
+    rows = make_rows(export_query(user_id, statuses, ship_name))
+    return encode_csv(rows, columns) if fmt == "csv" else encode_ndjson(rows)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export a company's mission history to stdout")
+    parser.add_argument("username", help="Owner of the missions")
+    parser.add_argument("--kind", choices=list(EXPORT_KINDS), default="missions")
+    parser.add_argument("--format", choices=list(EXPORT_FORMATS), default="ndjson")
+    parser.add_argument("--status", type=int, nargs="*", help="Only missions with these statuses (0 active, 1 completed, 2 failed)")
+    parser.add_argument("--ship", help="Only missions flown by this ship")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    user = db.users.find_one({"username": args.username}, {"_id": 1})
+    if not user:
+        sys.exit(f"User {args.username} not found")
+    for text in export_history(str(user["_id"]), args.kind, args.format, args.status, args.ship):
+        sys.stdout.write(text)
@@ -0,0 +1,77 @@
+import logging
+import time
+from bson import ObjectId
+from config import MongoDBConfig
+from models.models import User
+from amos.job_queue import register_job_handler, update_job_progress
+from amos.manage_mission import settle_mission_result
+from amos.day_series import day_count
+from amos.mission_concurrency import process_mission_day, acquire_user_lease, release_user_lease
+
+COMPLETE_MISSIONS_JOB = "complete_missions"
+LEASE_RENEW_EVERY_DAYS = 20
+MAX_SIMULATED_DAYS = 1000
+LEASE_WAIT_SECONDS = 30
+
+db = MongoDBConfig.get_database()
+
+def estimate_remaining_days(mission_raw: dict) -> int:
+    days_into_mission = day_count(mission_raw)
+    scheduled = int(mission_raw.get("scheduled_days", 0)) + int(mission_raw.get("travel_delays", 0))
+    return max(1, scheduled - days_into_mission)
+
+def complete_missions(user: User, job_id=None) -> dict:
+    """
+    Simulate every active mission of a user to completion, settling each finished mission.
+    Progress is reported on the job document when `job_id` is given.
+    """
+    active_missions = list(db.missions.find({"user_id": user.id, "status": 0}))
+    days_estimated = sum(estimate_remaining_days(m) for m in active_missions)
+    if job_id:
+        update_job_progress(job_id, missions_total=len(active_missions), missions_done=0, days_simulated=0, days_estimated=days_estimated)
+    logging.info(f"User {user.username}: Running simulation to complete {len(active_missions)} active missions")
+
+    lease = str(job_id) if job_id else str(ObjectId())
+    deadline = time.monotonic() + LEASE_WAIT_SECONDS
+    while not acquire_user_lease(user.id, lease):
+        if time.monotonic() > deadline:
+            raise RuntimeError("A simulation is already running for this company")
+        time.sleep(1)
+    results = {}
+    days_simulated = 0
+    try:
+        for missions_done, mission_raw in enumerate(active_missions):
+            mission_id = str(mission_raw["_id"])
+            ship_id = mission_raw["ship_id"]
+            days_into_mission = day_count(mission_raw)
+            result = {}
+            for _ in range(MAX_SIMULATED_DAYS):
+                days_into_mission += 1
+                result = process_mission_day(mission_raw, day=days_into_mission, username=user.username, company_name=user.company_name)
+                days_simulated += 1
+                if "error" in result:
+                    logging.error(f"User {user.username}: Stopped completing mission {mission_id} at day {days_into_mission}: {result['error']}")
+                    break
+                if "status" in result and result["status"] in (1, 2):
+                    settle_mission_result(user, mission_id, ship_id, result)
+                    break
+                mission_raw = db.missions.find_one({"_id": ObjectId(mission_id)})
+                if days_simulated % LEASE_RENEW_EVERY_DAYS == 0:
+                    acquire_user_lease(user.id, lease)
+                    if job_id:
+                        update_job_progress(job_id, days_simulated=days_simulated)
+            results[mission_id] = {"status": result.get("status"), "profit": int(result.get("profit", 0) or 0), "error": result.get("error")}
+            logging.info(f"Mission {mission_id} finished after day {days_into_mission}: status={result.get('status', 'unknown')}")
+            if job_id:
+                update_job_progress(job_id, missions_done=missions_done + 1, days_simulated=days_simulated)
+    finally:
+        release_user_lease(user.id, lease)
+    return {"missions": results, "days_simulated": days_simulated}
+
+@register_job_handler(COMPLETE_MISSIONS_JOB)
+def handle_complete_missions(job: dict) -> dict:
+    user_dict = db.users.find_one({"_id": ObjectId(job["user_id"])})
+    if not user_dict:
+        raise RuntimeError(f"User {job['user_id']} not found")
+    user = User(**{**user_dict, "_id": str(user_dict["_id"])})
+    return complete_missions(user, job_id=job["_id"])
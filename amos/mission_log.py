@@ -0,0 +1,138 @@
+import logging
+from datetime import datetime, UTC
+from typing import Dict, List, Optional
+import pymongo
+from config import MongoDBConfig
+from amos.element_vector import ElementIndex
+
+SNAPSHOT_INTERVAL = 10
+SETTLEMENT_FIELDS = ("cost", "revenue", "profit", "penalties", "investor_repayment", "previous_debt")
+STATE_FIELDS = ("total_yield_kg", "mission_cost", "ship_location", "days_into_mission", "travel_delays", "status")
+
+db = MongoDBConfig.get_database()
+
+def _event_id(mission_id: str, seq: int) -> str:
+    return f"{mission_id}:{seq}"
+
+def state_from_document(mission_raw: dict, index: ElementIndex) -> dict:
+    """
+    The part of a mission document the day log reproduces, with element masses keyed by atomic number.
+    """
+    state = {
+        "elements": {str(index.numbers[name]): int(kg) for name, kg in (mission_raw.get("elements_mined") or {}).items() if kg and name in index.numbers},
+        "events": [[event.get("day"), event.get("type")] for event in mission_raw.get("events", [])]
+    }
+    for field in STATE_FIELDS:
+        state[field] = int(mission_raw.get(field, 0) or 0)
+    if mission_raw.get("confidence_result"):  # Only set by the settlement step
+        state["settlement"] = {field: int(mission_raw.get(field, 0) or 0) for field in SETTLEMENT_FIELDS}
+    return state
+
+def step_event(mission_id: str, seq: int, day: Optional[int], before: dict, after: dict, index: ElementIndex, api_event: dict = None) -> dict:
+    """
+    Compact record of one simulate_mission_day step: the yield vector and counters as deltas, plus
+    the names of the events applied. A step without `day` is the settlement and also carries its totals.
+    """
+    old, new = state_from_document(before, index), state_from_document(after, index)
+    numbers = sorted(set(old["elements"]) | set(new["elements"]), key=int)
+    deltas = [(int(n), new["elements"].get(n, 0) - old["elements"].get(n, 0)) for n in numbers]
+    deltas = [(n, kg) for n, kg in deltas if kg]
+    event = {
+        "_id": _event_id(mission_id, seq),
+        "mission_id": mission_id,
+        "seq": seq,
+        "day": day,
+        "numbers": [n for n, _ in deltas],
+        "kg": [kg for _, kg in deltas],
+        "events": [name for _, name in new["events"][len(old["events"]):]],
+        "total_kg": new["total_yield_kg"] - old["total_yield_kg"],
+        "cost": new["mission_cost"] - old["mission_cost"],
+        "location": new["ship_location"] - old["ship_location"],
+        "delays": new["travel_delays"] - old["travel_delays"],
+        "days": new["days_into_mission"] - old["days_into_mission"],
+        "status": new["status"]
+    }
+    if "settlement" in new:
+        event["settlement"] = new["settlement"]
+    if api_event:
+        event["api_event"] = api_event
+    return event
+
+def apply_event(state: dict, event: dict) -> dict:
+    """
+    Fold one logged step into a state produced by state_from_document or an earlier fold.
+    """
+    elements = dict(state["elements"])
+    for number, kg in zip(event["numbers"], event["kg"]):
+        key = str(number)
+        elements[key] = elements.get(key, 0) + kg
+        if not elements[key]:
+            del elements[key]
+    folded = {
+        **state,
+        "elements": elements,
+        "events": state["events"] + [[event["day"], name] for name in event["events"]],
+        "total_yield_kg": state["total_yield_kg"] + event["total_kg"],
+        "mission_cost": state["mission_cost"] + event["cost"],
+        "ship_location": state["ship_location"] + event["location"],
+        "travel_delays": state["travel_delays"] + event["delays"],
+        "days_into_mission": state["days_into_mission"] + event["days"],
+        "status": event["status"]
+    }
+    if "settlement" in event:
+        folded["settlement"] = event["settlement"]
+    return folded
+
+def append_mission_log(mission_raw: dict, steps: List[dict], final_document: dict, index: ElementIndex, username: str = None):
+    """
+    Append the steps of a persisted advance, writing a genesis snapshot for a mission's first logged
+    step and a fresh snapshot whenever the log crosses a SNAPSHOT_INTERVAL boundary.
+    Runs after the mission write has won, so only committed days are logged; _id = mission:seq keeps it append-only.
+    """
+    if not steps:
+        return
+    mission_id = str(mission_raw["_id"])
+    first_seq = steps[0]["seq"]
+    last_seq = first_seq + len(steps)
+    try:
+        if "log_seq" not in mission_raw:
+            save_snapshot(mission_id, first_seq, state_from_document(mission_raw, index))
+        db.mission_day_log.insert_many([{**step, "recorded_at": datetime.now(UTC)} for step in steps], ordered=True)
+        if last_seq // SNAPSHOT_INTERVAL > first_seq // SNAPSHOT_INTERVAL:
+            save_snapshot(mission_id, last_seq, state_from_document(final_document, index))
+    except pymongo.errors.PyMongoError as e:
+        # The mission document is already the source of truth for play; a gap only shows up in audits
+        logging.error(f"User {username}: Failed to append day log for mission {mission_id} at seq {first_seq}: {e}")
+
+def save_snapshot(mission_id: str, seq: int, state: dict):
+    db.mission_snapshots.update_one(
+        {"_id": _event_id(mission_id, seq)},
+        {"$setOnInsert": {"mission_id": mission_id, "seq": seq, "state": state, "created_at": datetime.now(UTC)}},
+        upsert=True
+    )
+
+def load_log(mission_id: str, after_seq: int = 0, upto_seq: Optional[int] = None) -> List[dict]:
+    query = {"mission_id": mission_id, "seq": {"$gte": after_seq}}
+    if upto_seq is not None:
+        query["seq"]["$lt"] = upto_seq
+    return list(db.mission_day_log.find(query).sort("seq", pymongo.ASCENDING))
+
+def rebuild_state(mission_id: str, upto_seq: Optional[int] = None) -> Optional[dict]:
+    """
+    Mission state after the first `upto_seq` logged steps (all of them by default): the latest snapshot
+    at or before that point, folded forward, so the cost is the number of steps since the snapshot.
+    Returns None for a mission that was never logged.
+    """
+    query = {"mission_id": mission_id}
+    if upto_seq is not None:
+        query["seq"] = {"$lte": upto_seq}
+    snapshot = db.mission_snapshots.find_one(query, sort=[("seq", pymongo.DESCENDING)])
+    if not snapshot:
+        return None
+    state = snapshot["state"]
+    for event in load_log(mission_id, snapshot["seq"], upto_seq):
+        state = apply_event(state, event)
+    return state
+
+def diff_states(expected: dict, actual: dict) -> Dict[str, tuple]:
+    return {key: (expected.get(key), actual.get(key)) for key in sorted(set(expected) | set(actual)) if expected.get(key) != actual.get(key)}
@@ -0,0 +1,104 @@
+import logging
+import uuid
+from datetime import datetime, UTC
+from typing import Dict, Optional, Tuple
+from pymongo import ReturnDocument, UpdateOne
+from config import MongoDBConfig
+
+MIGRATION_MARKER = "mission_counters_migrated"
+MIGRATION_BATCH_SIZE = 1000
+
+db = MongoDBConfig.get_database()
+
+def _counter_id(user_id: str, asteroid_full_name: str) -> str:
+    return f"{user_id}:{asteroid_full_name}"
+
+def parse_mission_number(name: str) -> Optional[int]:
+    name_parts = name.split("Mission")
+    if len(name_parts) > 1:
+        try:
+            return int(name_parts[-1].strip())
+        except ValueError:
+            return None
+    return None
+
+def reserve_mission_numbers(user_id: str, asteroid_full_name: str, count: int = 1) -> int:
+    """
+    Atomically reserve `count` consecutive mission numbers for (user, asteroid) and return the first.
+    """
+    counter = db.mission_counters.find_one_and_update(
+        {"_id": _counter_id(user_id, asteroid_full_name)},
+        {"$inc": {"last": count}, "$setOnInsert": {"user_id": user_id, "asteroid_full_name": asteroid_full_name}},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+    return counter["last"] - count + 1
+
+def reserve_mission_number_blocks(user_id: str, counts: Dict[str, int]) -> Dict[str, int]:
+    """
+    reserve_mission_numbers for several asteroids in two round trips: one bulk write of increments and one read.
+
+    Each increment also tags its counter with this call's token and the value it reached, so the read can tell
+    its own block apart from a concurrent reservation. If another call re-tagged a counter in between, that
+    asteroid is reserved again on its own and the first block is left unused; numbers stay unique.
+    """
+    if not counts:
+        return {}
+    token = uuid.uuid4().hex
+    db.mission_counters.bulk_write([
+        UpdateOne(
+            {"_id": _counter_id(user_id, name)},
+            [
+                {"$set": {"user_id": user_id, "asteroid_full_name": name, "last": {"$add": [{"$ifNull": ["$last", 0]}, count]}}},
+                {"$set": {"reserved_by": token, "reserved_last": "$last"}}
+            ],
+            upsert=True
+        )
+        for name, count in counts.items()
+    ], ordered=False)
+    firsts = {}
+    for counter in db.mission_counters.find({"_id": {"$in": [_counter_id(user_id, name) for name in counts]}}):
+        name = counter["asteroid_full_name"]
+        if counter.get("reserved_by") == token:
+            firsts[name] = counter["reserved_last"] - counts[name] + 1
+    for name, count in counts.items():
+        if name not in firsts:
+            firsts[name] = reserve_mission_numbers(user_id, name, count)
+    return firsts
+
+def next_mission_name(user_id: str, asteroid_full_name: str) -> str:
+    return f"{asteroid_full_name} Mission {reserve_mission_numbers(user_id, asteroid_full_name)}"
+
+def migrate_mission_counters(force: bool = False) -> int:
+    """
+    Seed mission_counters from the highest mission number already used per (user, asteroid).
+
+    Uses $max, so it is safe to re-run and never moves a counter backwards even while missions
+    are being launched. Skipped once the migration marker exists unless `force` is set.
+    Returns the number of counters seeded.
+    """
+    if not force and db.config.find_one({"name": MIGRATION_MARKER}):
+        return 0
+    highest: Dict[Tuple[str, str], int] = {}
+    for mission in db.missions.find({}, {"user_id": 1, "asteroid_full_name": 1, "name": 1}):
+        number = parse_mission_number(mission.get("name", ""))
+        if number is None or not mission.get("asteroid_full_name"):
+            continue
+        key = (mission["user_id"], mission["asteroid_full_name"])
+        highest[key] = max(highest.get(key, 0), number)
+    operations = [
+        UpdateOne(
+            {"_id": _counter_id(user_id, asteroid_full_name)},
+            {"$max": {"last": number}, "$setOnInsert": {"user_id": user_id, "asteroid_full_name": asteroid_full_name}},
+            upsert=True
+        )
+        for (user_id, asteroid_full_name), number in highest.items()
+    ]
+    for start in range(0, len(operations), MIGRATION_BATCH_SIZE):
+        db.mission_counters.bulk_write(operations[start:start + MIGRATION_BATCH_SIZE], ordered=False)
+    db.config.update_one({"name": MIGRATION_MARKER}, {"$set": {"migrated_at": datetime.now(UTC), "counters": len(operations)}}, upsert=True)
+    logging.info(f"Seeded {len(operations)} mission counters from mission history")
+    return len(operations)
+
+if __name__ == "__main__":
+    print(f"Seeded {migrate_mission_counters(force=True)} mission counters")
@@ -0,0 +1,153 @@
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from config import MongoDBConfig
+from amos.element_vector import COMMODITY_NUMBERS
+from amos.hourly_mining import HOURS_PER_DAY
+from amos.mine_asteroid import fetch_market_prices
+
+CATALOG_TTL_SECONDS = 600
+COMMODITY_NAMES = list(COMMODITY_NUMBERS)
+
+# Expected element weights, matching the uniform draws in simulate_mission_day
+PLATINUM_GOLD_WEIGHT = 7.5
+OTHER_COMMODITY_WEIGHT = 4.0
+NON_COMMODITY_WEIGHT = 1.5
+
+db = MongoDBConfig.get_database()
+_catalog = None
+_catalog_loaded_at = 0.0
+_catalog_lock = threading.Lock()
+
+class PlannerCatalog:
+    """
+    Column-oriented view of the asteroid catalog for scoring.
+
+    Only what the valuation needs is kept: travel days, the weight of each commodity and the
+    total weight of all present elements (which fixes each commodity's expected share of the
+    cargo), and the commodity mass left on the asteroid.
+    """
+    __slots__ = ("names", "moid_days", "commodity_weight", "total_weight", "commodity_mass", "_positions")
+
+    def __init__(self, names, moid_days, commodity_weight, total_weight, commodity_mass):
+        self.names = names
+        self.moid_days = moid_days
+        self.commodity_weight = commodity_weight
+        self.total_weight = total_weight
+        self.commodity_mass = commodity_mass
+        self._positions = None
+
+    def positions(self, full_names: Iterable[str]) -> np.ndarray:
+        """
+        Catalog rows for the given asteroid names; unknown names are skipped.
+        """
+        if self._positions is None:
+            self._positions = {name: i for i, name in enumerate(self.names)}
+        return np.array([self._positions[name] for name in full_names if name in self._positions], dtype=np.intp)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    @classmethod
+    def from_documents(cls, asteroids: Iterable[dict], config_vars: Dict) -> "PlannerCatalog":
+        column = {name: i for i, name in enumerate(COMMODITY_NAMES)}
+        names, moid_days, commodity_weight, total_weight, commodity_mass = [], [], [], [], []
+        for asteroid in asteroids:
+            factor = asteroid.get("commodity_factor", 1.0)
+            weights = [0.0] * len(COMMODITY_NAMES)
+            masses = [0] * len(COMMODITY_NAMES)
+            total = 0.0
+            for elem in asteroid.get("elements", []):
+                if elem.get("mass_kg", 0) <= 0:
+                    continue
+                name = elem["name"]
+                if name in ("Platinum", "Gold"):
+                    weight = config_vars["commodity_factor_platinum_gold"] * factor * PLATINUM_GOLD_WEIGHT
+                elif name in column:
+                    weight = config_vars["commodity_factor_other"] * factor * OTHER_COMMODITY_WEIGHT
+                else:
+                    weight = config_vars["non_commodity_weight"] * NON_COMMODITY_WEIGHT
+                total += weight
+                if name in column:
+                    weights[column[name]] = weight
+                    masses[column[name]] = int(elem["mass_kg"])
+            names.append(asteroid["full_name"])
+            moid_days.append(int(asteroid.get("moid_days", 0)))
+            commodity_weight.append(weights)
+            total_weight.append(total)
+            commodity_mass.append(masses)
+        return cls(
+            names=np.array(names, dtype=object),
+            moid_days=np.array(moid_days, dtype=np.int32),
+            commodity_weight=np.array(commodity_weight, dtype=np.float64).reshape(-1, len(COMMODITY_NAMES)),
+            total_weight=np.array(total_weight, dtype=np.float64),
+            commodity_mass=np.array(commodity_mass, dtype=np.float64).reshape(-1, len(COMMODITY_NAMES))
+        )
+
+def load_catalog(config_vars: Dict, refresh: bool = False) -> PlannerCatalog:
+    """
+    Catalog arrays shared by all requests in this process, rebuilt every CATALOG_TTL_SECONDS.
+    """
+    global _catalog, _catalog_loaded_at
+    with _catalog_lock:
+        if refresh or _catalog is None or time.monotonic() - _catalog_loaded_at > CATALOG_TTL_SECONDS:
+            started = time.monotonic()
+            cursor = db.asteroids.find({}, {"full_name": 1, "moid_days": 1, "elements.name": 1, "elements.mass_kg": 1, "commodity_factor": 1})
+            _catalog = PlannerCatalog.from_documents(cursor, config_vars)
+            _catalog_loaded_at = time.monotonic()
+            logging.info(f"Planner catalog loaded: {len(_catalog)} asteroids in {_catalog_loaded_at - started:.2f}s")
+        return _catalog
+
+def score_asteroids(catalog: PlannerCatalog, candidates: np.ndarray, config_vars: Dict, prices: Dict[str, int], mining_power: int, capacity: int, ship_reused: bool = False):
+    """
+    Expected commodity kg, revenue, cost and mission days for the catalog rows in `candidates`, one array each.
+    """
+    price = np.array([float(prices.get(name, 0) or 0) for name in COMMODITY_NAMES])
+    total_weight = np.where(catalog.total_weight[candidates] > 0, catalog.total_weight[candidates], 1.0)
+    share = catalog.commodity_weight[candidates] / total_weight[:, None]
+    expected_kg = np.minimum(capacity * share, catalog.commodity_mass[candidates])
+    revenue = expected_kg @ price
+
+    daily_yield = mining_power * HOURS_PER_DAY * config_vars["max_element_percentage"] / 2
+    mining_days = np.ceil(capacity / daily_yield)
+    mission_days = catalog.moid_days[candidates] * 2 + mining_days
+    ship_cost = config_vars["ship_cost"] * (config_vars["ship_reuse_discount"] if ship_reused else 1)
+    cost = ship_cost + config_vars["daily_mission_cost"] * mission_days
+    return expected_kg, revenue, cost, mission_days
+
+def rank_asteroids(catalog: PlannerCatalog, config_vars: Dict, prices: Dict[str, int], travel_days: int, mining_power: int, capacity: int, ship_reused: bool = False, k: int = 10) -> List[dict]:
+    """
+    Score every asteroid reachable within `travel_days` and return the top `k` by expected profit.
+
+    Expected cargo per commodity is the ship capacity times that commodity's share of the element
+    weights, capped by what is left on the asteroid. Cost is the ship plus daily_mission_cost for
+    the round trip and the mining days needed to fill the hold.
+    """
+    candidates = np.flatnonzero((catalog.moid_days > 0) & (catalog.moid_days <= travel_days) & (catalog.total_weight > 0))
+    if not candidates.size:
+        return []
+    expected_kg, revenue, cost, mission_days = score_asteroids(catalog, candidates, config_vars, prices, mining_power, capacity, ship_reused)
+    profit = revenue - cost
+
+    k = min(k, candidates.size)
+    top = np.argpartition(-profit, k - 1)[:k]
+    top = top[np.argsort(-profit[top])]
+    return [
+        {
+            "full_name": catalog.names[candidates[i]],
+            "moid_days": int(catalog.moid_days[candidates[i]]),
+            "mission_days": int(mission_days[i]),
+            "expected_commodity_kg": {name: int(kg) for name, kg in zip(COMMODITY_NAMES, expected_kg[i]) if kg > 0},
+            "expected_revenue": int(revenue[i]),
+            "expected_cost": int(cost[i]),
+            "expected_profit": int(profit[i])
+        }
+        for i in top
+    ]
+
+def plan_missions(travel_days: int, mining_power: int, capacity: int, ship_reused: bool = False, k: int = 10, prices: Optional[Dict[str, int]] = None) -> List[dict]:
+    config_vars = db.config.find_one({"name": "mining_globals"})["variables"]
+    catalog = load_catalog(config_vars)
+    return rank_asteroids(catalog, config_vars, prices if prices is not None else fetch_market_prices(), travel_days, mining_power, capacity, ship_reused, k)
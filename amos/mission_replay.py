@@ -0,0 +1,103 @@
+"""
+Re-derive logged missions and report where they differ.
+
+    python -m amos.mission_replay [--mission ID] [--rebuild] [--limit N]
+
+By default every logged mission is re-simulated from its genesis snapshot with the current simulator
+(in memory, nothing is written) and each step is compared with the day log, which is how a simulator
+change is checked against history. --rebuild instead folds the log and compares the result with the
+stored mission document, auditing the log itself.
+
+Replays hold the asteroid at its current composition, so days that were short-delivered because the
+asteroid was depleted show up as yield differences. Revenue and profit depend on market prices at
+the time and are not compared.
+"""
+import argparse
+import logging
+import sys
+from typing import Optional
+from bson import ObjectId
+from config import MongoDBConfig
+from amos.asteroid_depletion import get_asteroid
+from amos.element_vector import ElementIndex
+from amos.manage_mission import load_mission_context, simulate_mission_day
+from amos.mission_archive import load_mission_detail
+from amos.mission_log import diff_states, load_log, rebuild_state, state_from_document, step_event
+from amos.sim_state import MissionEffects, MissionState
+
+COMPARED_FIELDS = ("numbers", "kg", "events", "total_kg", "cost", "location", "delays", "days", "status")
+
+db = MongoDBConfig.get_database()
+
+def genesis_document(mission_raw: dict) -> dict:
+    """
+    The mission as start_mission created it, as far as the simulator is concerned.
+    """
+    return {
+        **mission_raw,
+        "status": 0, "elements_mined": {}, "events": [], "daily_summaries": [], "day_series": None, "total_yield_kg": 0,
+        "mission_cost": 0, "ship_location": 0, "travel_delays": 0, "days_into_mission": 0, "cost": 0,
+        "yield_multiplier": 1.0, "revenue_multiplier": 1.0, "travel_yield_mod": 1.0, "ship_repair_cost": 0,
+        "confidence_result": "", "completed_at": None
+    }
+
+def replay_mission(mission_raw: dict) -> dict:
+    mission_id = str(mission_raw["_id"])
+    genesis = db.mission_snapshots.find_one({"mission_id": mission_id, "seq": 0})
+    if not genesis or genesis["state"]["days_into_mission"] != 0:
+        return {"mission_id": mission_id, "skipped": "Logging started mid-mission, no genesis state to replay from"}
+    mission = MissionState.from_document(mission_raw)
+    ctx = load_mission_context(mission)
+    if isinstance(ctx, dict):
+        return {"mission_id": mission_id, "error": ctx["error"]}
+    index = ElementIndex(get_asteroid(mission.asteroid_full_name)["elements"])
+
+    document = genesis_document(mission_raw)
+    effects = MissionEffects()
+    logged_steps = load_log(mission_id)
+    diffs = []
+    for logged in logged_steps:
+        result = simulate_mission_day(document, ctx, effects, logged["day"], logged.get("api_event"), render_graph=False, dry_run=True)
+        if "error" in result:
+            diffs.append({"seq": logged["seq"], "day": logged["day"], "error": result["error"]})
+            break
+        replayed = step_event(mission_id, logged["seq"], logged["day"], document, result, index, logged.get("api_event"))
+        diff = diff_states({field: logged.get(field) for field in COMPARED_FIELDS}, {field: replayed.get(field) for field in COMPARED_FIELDS})
+        if diff:
+            diffs.append({"seq": logged["seq"], "day": logged["day"], "diff": diff})
+        document = {**document, **result}
+    return {"mission_id": mission_id, "steps": len(logged_steps), "diffs": diffs}
+
+def audit_mission(mission_raw: dict) -> dict:
+    mission_raw = load_mission_detail(mission_raw)
+    mission_id = str(mission_raw["_id"])
+    folded = rebuild_state(mission_id)
+    if folded is None:
+        return {"mission_id": mission_id, "skipped": "No day log"}
+    index = ElementIndex(get_asteroid(mission_raw["asteroid_full_name"])["elements"])
+    diff = diff_states(state_from_document(mission_raw, index), folded)
+    return {"mission_id": mission_id, "steps": int(mission_raw.get("log_seq", 0)), "diffs": [{"diff": diff}] if diff else []}
+
+def run(mission_id: Optional[str] = None, rebuild: bool = False, limit: int = 0) -> int:
+    query = {"_id": ObjectId(mission_id)} if mission_id else {"log_seq": {"$exists": True}}
+    check = audit_mission if rebuild else replay_mission
+    checked = differing = 0
+    for mission_raw in db.missions.find(query).limit(limit):
+        report = check(mission_raw)
+        checked += 1
+        if report.get("diffs") or report.get("error"):
+            differing += 1
+            print(report)
+        elif report.get("skipped"):
+            print(f"{report['mission_id']}: skipped - {report['skipped']}")
+    print(f"{checked} missions checked, {differing} differ")
+    return differing
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Re-derive logged missions and diff them against the log or the stored documents")
+    parser.add_argument("--mission", help="Only this mission id")
+    parser.add_argument("--rebuild", action="store_true", help="Fold the log and compare with the stored mission instead of re-simulating")
+    parser.add_argument("--limit", type=int, default=0, help="Check at most this many missions")
+    args = parser.parse_args()
+    logging.disable(logging.INFO)
+    sys.exit(1 if run(args.mission, args.rebuild, args.limit) else 0)
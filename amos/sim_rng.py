@@ -0,0 +1,35 @@
+import secrets
+from bson import ObjectId
+import numpy as np
+
+SEED_BITS = 63  # Fits a signed BSON int64
+
+# Stable stream ids; never renumber, or stored missions will replay differently
+PURPOSES = {
+    "travel": 1,
+    "mining": 2,
+    "events": 3,
+    "weights": 4,
+    "settlement": 5
+}
+
+def new_mission_seed() -> int:
+    return secrets.randbits(SEED_BITS)
+
+def mission_seed(mission_raw: dict) -> int:
+    """
+    Seed stored on the mission, or one derived from its _id for missions created before seeding.
+    """
+    seed = mission_raw.get("seed")
+    if seed is not None:
+        return int(seed)
+    return int(str(ObjectId(mission_raw["_id"])), 16) & ((1 << SEED_BITS) - 1)
+
+def mission_rng(seed: int, day: int, purpose: str) -> np.random.Generator:
+    """
+    Counter-based stream for one (mission, day, purpose).
+    The mission seed is the Philox key and (purpose, day) sit in the high counter words, so a stream
+    depends only on its coordinates: day N can be recomputed on any process, in any order.
+    """
+    counter = np.array([0, 0, PURPOSES[purpose], int(day or 0)], dtype=np.uint64)
+    return np.random.Generator(np.random.Philox(key=seed, counter=counter))
@@ -0,0 +1,101 @@
+from typing import Dict, List, Optional, Union
+from bson import ObjectId
+from bson.int64 import Int64
+from amos.element_vector import ElementVector
+from amos.sim_rng import mission_seed
+
+class DayResult:
+    """
+    One simulated mission day. Serializes to the same shape as MissionDay.dict().
+    `elements_mined` may be an ElementVector; it is converted to a name -> kg dict only in to_dict().
+    `hourly_kg` (per-hour element kg) is only stored when the mining config asks for it.
+    """
+    __slots__ = ("day", "total_kg", "note", "events", "elements_mined", "daily_value", "hourly_kg")
+
+    def __init__(self, day: int, total_kg: int = 0, note: str = "", events: Optional[List[dict]] = None, elements_mined: Optional[Union[Dict[str, int], ElementVector]] = None, daily_value: Optional[int] = 0, hourly_kg: Optional[List[int]] = None):
+        self.day = day
+        self.total_kg = total_kg
+        self.note = note
+        self.events = events if events is not None else []
+        self.elements_mined = elements_mined
+        self.daily_value = daily_value
+        self.hourly_kg = hourly_kg
+
+    def to_dict(self) -> dict:
+        summary = {
+            "day": self.day,
+            "total_kg": int(self.total_kg),
+            "note": self.note,
+            "events": self.events,
+            "elements_mined": self.elements_mined.to_dict() if isinstance(self.elements_mined, ElementVector) else self.elements_mined,
+            "daily_value": int(self.daily_value) if self.daily_value is not None else None
+        }
+        if self.hourly_kg is not None:
+            summary["hourly_kg"] = self.hourly_kg
+        return summary
+
+class MissionState:
+    """
+    Mutable mission fields the simulator reads and writes while stepping days.
+    Built straight from the stored document; pydantic validation stays at the API boundary.
+    """
+    __slots__ = (
+        "id", "user_id", "seed", "company", "ship_name", "asteroid_full_name", "name", "budget", "status", "cost",
+        "rocket_owned", "yield_multiplier", "revenue_multiplier", "travel_yield_mod", "ship_repair_cost",
+        "previous_debt", "travel_delays", "target_yield_kg", "completed_at"
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def from_document(cls, mission_raw: dict) -> "MissionState":
+        user_id = mission_raw["user_id"]
+        return cls(
+            id=str(mission_raw["_id"]),
+            user_id=str(user_id) if isinstance(user_id, ObjectId) else user_id,
+            seed=mission_seed(mission_raw),
+            company=mission_raw.get("company"),
+            ship_name=mission_raw.get("ship_name"),
+            asteroid_full_name=mission_raw["asteroid_full_name"],
+            name=mission_raw.get("name"),
+            budget=int(mission_raw.get("budget", 0)),
+            status=int(mission_raw.get("status", 0)),
+            cost=int(mission_raw.get("cost", 0)),
+            rocket_owned=mission_raw.get("rocket_owned", True),
+            yield_multiplier=mission_raw.get("yield_multiplier", 1.0),
+            revenue_multiplier=mission_raw.get("revenue_multiplier", 1.0),
+            travel_yield_mod=mission_raw.get("travel_yield_mod", 1.0),
+            ship_repair_cost=Int64(mission_raw.get("ship_repair_cost", 0)),
+            previous_debt=Int64(mission_raw.get("previous_debt", 0)),
+            travel_delays=Int64(mission_raw.get("travel_delays", 0)),
+            target_yield_kg=Int64(int(mission_raw.get("target_yield_kg", 0) or 0)),
+            completed_at=mission_raw.get("completed_at")
+        )
+
+class MissionContext:
+    """
+    Per-mission inputs that stay fixed while days are simulated: config, the events table, ship, user settings,
+    prices and the schedule. Loaded once so a multi-day advance does not re-read them for every day.
+    """
+    __slots__ = (
+        "config_vars", "events", "ship", "company_name", "max_overrun_days", "loan_count", "prices", "confidence",
+        "profit_min", "profit_max", "base_travel_days", "estimated_mining_days", "scheduled_days"
+    )
+
+    def __init__(self, **fields):
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+class MissionEffects:
+    """
+    Side effects collected while simulating and applied only after the mission write wins.
+    """
+    __slots__ = ("destroyed_on_day", "ship", "depleted", "ship_location")
+
+    def __init__(self):
+        self.destroyed_on_day = None
+        self.ship = None
+        self.depleted = []
+        self.ship_location = None
@@ -0,0 +1,149 @@
+import hashlib
+import logging
+import threading
+import time
+from typing import Dict, Tuple
+import numpy as np
+from bson import ObjectId
+from config import MongoDBConfig
+from models.models import PyInt64
+from amos.asteroid_depletion import get_asteroid
+from amos.manage_mission import simulate_mission_day
+from amos.mine_asteroid import confidence_from_inputs, fetch_market_prices, HOURS_PER_DAY
+from amos.sim_state import MissionContext, MissionEffects
+from amos.sim_rng import SEED_BITS
+
+MAX_RUNS = 200
+MAX_SIMULATED_DAYS = 1000
+TIME_BUDGET_SECONDS = 2.0
+CACHE_TTL_SECONDS = 300
+CACHE_MAX_ENTRIES = 512
+DEFAULT_SHIP = {"mining_power": 500, "capacity": 50000, "shield": 100, "hull": 100}
+
+db = MongoDBConfig.get_database()
+_cache: Dict[tuple, Tuple[float, dict]] = {}
+_cache_lock = threading.Lock()
+
+def _base_seed(key: tuple) -> int:
+    # Identical requests replay identical streams, which is what makes the cache safe
+    digest = hashlib.sha256(repr(key).encode()).digest()
+    return int.from_bytes(digest[:8], "big") & ((1 << SEED_BITS) - 1)
+
+def _cached(key: tuple):
+    with _cache_lock:
+        entry = _cache.get(key)
+    if entry and time.monotonic() - entry[0] < CACHE_TTL_SECONDS:
+        return entry[1]
+    return None
+
+def _store(key: tuple, result: dict):
+    with _cache_lock:
+        if len(_cache) >= CACHE_MAX_ENTRIES:
+            _cache.pop(min(_cache, key=lambda k: _cache[k][0]))
+        _cache[key] = (time.monotonic(), result)
+
+def _percentiles(values: list) -> dict:
+    if not values:
+        return {"mean": None, "p10": None, "p50": None, "p90": None}
+    array = np.asarray(values, dtype=np.float64)
+    p10, p50, p90 = np.percentile(array, [10, 50, 90])
+    return {"mean": int(array.mean()), "p10": int(p10), "p50": int(p50), "p90": int(p90)}
+
+def _dry_run_context(asteroid: dict, ship: dict, travel_days: int, max_overrun_days: int) -> MissionContext:
+    config_vars = db.config.find_one({"name": "mining_globals"})["variables"]
+    daily_yield_rate = PyInt64(ship["mining_power"] * HOURS_PER_DAY * config_vars["max_element_percentage"])
+    prices = fetch_market_prices()
+    confidence, profit_min, profit_max = confidence_from_inputs(config_vars, prices, travel_days, ship["mining_power"], ship["capacity"], max_overrun_days, False)
+    base_travel_days = PyInt64(travel_days)
+    estimated_mining_days = PyInt64(int(ship["capacity"] / daily_yield_rate))
+    return MissionContext(
+        config_vars=config_vars,
+        events=list(db.events.find()),
+        ship={**ship, "_id": None, "name": "What-if", "missions": []},
+        company_name="What-if",
+        max_overrun_days=max_overrun_days,
+        loan_count=0,
+        prices=prices,
+        confidence=confidence,
+        profit_min=profit_min,
+        profit_max=PyInt64(profit_max or 0),
+        base_travel_days=base_travel_days,
+        estimated_mining_days=estimated_mining_days,
+        scheduled_days=PyInt64(base_travel_days * 2 + estimated_mining_days)
+    )
+
+def simulate_what_if(asteroid_full_name: str, travel_days: int, ship: dict = None, runs: int = 20, max_overrun_days: int = 10, time_budget: float = TIME_BUDGET_SECONDS) -> dict:
+    """
+    Run a hypothetical mission `runs` times in memory and aggregate the outcomes.
+
+    Nothing is written to missions, ships, users or asteroids. Simulation stops when `time_budget` seconds
+    are used up, even mid-run; the result says how many runs completed and is marked truncated.
+    Results are cached per input for CACHE_TTL_SECONDS.
+    Raises ValueError for an unknown asteroid.
+    """
+    ship = {**DEFAULT_SHIP, **(ship or {})}
+    runs = max(1, min(runs, MAX_RUNS))
+    key = (asteroid_full_name, travel_days, ship["mining_power"], ship["capacity"], ship["shield"], ship["hull"], runs, max_overrun_days)
+    cached = _cached(key)
+    if cached is not None:
+        return {**cached, "cached": True}
+
+    asteroid = get_asteroid(asteroid_full_name)
+    if not asteroid:
+        raise ValueError(f"No asteroid found with full_name {asteroid_full_name}")
+    ctx = _dry_run_context(asteroid, ship, travel_days, max_overrun_days)
+    base_seed = _base_seed(key)
+    deadline = time.monotonic() + time_budget
+
+    outcomes = []
+    out_of_time = False
+    for run in range(runs):
+        if out_of_time or time.monotonic() > deadline:
+            break
+        document = {
+            "_id": ObjectId(), "seed": (base_seed + run) & ((1 << SEED_BITS) - 1), "user_id": "what-if", "company": "What-if",
+            "ship_name": "What-if", "asteroid_full_name": asteroid_full_name, "name": f"{asteroid_full_name} What-if",
+            "budget": 0, "status": 0, "elements_mined": {}, "events": [], "daily_summaries": [], "ship_location": 0,
+            "total_yield_kg": 0, "mission_cost": 0, "target_yield_kg": ship["capacity"]
+        }
+        effects = MissionEffects()
+        result = {}
+        for day in range(1, MAX_SIMULATED_DAYS + 1):
+            # A single slow-mining run can last MAX_SIMULATED_DAYS, so the budget is enforced per day
+            if time.monotonic() > deadline:
+                out_of_time = True
+                break
+            result = simulate_mission_day(document, ctx, effects, day, render_graph=False, dry_run=True)
+            if "error" in result:
+                break
+            document = {**document, **result}
+            if result["status"] in (1, 2):
+                break
+        if out_of_time:
+            break
+        if "error" in result:
+            logging.error(f"What-if run {run} for {asteroid_full_name} failed: {result['error']}")
+            continue
+        outcomes.append((int(result["status"]), int(result["profit"]), int(result["revenue"]), int(result["total_yield_kg"]), int(result["days_into_mission"])))
+
+    completed = [o for o in outcomes if o[0] == 1]
+    summary = {
+        "asteroid_full_name": asteroid_full_name,
+        "travel_days": travel_days,
+        "ship": ship,
+        "runs_requested": runs,
+        "runs_completed": len(outcomes),
+        "truncated": len(outcomes) < runs,
+        "success_rate": round(len(completed) / len(outcomes), 3) if outcomes else None,
+        "failure_rate": round(sum(1 for o in outcomes if o[0] == 2) / len(outcomes), 3) if outcomes else None,
+        "confidence": ctx.confidence,
+        "predicted_profit_max": int(ctx.profit_max),
+        "profit": _percentiles([o[1] for o in completed]),
+        "revenue": _percentiles([o[2] for o in completed]),
+        "yield_kg": _percentiles([o[3] for o in completed]),
+        "days": _percentiles([o[4] for o in outcomes])
+    }
+    # Only full answers are cached; a truncated one should get another chance at its budget
+    if not summary["truncated"]:
+        _store(key, summary)
+    return {**summary, "cached": False}
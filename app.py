@@ -1,10 +1,17 @@
-from fastapi import FastAPI
+import time
+from fastapi import FastAPI, Request
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 from routes.auth import router as auth_router
 from routes.missions import router as missions_router
 from routes.ships import router as ships_router
 from routes.leaderboard import router as leaderboard_router
+from routes.metrics import router as metrics_router
+from amos.job_queue import JobWorkerPool
+from amos.mission_numbers import migrate_mission_counters
+from amos.mission_archive import schedule_compaction
+from amos.leaderboard_history import schedule_leaderboard_snapshots
+from utils.metrics import REQUEST_LATENCY, flush_metrics, start_metrics_flusher
 
 app = FastAPI()
 templates = Jinja2Templates(directory="templates")
@@ -14,4 +21,37 @@ app.mount("/static", StaticFiles(directory="static"), name="static")
 app.include_router(auth_router)
 app.include_router(missions_router)
 app.include_router(ships_router)
-app.include_router(leaderboard_router)
\ No newline at end of file
+app.include_router(leaderboard_router)
+app.include_router(metrics_router)
+
+@app.middleware("http")
+async def record_request_latency(request: Request, call_next):
+    started = time.perf_counter()
+    status_code = 500
+    try:
+        response = await call_next(request)
+        status_code = response.status_code
+        return response
+    finally:
+        # Label by route template, not the raw path, so ids in URLs do not multiply the series
+        route = request.scope.get("route")
+        REQUEST_LATENCY.observe(time.perf_counter() - started, request.method, route.path if route else "unmatched", str(status_code))
+
+job_pool = JobWorkerPool()
+metrics_flusher = None
+
+@app.on_event("startup")
+def start_job_workers():
+    global metrics_flusher
+    metrics_flusher = start_metrics_flusher()
+    migrate_mission_counters()
+    schedule_compaction()
+    schedule_leaderboard_snapshots()
+    job_pool.start()
+
+@app.on_event("shutdown")
+def stop_job_workers():
+    job_pool.stop()
+    if metrics_flusher:
+        metrics_flusher.set()
+    flush_metrics()
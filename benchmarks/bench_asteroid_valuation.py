@@ -0,0 +1,40 @@
+"""
+Microbenchmark: revaluing the asteroid catalog at new prices.
+
+Builds N asteroid documents (default 200,000) shaped like the revaluation projection and compares
+pricing them one at a time in Python with amos.asteroid_valuation's mass matrix and single
+matrix-vector product.
+
+Usage:
+    python -m benchmarks.bench_asteroid_valuation [asteroids]
+"""
+import random
+import sys
+import time
+from amos.asteroid_valuation import asteroid_values, priced_mass_matrix
+
+PRICES = {"Copper": 300, "Silver": 1000, "Palladium": 32000, "Platinum": 31000, "Gold": 85000}
+NUMBERS = {29: "Copper", 47: "Silver", 46: "Palladium", 78: "Platinum", 79: "Gold"}
+ELEMENTS = [8, 12, 14, 26, 27, 28, 29, 46, 47, 78, 79]
+
+def synthetic_catalog(count: int):
+    rng = random.Random(0)
+    return [{"value": 0, "elements": [{"number": number, "mass_kg": rng.randint(0, 10**9)} for number in rng.sample(ELEMENTS, rng.randint(4, len(ELEMENTS)))]} for _ in range(count)]
+
+def per_asteroid(asteroids):
+    return [int(sum(e["mass_kg"] * PRICES.get(NUMBERS.get(e["number"]), 0) for e in asteroid["elements"])) for asteroid in asteroids]
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    asteroids = synthetic_catalog(count)
+    started = time.perf_counter()
+    expected = per_asteroid(asteroids)
+    loop_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    matrix = priced_mass_matrix(asteroids)
+    build_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    values = asteroid_values(matrix, PRICES)
+    product_seconds = time.perf_counter() - started
+    assert values.tolist() == expected
+    print(f"{count:,} asteroids: per-asteroid loop {loop_seconds * 1e3:.0f} ms, mass matrix {build_seconds * 1e3:.0f} ms + product {product_seconds * 1e3:.1f} ms")
@@ -0,0 +1,52 @@
+"""
+Microbenchmark: the CPU side of catalog ingestion.
+
+Writes a synthetic SBDB-style CSV of N rows (default 200,000) and times reading it chunk by chunk
+and turning each chunk into upserts with amos.catalog_ingest.chunk_operations, i.e. everything but
+the database round trips, which run on the worker pool alongside it.
+
+Usage:
+    python -m benchmarks.bench_catalog_ingest [rows]
+"""
+import csv
+import gc
+import itertools
+import os
+import random
+import sys
+import tempfile
+import time
+from amos.catalog_ingest import ELEMENT_COLUMNS, INGEST_CHUNK_SIZE, INGEST_GC_THRESHOLD, chunk_operations, normalize_row, read_catalog
+from amos.element_vector import price_vector
+
+PRICES = {"Copper": 300, "Silver": 1000, "Palladium": 32000, "Platinum": 31000, "Gold": 85000}
+CLASSES = ["APO", "ATE", "AMO", "MBA", "OMB", "IMB", "TJN", "MCA"]
+COLUMNS = ["spkid", "full_name", "pdes", "name", "neo", "pha", "H", "diameter", "albedo", "diameter_sigma", "orbit_id", "moid", "class"]
+
+def write_catalog(path: str, count: int):
+    rng = random.Random(0)
+    with open(path, "w", newline="") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(COLUMNS)
+        for i in range(count):
+            diameter = f"{rng.uniform(0.1, 40):.3f}" if i % 4 == 0 else ""
+            writer.writerow([20000000 + i, f"({i}) Synthetic {i}", i, "", "Y" if i % 7 == 0 else "N", "N", f"{rng.uniform(10, 25):.2f}",
+                             diameter, f"{rng.uniform(0.03, 0.5):.3f}" if diameter else "", "", "JPL 1", f"{rng.uniform(0.0005, 3):.5f}", rng.choice(CLASSES)])
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    gc.set_threshold(INGEST_GC_THRESHOLD)  # As the ingest command does
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "catalog.csv")
+        write_catalog(path, count)
+        price_per_kg = price_vector(PRICES)[[number for number, _ in ELEMENT_COLUMNS]]
+        rows = read_catalog(path)
+        operations = 0
+        started = time.perf_counter()
+        while True:
+            chunk = list(itertools.islice(rows, INGEST_CHUNK_SIZE))
+            if not chunk:
+                break
+            operations += len(chunk_operations([normalize_row(row) for row in chunk], price_per_kg))
+        seconds = time.perf_counter() - started
+    print(f"{operations:,} rows read and derived in {seconds:.2f} s ({operations / seconds:,.0f} rows/s, {1e6 / (operations / seconds) / 60:.1f} min per million)")
@@ -0,0 +1,52 @@
+"""
+Microbenchmark: stored daily summaries.
+
+Builds a mission's worth of mining days, then compares the legacy list of summary sub-documents
+with the columnar day_series encoding: BSON size, the time to decode the document into the days
+sequence, and the time to read it the way the mission graph does (per-element columns plus values).
+
+Usage:
+    python -m benchmarks.bench_day_series [days]
+"""
+import random
+import sys
+import timeit
+import bson
+from amos.day_series import DaySeries, mission_days
+from amos.manage_mission import get_daily_value, get_element_series
+
+ELEMENTS = ["Iron", "Nickel", "Cobalt", "Copper", "Silver", "Palladium", "Platinum", "Gold"]
+PRICES = {"Copper": 300, "Silver": 30000, "Palladium": 40000, "Platinum": 30000, "Gold": 90000}
+
+def make_summaries(days: int) -> list:
+    summaries = []
+    for day in range(1, days + 1):
+        mined = {name: random.randint(50, 900) for name in ELEMENTS}
+        summaries.append({
+            "day": day,
+            "total_kg": sum(mined.values()),
+            "note": "Mining",
+            "events": [{"name": "Dust Storm", "effect": {"yield_multiplier": 0.5}}] if day % 9 == 0 else [],
+            "elements_mined": mined,
+            "daily_value": sum(kg * PRICES.get(name, 0) for name, kg in mined.items())
+        })
+    return summaries
+
+def decode(document: bytes):
+    return mission_days(bson.decode(document))
+
+def read_columns(days) -> int:
+    return sum(sum(column) for column in get_element_series(days).values()) + sum(get_daily_value(d) for d in days)
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 50
+    summaries = make_summaries(days)
+    legacy = bson.encode({"daily_summaries": summaries})
+    columnar = bson.encode({"day_series": DaySeries.from_summaries(summaries).to_document()})
+    assert read_columns(decode(legacy)) == read_columns(decode(columnar))
+    print(f"{days} days: legacy {len(legacy):,} bytes, day_series {len(columnar):,} bytes ({len(legacy) / len(columnar):.1f}x smaller)")
+    for name, document in (("legacy", legacy), ("day_series", columnar)):
+        decoded = decode(document)
+        decode_us = timeit.timeit(lambda: decode(document), number=200) / 200 * 1e6
+        read_us = timeit.timeit(lambda: read_columns(decoded), number=200) / 200 * 1e6
+        print(f"{name:>10}: {decode_us:8.1f} us to decode, {read_us:8.1f} us to read element columns and values")
@@ -0,0 +1,48 @@
+"""
+Microbenchmark: hour-granular mining.
+
+Compares a per-hour Python loop (random draws and a weighted element split per hour,
+as legacy mine_hourly did) with amos.hourly_mining.mine_hours, which draws every hour
+of the run as one array operation. Reports time per simulated day.
+
+Usage:
+    python -m benchmarks.bench_hourly_mining [days]
+"""
+import random
+import sys
+import timeit
+import numpy as np
+from amos.hourly_mining import HOURS_PER_DAY, mine_hours, DEFAULT_HOURLY_EVENTS
+
+NUMBERS = [26, 28, 27, 29, 47, 46, 78, 79]
+WEIGHTS = [1.5, 1.2, 1.0, 4.0, 4.0, 4.0, 7.5, 7.5]
+MINING_POWER = 500
+SEED = 12345
+
+def loop_hours(hours: int):
+    total_weight = sum(WEIGHTS)
+    per_hour = []
+    for _ in range(hours):
+        extracted = random.randint(1, MINING_POWER)
+        multiplier = 1.0
+        for _, probability, effect in DEFAULT_HOURLY_EVENTS:
+            if random.random() < probability:
+                multiplier *= effect
+        element_kg = int(extracted * random.uniform(0.0, 0.5) * multiplier)
+        split = {number: int(element_kg * weight / total_weight) for number, weight in zip(NUMBERS, WEIGHTS)}
+        per_hour.append(split)
+    return per_hour
+
+def vector_hours(hours: int, rng: np.random.Generator):
+    return mine_hours(hours, MINING_POWER, NUMBERS, WEIGHTS, rng).daily_rollup()
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    hours = days * HOURS_PER_DAY
+    random.seed(SEED)
+    rng = np.random.default_rng(SEED)
+    results = {}
+    for name, func in (("loop", loop_hours), ("vector", lambda hours: vector_hours(hours, rng))):
+        results[name] = timeit.timeit(lambda: func(hours), number=20) / (20 * days)
+        print(f"{name:>8}: {results[name] * 1e6:8.1f} us/day over {days} days ({hours} hours)")
+    print(f"speedup: {results['loop'] / results['vector']:.1f}x")
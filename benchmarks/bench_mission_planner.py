@@ -0,0 +1,34 @@
+"""
+Microbenchmark: ranking the asteroid catalog with the vectorized mission planner.
+
+Builds a synthetic catalog of N asteroids (default 100,000) and times
+amos.mission_planner.rank_asteroids for one ship and travel time.
+
+Usage:
+    python -m benchmarks.bench_mission_planner [asteroids]
+"""
+import random
+import sys
+import timeit
+from amos.mission_planner import PlannerCatalog, rank_asteroids
+
+CONFIG = {
+    "commodity_factor_platinum_gold": 1.0, "commodity_factor_other": 1.0, "non_commodity_weight": 1.0,
+    "max_element_percentage": 0.5, "ship_cost": 150000000, "ship_reuse_discount": 0.5, "daily_mission_cost": 50000
+}
+PRICES = {"Copper": 300, "Silver": 1000, "Palladium": 32000, "Platinum": 31000, "Gold": 85000}
+ELEMENTS = [("Iron", 26), ("Nickel", 28), ("Cobalt", 27), ("Copper", 29), ("Silver", 47), ("Palladium", 46), ("Platinum", 78), ("Gold", 79)]
+
+def synthetic_catalog(count: int):
+    rng = random.Random(0)
+    for i in range(count):
+        elements = [{"name": name, "number": number, "mass_kg": rng.randint(0, 10**9)} for name, number in rng.sample(ELEMENTS, rng.randint(2, len(ELEMENTS)))]
+        yield {"full_name": f"Asteroid {i}", "moid_days": rng.randint(1, 30), "elements": elements, "commodity_factor": rng.uniform(0.5, 1.5)}
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    catalog = PlannerCatalog.from_documents(synthetic_catalog(count), CONFIG)
+    seconds = timeit.timeit(lambda: rank_asteroids(catalog, CONFIG, PRICES, travel_days=20, mining_power=500, capacity=50000, k=10), number=20) / 20
+    print(f"rank {count} asteroids: {seconds * 1e3:.1f} ms")
+    for entry in rank_asteroids(catalog, CONFIG, PRICES, travel_days=20, mining_power=500, capacity=50000, k=3):
+        print(f"  {entry['full_name']}: ${entry['expected_profit']:,} over {entry['mission_days']} days")
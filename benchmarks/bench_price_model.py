@@ -0,0 +1,38 @@
+"""
+Microbenchmark: simulating commodity price history.
+
+Generates N days (default ten years) of daily prices for every commodity, once stepping each
+commodity day by day in Python and once with amos.market_prices.simulate_prices' single cumulative
+sum, from the same shocks so the two paths can be compared.
+
+Usage:
+    python -m benchmarks.bench_price_model [days]
+"""
+import math
+import sys
+import time
+import numpy as np
+from amos.market_prices import COMMODITIES, DEFAULT_PRICES, fit_gbm, simulate_prices
+
+SEED = 0
+
+def per_day(model, shocks):
+    prices = []
+    current = model.start.tolist()
+    for day_shocks in shocks.tolist():
+        current = [price * math.exp(mu - sigma ** 2 / 2 + sigma * shock) for price, mu, sigma, shock in zip(current, model.drift.tolist(), model.volatility.tolist(), day_shocks)]
+        prices.append(current)
+    return np.array(prices)
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 3650
+    model = fit_gbm(COMMODITIES, np.array([[DEFAULT_PRICES[c] for c in COMMODITIES]], dtype=np.float64))
+    shocks = np.random.Generator(np.random.Philox(key=SEED, counter=np.zeros(4, dtype=np.uint64))).standard_normal((days, len(COMMODITIES)))
+    started = time.perf_counter()
+    expected = per_day(model, shocks)
+    loop_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    prices = simulate_prices(model, days, SEED)
+    vector_seconds = time.perf_counter() - started
+    assert np.allclose(prices, expected, rtol=1e-9)
+    print(f"{days:,} days x {len(COMMODITIES)} commodities: per-day loop {loop_seconds * 1e3:.1f} ms, vectorized {vector_seconds * 1e3:.2f} ms")
@@ -0,0 +1,74 @@
+"""
+Microbenchmark: per-day cost of the simulator's mission state.
+
+Compares the old loop, which validated MissionModel/ShipModel/User and built a
+MissionDay plus one AsteroidElementModel per element every simulated day, with
+the __slots__ MissionState/DayResult path. Reports time and peak allocation per
+simulated day.
+
+Usage:
+    python -m benchmarks.bench_sim_state [days]
+"""
+import sys
+import timeit
+import tracemalloc
+from datetime import datetime, UTC
+from bson import ObjectId
+from models.models import MissionModel, ShipModel, User, MissionDay, AsteroidElementModel
+from amos.sim_state import DayResult, MissionState
+
+ELEMENTS = {"Iron": 26, "Nickel": 28, "Cobalt": 27, "Copper": 29, "Silver": 47, "Palladium": 46, "Platinum": 78, "Gold": 79}
+
+def sample_documents():
+    user_id = ObjectId()
+    mission = {
+        "_id": ObjectId(), "user_id": str(user_id), "company": "Bench", "ship_name": "Bench 1", "ship_id": str(ObjectId()),
+        "asteroid_full_name": "433 Eros (A898 PA)", "name": "433 Eros (A898 PA) Mission 1", "travel_days_allocated": 5,
+        "mining_days_allocated": 16, "total_duration_days": 0, "scheduled_days": 26, "budget": 200000000, "status": 0,
+        "elements": [], "elements_mined": {}, "cost": 0, "revenue": 0, "profit": 0, "penalties": 0, "investor_repayment": 0,
+        "ship_repair_cost": 0, "previous_debt": 0, "events": [], "daily_summaries": [], "rocket_owned": True,
+        "yield_multiplier": 1.0, "revenue_multiplier": 1.0, "travel_yield_mod": 1.0, "travel_delays": 0,
+        "target_yield_kg": 50000, "ship_location": 5.0, "total_yield_kg": 0, "days_into_mission": 6, "days_left": 20,
+        "mission_cost": 0, "mission_projection": 0, "confidence": 50.0, "completed_at": None
+    }
+    ship = {
+        "_id": ObjectId(), "name": "Bench 1", "user_id": str(user_id), "shield": 100, "mining_power": 500,
+        "created": datetime.now(UTC), "days_in_service": 0, "location": 5.0, "mission": 0, "hull": 100, "cargo": [],
+        "capacity": 50000, "active": True, "missions": [], "destroyed": False
+    }
+    user = {"_id": user_id, "username": "bench", "hashed_password": "x", "company_name": "Bench", "loan_count": 0, "max_overrun_days": 10}
+    return mission, ship, user
+
+def pydantic_day(mission_raw, ship_raw, user_raw, day):
+    mission = MissionModel(**mission_raw)
+    ship = ShipModel(**ship_raw)
+    user = User(**{**user_raw, "_id": str(user_raw["_id"])})
+    mined = {name: day * 10 + number for name, number in ELEMENTS.items()}
+    summary = MissionDay(day=day, total_kg=sum(mined.values()), elements_mined=mined, events=[], daily_value=0, note="Mining day")
+    elements = [AsteroidElementModel(name=name, mass_kg=kg, number=ELEMENTS[name]) for name, kg in mined.items()]
+    return summary.dict(), [e.model_dump() for e in elements], ship.capacity, user.loan_count, mission.status
+
+def slots_day(mission_raw, ship_raw, user_raw, day):
+    mission = MissionState.from_document(mission_raw)
+    mined = {name: day * 10 + number for name, number in ELEMENTS.items()}
+    summary = DayResult(day=day, total_kg=sum(mined.values()), elements_mined=mined, events=[], daily_value=0, note="Mining day")
+    elements = [{"name": name, "mass_kg": kg, "number": ELEMENTS[name]} for name, kg in mined.items()]
+    return summary.to_dict(), elements, ship_raw["capacity"], user_raw.get("loan_count", 0), mission.status
+
+def measure(func, days: int):
+    mission, ship, user = sample_documents()
+    seconds = timeit.timeit(lambda: [func(mission, ship, user, d) for d in range(days)], number=5) / (5 * days)
+    tracemalloc.start()
+    for d in range(days):
+        func(mission, ship, user, d)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return seconds, peak
+
+if __name__ == "__main__":
+    days = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    results = {name: measure(func, days) for name, func in (("pydantic", pydantic_day), ("slots", slots_day))}
+    for name, (seconds, peak) in results.items():
+        print(f"{name:>8}: {seconds * 1e6:8.1f} us/day, peak {peak / 1024:8.1f} KiB over {days} days")
+    speedup = results["pydantic"][0] / results["slots"][0]
+    print(f"speedup: {speedup:.1f}x")
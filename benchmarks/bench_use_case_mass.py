@@ -0,0 +1,51 @@
+"""
+Microbenchmark: summing mined mass per use case.
+
+Builds an element catalog of all 118 elements with random uses and N users' mined kg by element (default
+10,000), then compares the per-element loop over each element's uses with amos.element_catalog's
+mass matrix and use-case mask product.
+
+Usage:
+    python -m benchmarks.bench_use_case_mass [users]
+"""
+import random
+import sys
+import time
+from amos.element_catalog import USE_CASES, ElementCatalog
+from amos.element_vector import MAX_ATOMIC_NUMBER
+
+def synthetic_elements(rng):
+    return [{"_id": str(number), "name": f"Element{number}", "number": number, "atomic_mass": 1.0, "category": "synthetic", "period": 1, "group": 1,
+             "phase": "Solid", "summary": "", "symbol": f"E{number}", "xpos": 1, "ypos": 1, "wxpos": 1, "wypos": 1, "shells": [1],
+             "electron_configuration": "", "electron_configuration_semantic": "", "ionization_energies": [], "block": "s",
+             "uses": rng.sample(USE_CASES, rng.randint(0, 4)), "classes": []} for number in range(1, MAX_ATOMIC_NUMBER + 1)]
+
+def per_element(masses, element_uses):
+    totals = []
+    for by_name in masses:
+        use_case_mass = {use: 0 for use in USE_CASES}
+        for name, kg in by_name.items():
+            for use in element_uses.get(name, []):
+                if use in use_case_mass:
+                    use_case_mass[use] += kg
+        totals.append([use_case_mass[use] for use in USE_CASES])
+    return totals
+
+if __name__ == "__main__":
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    rng = random.Random(0)
+    elements = synthetic_elements(rng)
+    catalog = ElementCatalog(elements)
+    element_uses = {element["name"]: element["uses"] for element in elements}
+    masses = [{element["name"]: rng.randint(0, 10**6) for element in rng.sample(elements, 20)} for _ in range(count)]
+    started = time.perf_counter()
+    expected = per_element(masses, element_uses)
+    loop_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    matrix = catalog.mass_matrix(masses)
+    build_seconds = time.perf_counter() - started
+    started = time.perf_counter()
+    use_case_mass = catalog.use_case_mass(matrix)
+    product_seconds = time.perf_counter() - started
+    assert use_case_mass.astype(int).tolist() == expected
+    print(f"{count:,} users: per-element loop {loop_seconds * 1e3:.0f} ms, mass matrix {build_seconds * 1e3:.0f} ms + mask product {product_seconds * 1e3:.1f} ms")
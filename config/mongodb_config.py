@@ -1,4 +1,5 @@
 from pymongo import MongoClient
+from utils.metrics import MongoCommandMetrics
 from dotenv import load_dotenv
 import os
 
@@ -12,8 +13,8 @@ class MongoDBConfig:
     # Get MongoDB URI from environment variables
     MONGODB_URI = os.getenv("MONGODB_URI")
 
-    # Initialize MongoDB client
-    _client = MongoClient(MONGODB_URI)
+    # Initialize MongoDB client, timing every command for /metrics
+    _client = MongoClient(MONGODB_URI, event_listeners=[MongoCommandMetrics()])
 
     # Specify the database
     _db = _client["asteroids"]  # Replace with your actual database name
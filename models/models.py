@@ -63,6 +63,22 @@ class MissionStart(BaseModel):
     ship_name: str
     travel_days: int  # Reverted to required
 
+class MissionSimulation(BaseModel):
+    asteroid_full_name: str
+    travel_days: int = Field(ge=1, le=500)
+    mining_power: int = Field(default=500, ge=1, le=100000)
+    capacity: int = Field(default=50000, ge=1, le=10000000)
+    shield: int = Field(default=100, ge=0, le=100)
+    hull: int = Field(default=100, ge=1, le=100)
+    runs: int = Field(default=20, ge=1, le=200)
+
+class FleetLaunch(BaseModel):
+    travel_days: int = Field(ge=1)
+    ship_names: Optional[List[str]] = None
+    asteroid_full_names: Optional[List[str]] = None
+    max_budget: Optional[int] = Field(default=None, ge=0)
+    max_loans: Optional[int] = Field(default=None, ge=0)
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -206,8 +222,8 @@ class MissionModel(BaseModel):
     investor_repayment: int
     ship_repair_cost: int
     previous_debt: int
-    events: List[dict]
-    daily_summaries: List[dict]
+    events: List[dict] = []
+    daily_summaries: List[dict] = []
     rocket_owned: bool
     yield_multiplier: float
     revenue_multiplier: float
@@ -225,6 +241,7 @@ class MissionModel(BaseModel):
     mission_cost: Optional[Int64] = Int64(0)
     mission_projection: Optional[int] = 0
     completed_at: Optional[datetime] = None
+    archived: Optional[bool] = False
 
     @validator("id", "user_id", pre=True)
     def convert_object_id(cls, v):
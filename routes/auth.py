@@ -2,12 +2,15 @@ import logging
 from fastapi import APIRouter, Depends, HTTPException, Request, status, Form, Response
 from fastapi.responses import HTMLResponse, RedirectResponse
 from fastapi.templating import Jinja2Templates
+from starlette.concurrency import run_in_threadpool
 from bson import ObjectId
 from datetime import datetime, UTC
 from config import MongoDBConfig
 from utils.auth import create_access_token, get_current_user, get_optional_user, record_login_attempt, check_login_attempts, validate_alphanumeric, pwd_context
-from models.models import User, UserCreate, UserUpdate, PyInt64, AsteroidModel, ElementModel
+from models.models import User, UserCreate, UserUpdate, PyInt64, AsteroidModel
 from amos.mine_asteroid import fetch_market_prices
+from amos.dashboard import load_dashboard
+from amos.element_catalog import element_catalog
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
@@ -17,58 +20,24 @@ login_attempts_collection = db["login_attempts"]
 
 @router.get("/", response_class=HTMLResponse)
 async def get_index(request: Request, show_register: bool = False, error: str = None, travel_days: int = None, search_mode: str = "known", current_user: User = Depends(get_optional_user)):
-    from utils.helpers import get_random_asteroids
-    # Fetch active missions for display
-    missions = list(db.missions.find({"user_id": current_user.id, "status": 0})) if current_user else []
-    
-    # Fetch recent events for active missions and calculate estimated value
-    recent_events = []
-    if current_user:
-        # Fetch market prices for value calculation
-        prices = fetch_market_prices()
-        
-        for mission in missions:
-            # Calculate estimated value of mined elements
-            elements_mined = mission.get("elements_mined", {})
-            estimated_value = 0
-            for element_name, mass_kg in elements_mined.items():
-                price_per_kg = prices.get(element_name, 0)
-                estimated_value += mass_kg * price_per_kg
-            mission["estimated_value"] = estimated_value
-            
-            for summary in mission.get("daily_summaries", [])[-5:]:  # Last 5 days per mission
-                recent_events.append({
-                    "mission_name": mission["name"],
-                    "day": summary["day"],
-                    "elements_mined": summary.get("elements_mined", {}),
-                    "event": summary.get("event", "Mining in progress")
-                })
-        recent_events.sort(key=lambda x: x["day"], reverse=True)  # Newest first
-    
-    # Fetch asteroids based on search_mode
-    asteroids = []
+    from amos.mission_planner import plan_missions
+    missions, asteroids, available_ships, recent_events = [], [], [], []
     if current_user:
+        dashboard = load_dashboard(current_user.id, fetch_market_prices(), known_asteroids=search_mode != "search")
+        missions, available_ships, recent_events = dashboard["missions"], dashboard["available_ships"], dashboard["recent_events"]
         if search_mode == "search":
             if travel_days:
-                raw_asteroids = get_random_asteroids(travel_days)
+                # Offer the best-ranked targets for the first idle ship (or a new ship) instead of a random sample
+                ship = available_ships[0] if available_ships else {}
+                ranked = await run_in_threadpool(plan_missions, travel_days, ship.get("mining_power", 500), ship.get("capacity", 50000), bool(ship.get("missions")), k=3)
+                order = {entry["full_name"]: i for i, entry in enumerate(ranked)}
+                raw_asteroids = sorted(db.asteroids.find({"full_name": {"$in": list(order)}}), key=lambda a: order[a["full_name"]])
                 asteroids = [AsteroidModel(**asteroid) for asteroid in raw_asteroids]
-            else:
-                asteroids = []
         else:
-            # Use known asteroids from ALL missions (active and completed)
-            all_missions = list(db.missions.find({"user_id": current_user.id}))
-            if all_missions:
-                asteroid_names = list(set(mission["asteroid_full_name"] for mission in all_missions))
-                raw_asteroids = list(db.asteroids.find({"full_name": {"$in": asteroid_names}}))
-                asteroids = [AsteroidModel(**asteroid) for asteroid in raw_asteroids]
-    
-    available_ships = list(db.ships.find({"user_id": current_user.id, "location": 0.0, "active": False, "destroyed": {"$ne": True}})) if current_user else []
+            # Known asteroids from ALL missions (active and completed)
+            asteroids = [AsteroidModel(**asteroid) for asteroid in dashboard["asteroids"]]
     has_ships = len(available_ships) > 0
-    
-    for mission in missions:
-        ship = db.ships.find_one({"name": mission["ship_name"], "user_id": current_user.id})
-        mission["ship_id"] = str(ship["_id"]) if ship else None
-    
+
     logging.info(f"User {current_user.username if current_user else 'Anonymous'}: Loaded {len(missions)} active missions, {len(asteroids)} asteroids, {len(available_ships)} available ships")
     return templates.TemplateResponse("index.html", {
         "request": request,
@@ -81,7 +50,7 @@ async def get_index(request: Request, show_register: bool = False, error: str =
         "travel_days": travel_days,
         "search_mode": search_mode,
         "has_ships": has_ships,
-        "recent_events": recent_events[:10]  # Limit to 10 events initially
+        "recent_events": recent_events
     })
 
 @router.post("/register", response_class=RedirectResponse)
@@ -224,8 +193,7 @@ async def get_asteroid_details(request: Request, asteroid_id: str, user: User =
 async def get_element_details(request: Request, element_name: str, user: User = Depends(get_current_user)):
     if isinstance(user, RedirectResponse):
         return user
-    element = db.elements.find_one({"name": element_name})
+    element = element_catalog().element(element_name)
     if not element:
         raise HTTPException(status_code=404, detail="Element not found")
-    element = ElementModel(**element)
     return templates.TemplateResponse("element_details.html", {"request": request, "element": element, "user": user})
\ No newline at end of file
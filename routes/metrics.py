@@ -0,0 +1,9 @@
+from fastapi import APIRouter
+from fastapi.responses import Response
+from utils.metrics import CONTENT_TYPE, render_metrics
+
+router = APIRouter()
+
+@router.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    return Response(render_metrics(), media_type=CONTENT_TYPE)
@@ -1,23 +1,39 @@
 import logging
-from fastapi import APIRouter, Depends, HTTPException, Request, status, Form, Response
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, status, Form, Response
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from bson import ObjectId
 from datetime import datetime, UTC
 from config import MongoDBConfig
-from amos.manage_mission import process_single_mission, mine_asteroid
+from amos.manage_mission import mine_asteroid, settle_mission_result
+from amos.mission_concurrency import LEASE_TTL_SECONDS, user_lease
+from amos.job_queue import enqueue_job, find_open_job, get_job, job_status
+from amos.mission_jobs import COMPLETE_MISSIONS_JOB
+from amos.sim_rng import new_mission_seed
+from amos.mission_numbers import next_mission_name
+from amos.what_if import simulate_what_if
+from amos.mission_planner import plan_missions
+from amos.fleet_assignment import launch_fleet
+from amos.mission_archive import HOT_PROJECTION, load_mission_detail
+from amos.day_series import day_count, summary_dicts
+from amos.event_feed import events_after
+from amos.mission_export import EXPORT_FORMATS, export_history
 from amos.mine_asteroid import calculate_confidence, HOURS_PER_DAY
 from utils.auth import get_current_user
-from models.models import MissionModel, PyInt64, User
+from models.models import FleetLaunch, MissionModel, MissionSimulation, PyInt64, User
+from starlette.concurrency import run_in_threadpool
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 from amos.manage_mission import get_elements_mined, get_daily_value
-from typing import Optional
+from typing import List, Optional
 
 router = APIRouter()
 templates = Jinja2Templates(directory="templates")
 db = MongoDBConfig.get_database()
 
+MAX_ADVANCE_DAYS = 30
+MAX_PLAN_RESULTS = 100
+
 @router.post("/missions/start", response_class=RedirectResponse)
 async def start_mission(
     asteroid_full_name: str = Form(...),
@@ -51,18 +67,7 @@ async def start_mission(
         logging.error(f"User {user.username}: No asteroid found with full_name {asteroid_full_name}")
         return RedirectResponse(url=f"/?travel_days={travel_days}&error=No asteroid found with name {asteroid_full_name}", status_code=status.HTTP_303_SEE_OTHER)
     
-    # Determine the mission number by checking existing missions for this asteroid
-    existing_missions = list(db.missions.find({"user_id": user.id, "asteroid_full_name": asteroid_full_name}))
-    mission_number = 1
-    for mission in existing_missions:
-        name_parts = mission["name"].split("Mission")
-        if len(name_parts) > 1:
-            try:
-                number = int(name_parts[-1].strip())
-                mission_number = max(mission_number, number + 1)
-            except ValueError:
-                continue
-    mission_name = f"{asteroid_full_name} Mission {mission_number}"
+    mission_name = next_mission_name(user.id, asteroid_full_name)
 
     # Set the ship to active (engaged in a mission)
     update_result = db.ships.update_one(
@@ -147,7 +152,9 @@ async def start_mission(
         "mission_cost": PyInt64(0),
         "mission_projection": mission_projection,
         "confidence": confidence,
-        "completed_at": None
+        "completed_at": None,
+        "version": 0,
+        "seed": new_mission_seed()
     }
     result = db.missions.insert_one(mission_data)
     mission_id = str(result.inserted_id)
@@ -158,28 +165,17 @@ async def start_mission(
     return RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.get("/missions/active_updates", response_class=JSONResponse)
-async def get_active_updates(last_day: int = 0, user: User = Depends(get_current_user)):
+async def get_active_updates(after_seq: int = 0, user: User = Depends(get_current_user)):
     if isinstance(user, RedirectResponse):
         return user
-    active_missions = list(db.missions.find({"user_id": user.id, "status": 0}))
-    new_events = []
-    for mission in active_missions:
-        for summary in mission.get("daily_summaries", []):
-            if summary["day"] > last_day:
-                new_events.append({
-                    "mission_name": mission["name"],
-                    "day": summary["day"],
-                    "elements_mined": summary.get("elements_mined", {}),
-                    "event": summary.get("event", "Mining in progress")
-                })
-    return {"events": new_events}
+    return {"events": events_after(user.id, after_seq)}
 
 @router.get("/missions", response_class=HTMLResponse)
-async def get_missions(request: Request, user: User = Depends(get_current_user), message: str = None, error: str = None):
+async def get_missions(request: Request, user: User = Depends(get_current_user), message: str = None, error: str = None, job_id: str = None):
     if isinstance(user, RedirectResponse):
         return user
     # Fetch completed and failed missions
-    missions_data = list(db.missions.find({"user_id": user.id, "status": {"$in": [1, 2]}}))
+    missions_data = list(db.missions.find({"user_id": user.id, "status": {"$in": [1, 2]}}, HOT_PROJECTION))
     missions = []
     
     # Process each mission
@@ -204,7 +200,7 @@ async def get_missions(request: Request, user: User = Depends(get_current_user),
     for i, mission in enumerate(missions):
         logging.info(f"Mission {i+1}: {mission['name']}, completed_at: {mission.get('completed_at')}")
     
-    return templates.TemplateResponse("missions.html", {"request": request, "missions": missions, "user": user, "message": message, "error": error})
+    return templates.TemplateResponse("missions.html", {"request": request, "missions": missions, "user": user, "message": message, "error": error, "job_id": job_id})
 
 def generate_summary(mission):
     name = mission["name"][:20].ljust(20)
@@ -220,151 +216,133 @@ def generate_summary(mission):
     return summary
 
 @router.post("/missions/advance", response_class=RedirectResponse)
-async def advance_all_missions(user: User = Depends(get_current_user)):
+async def advance_all_missions(request: Request, days: int = 1, user: User = Depends(get_current_user)):
     if isinstance(user, RedirectResponse):
         return user
+    wants_json = "application/json" in request.headers.get("accept", "")
+    if days < 1 or days > MAX_ADVANCE_DAYS:
+        if wants_json:
+            raise HTTPException(status_code=400, detail=f"days must be between 1 and {MAX_ADVANCE_DAYS}")
+        return RedirectResponse(url=f"/?error=You can advance between 1 and {MAX_ADVANCE_DAYS} days at a time", status_code=status.HTTP_303_SEE_OTHER)
     active_missions = list(db.missions.find({"user_id": user.id, "status": 0}))
     if not active_missions:
         logging.info(f"User {user.username}: No active missions to advance")
+        if wants_json:
+            return JSONResponse({"days": days, "missions": {}, "message": "No active missions to advance"})
         return RedirectResponse(url="/?message=No active missions to advance", status_code=status.HTTP_303_SEE_OTHER)
-    next_day = max([len(m.get("daily_summaries", [])) for m in active_missions], default=0) + 1
-    logging.info(f"User {user.username}: Advancing day {next_day} for {len(active_missions)} active missions")
-    result = mine_asteroid(user.id, day=next_day, username=user.username, company_name=user.company_name)
+    next_day = max([day_count(m) for m in active_missions], default=0) + 1
+    logging.info(f"User {user.username}: Advancing days {next_day}-{next_day + days - 1} for {len(active_missions)} active missions")
+    # The batch runs without renewing the lease, so it gets one lease period per simulated day
+    with user_lease(user.id, ttl_seconds=LEASE_TTL_SECONDS * days) as lease:
+        if not lease:
+            if wants_json:
+                raise HTTPException(status_code=409, detail="A simulation is already running for your company")
+            return RedirectResponse(url="/?error=A simulation is already running for your company, please try again shortly", status_code=status.HTTP_303_SEE_OTHER)
+        result = await run_in_threadpool(mine_asteroid, user.id, day=next_day, username=user.username, company_name=user.company_name, days=days)
     if "error" in result:
+        if wants_json:
+            raise HTTPException(status_code=503, detail=result["error"])
         return RedirectResponse(url=f"/?error={result['error']}", status_code=status.HTTP_303_SEE_OTHER)
 
     # Check if any missions completed or failed and update ships and user bank
     for mission_raw in active_missions:
         mission_id = str(mission_raw["_id"])
-        mission_result = result.get(mission_id, {})
-        if "status" in mission_result:
-            if mission_result["status"] == 1:  # Mission completed successfully
-                ship_id = mission_raw["ship_id"]
-                # Fetch the ship to log its current state
-                ship = db.ships.find_one({"_id": ObjectId(ship_id)})
-                if ship:
-                    logging.info(f"Before update - Ship {ship_id}: active={ship.get('active', 'unknown')}, location={ship.get('location', 'unknown')}")
-                else:
-                    logging.error(f"Ship {ship_id} not found for mission {mission_id}")
-                    continue
-                
-                # Update ship to set active=False and location=0.0
-                update_result = db.ships.update_one(
-                    {"_id": ObjectId(ship_id)},
-                    {"$set": {"active": False, "location": 0.0}}
-                )
-                logging.info(f"Updated ship {ship_id}: matched={update_result.matched_count}, modified={update_result.modified_count}")
-
-                # Fetch the ship again to confirm the update
-                ship_after = db.ships.find_one({"_id": ObjectId(ship_id)})
-                if ship_after:
-                    logging.info(f"After update - Ship {ship_id}: active={ship_after.get('active', 'unknown')}, location={ship_after.get('location', 'unknown')}")
-                else:
-                    logging.error(f"Ship {ship_id} not found after update for mission {mission_id}")
-
-                # Update user's bank with profits
-                profit = mission_result.get("profit", 0)
-                if profit > 0 and user.current_loan > 0:
-                    net_profit = max(0, profit - user.current_loan)
-                    db.users.update_one(
-                        {"_id": ObjectId(user.id)},
-                        {"$inc": {"bank": PyInt64(net_profit)}, "$set": {"current_loan": PyInt64(0)}}
-                    )
-                    logging.info(f"User {user.username}: Mission {mission_id} completed, profit ${profit:,}, repaid loan ${user.current_loan:,}, net to bank ${net_profit:,}")
-                elif profit > 0:
-                    db.users.update_one(
-                        {"_id": ObjectId(user.id)},
-                        {"$inc": {"bank": PyInt64(profit)}}
-                    )
-                    logging.info(f"User {user.username}: Mission {mission_id} completed, added profit ${profit:,} to bank")
-            elif mission_result["status"] == 2:  # Mission failed (e.g., ship destroyed)
-                logging.info(f"User {user.username}: Mission {mission_id} failed, no profits to distribute")
+        settle_mission_result(user, mission_id, mission_raw["ship_id"], result.get(mission_id, {}))
 
+    if wants_json:
+        return JSONResponse({
+            "days": days,
+            "first_day": next_day,
+            "missions": {
+                mission_id: {
+                    "status": mission_result.get("status"),
+                    "days_simulated": mission_result.get("days_simulated", 0),
+                    "days_into_mission": int(mission_result.get("days_into_mission", 0) or 0),
+                    "total_yield_kg": int(mission_result.get("total_yield_kg", 0) or 0),
+                    "profit": int(mission_result.get("profit", 0) or 0),
+                    "error": mission_result.get("error")
+                }
+                for mission_id, mission_result in result.items()
+            }
+        })
     return RedirectResponse(url="/", status_code=status.HTTP_303_SEE_OTHER)
 
 @router.post("/missions/complete", response_class=RedirectResponse)
-async def complete_all_missions(user: User = Depends(get_current_user)):
+async def complete_all_missions(request: Request, user: User = Depends(get_current_user)):
     if isinstance(user, RedirectResponse):
         return user
-    active_missions = list(db.missions.find({"user_id": user.id, "status": 0}))
-    if not active_missions:
+    wants_json = "application/json" in request.headers.get("accept", "")
+    active_count = db.missions.count_documents({"user_id": user.id, "status": 0})
+    if not active_count:
         logging.info(f"User {user.username}: No active missions to complete")
+        if wants_json:
+            return JSONResponse({"job_id": None, "message": "No active missions to complete"})
         return RedirectResponse(url="/missions?message=No active missions to complete", status_code=status.HTTP_303_SEE_OTHER)
-    
-    logging.info(f"User {user.username}: Running simulation to complete {len(active_missions)} active missions")
-    results = {}
-    for mission_raw in active_missions:
-        mission_id = str(mission_raw["_id"])
-        ship_id = mission_raw["ship_id"]
-        days_into_mission = len(mission_raw.get("daily_summaries", []))
-        while True:
-            days_into_mission += 1
-            result = process_single_mission(mission_raw, day=days_into_mission, username=user.username, company_name=user.company_name)
-            mission_raw = db.missions.find_one({"_id": ObjectId(mission_id)})
-            logging.info(f"Mission {mission_id} on day {days_into_mission}: status={result.get('status', 'unknown')}, ship_location={result.get('ship_location', 'unknown')}")
-            if "status" in result:
-                if result["status"] == 1:  # Mission completed successfully
-                    # Fetch the ship to log its current state
-                    ship = db.ships.find_one({"_id": ObjectId(ship_id)})
-                    if ship:
-                        logging.info(f"Before update - Ship {ship_id}: active={ship.get('active', 'unknown')}, location={ship.get('location', 'unknown')}")
-                    else:
-                        logging.error(f"Ship {ship_id} not found for mission {mission_id}")
-                        break
-                    
-                    # Update ship to set active=False and location=0.0
-                    update_result = db.ships.update_one(
-                        {"_id": ObjectId(ship_id)},
-                        {"$set": {"active": False, "location": 0.0}}
-                    )
-                    logging.info(f"Updated ship {ship_id}: matched={update_result.matched_count}, modified={update_result.modified_count}")
 
-                    # Fetch the ship again to confirm the update
-                    ship_after = db.ships.find_one({"_id": ObjectId(ship_id)})
-                    if ship_after:
-                        logging.info(f"After update - Ship {ship_id}: active={ship_after.get('active', 'unknown')}, location={ship_after.get('location', 'unknown')}")
-                    else:
-                        logging.error(f"Ship {ship_id} not found after update for mission {mission_id}")
+    # Reuse a completion job that is already queued or running for this user
+    open_job = find_open_job(COMPLETE_MISSIONS_JOB, user.id)
+    job_id = str(open_job["_id"]) if open_job else enqueue_job(COMPLETE_MISSIONS_JOB, user_id=user.id, progress={"missions_total": active_count})
+    logging.info(f"User {user.username}: Completion of {active_count} active missions queued as job {job_id}")
+    if wants_json:
+        return JSONResponse({"job_id": job_id, "status_url": f"/missions/jobs/{job_id}"}, status_code=status.HTTP_202_ACCEPTED)
+    return RedirectResponse(url=f"/missions?message=Completing {active_count} missions in the background&job_id={job_id}", status_code=status.HTTP_303_SEE_OTHER)
+
+@router.post("/missions/simulate", response_class=JSONResponse)
+async def simulate_mission(spec: MissionSimulation, user: User = Depends(get_current_user)):
+    if isinstance(user, RedirectResponse):
+        return user
+    ship = {"mining_power": spec.mining_power, "capacity": spec.capacity, "shield": spec.shield, "hull": spec.hull}
+    try:
+        result = await run_in_threadpool(simulate_what_if, spec.asteroid_full_name, spec.travel_days, ship, spec.runs, user.max_overrun_days)
+    except ValueError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    logging.info(f"User {user.username}: What-if for {spec.asteroid_full_name} ({spec.travel_days} days): {result['runs_completed']} runs, cached={result['cached']}")
+    return result
+
+@router.get("/missions/plan", response_class=JSONResponse)
+async def plan_mission(travel_days: int, ship_name: str = None, k: int = 10, user: User = Depends(get_current_user)):
+    if isinstance(user, RedirectResponse):
+        return user
+    ship = db.ships.find_one({"user_id": user.id, "name": ship_name}, {"mining_power": 1, "capacity": 1, "missions": 1}) if ship_name else None
+    if ship_name and not ship:
+        raise HTTPException(status_code=404, detail=f"Ship {ship_name} not found")
+    mining_power = ship["mining_power"] if ship else 500
+    capacity = ship["capacity"] if ship else 50000
+    ranked = await run_in_threadpool(plan_missions, travel_days, mining_power, capacity, bool(ship and ship.get("missions")), max(1, min(k, MAX_PLAN_RESULTS)))
+    return {"travel_days": travel_days, "mining_power": mining_power, "capacity": capacity, "asteroids": ranked}
 
-                    profit = result.get("profit", 0)
-                    if profit > 0 and user.current_loan > 0:
-                        net_profit = max(0, profit - user.current_loan)
-                        db.users.update_one(
-                            {"_id": ObjectId(user.id)},
-                            {"$inc": {"bank": PyInt64(net_profit)}, "$set": {"current_loan": PyInt64(0)}}
-                        )
-                        logging.info(f"User {user.username}: Mission {mission_id} completed, profit ${profit:,}, repaid loan ${user.current_loan:,}, net to bank ${net_profit:,}")
-                    elif profit > 0:
-                        db.users.update_one(
-                            {"_id": ObjectId(user.id)},
-                            {"$inc": {"bank": PyInt64(profit)}}
-                        )
-                        logging.info(f"User {user.username}: Mission {mission_id} completed, added profit ${profit:,} to bank")
-                elif result["status"] == 2:  # Mission failed (e.g., ship destroyed)
-                    logging.info(f"User {user.username}: Mission {mission_id} failed, no profits to distribute")
-                results[mission_id] = result
-                break
-            results[mission_id] = result
+@router.post("/missions/launch", response_class=JSONResponse)
+async def launch_missions(spec: FleetLaunch, user: User = Depends(get_current_user)):
+    if isinstance(user, RedirectResponse):
+        return user
+    logging.info(f"User {user.username}: Launching fleet, travel_days {spec.travel_days}, ships {spec.ship_names or 'all idle'}")
+    result = await run_in_threadpool(launch_fleet, user, spec.travel_days, spec.ship_names, spec.asteroid_full_names, spec.max_budget, spec.max_loans)
+    if "error" in result:
+        raise HTTPException(status_code=400, detail=result["error"])
+    return result
 
-        # Double-check the mission status in the database and ensure ship is updated
-        final_mission = db.missions.find_one({"_id": ObjectId(mission_id)})
-        if final_mission and final_mission.get("status") == 1:
-            ship_final = db.ships.find_one({"_id": ObjectId(ship_id)})
-            if ship_final and ship_final.get("active", True):
-                logging.warning(f"Ship {ship_id} still active after mission {mission_id} completion, forcing update")
-                update_result = db.ships.update_one(
-                    {"_id": ObjectId(ship_id)},
-                    {"$set": {"active": False, "location": 0.0}}
-                )
-                logging.info(f"Forced update for ship {ship_id}: matched={update_result.matched_count}, modified={update_result.modified_count}")
-                # Log the final state after forced update
-                ship_final_after = db.ships.find_one({"_id": ObjectId(ship_id)})
-                if ship_final_after:
-                    logging.info(f"After forced update - Ship {ship_id}: active={ship_final_after.get('active', 'unknown')}, location={ship_final_after.get('location', 'unknown')}")
+@router.get("/missions/export/{kind}", response_class=StreamingResponse)
+async def export_missions(kind: str, format: str = "ndjson", status: Optional[List[int]] = Query(None), ship_name: str = None, user: User = Depends(get_current_user)):
+    if isinstance(user, RedirectResponse):
+        return user
+    try:
+        chunks = export_history(user.id, kind, format, status, ship_name)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    logging.info(f"User {user.username}: Exporting {kind} as {format}")
+    # A sync iterator is drained in the threadpool one chunk per send, so the cursor only advances as fast as the client reads
+    return StreamingResponse(chunks, media_type=EXPORT_FORMATS[format], headers={"Content-Disposition": f'attachment; filename="{kind}.{format}"'})
 
-    if "error" in results.get(list(results.keys())[0], {}):
-        return RedirectResponse(url=f"/missions?error={results[list(results.keys())[0]]['error']}", status_code=status.HTTP_303_SEE_OTHER)
-    return RedirectResponse(url="/missions", status_code=status.HTTP_303_SEE_OTHER)
+@router.get("/missions/jobs/{job_id}", response_class=JSONResponse)
+async def get_job_progress(job_id: str, user: User = Depends(get_current_user)):
+    if isinstance(user, RedirectResponse):
+        return user
+    if not ObjectId.is_valid(job_id):
+        raise HTTPException(status_code=404, detail="Job not found")
+    job = get_job(job_id, user.id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job_status(job)
 
 @router.get("/missions/{mission_id}", response_class=HTMLResponse)
 async def get_mission_details(request: Request, mission_id: str, user: User = Depends(get_current_user)):
@@ -373,7 +351,8 @@ async def get_mission_details(request: Request, mission_id: str, user: User = De
     mission_dict = db.missions.find_one({"_id": ObjectId(mission_id), "user_id": user.id})
     if not mission_dict:
         raise HTTPException(status_code=404, detail="Mission not found")
-    mission = MissionModel(**mission_dict)
+    mission_dict = load_mission_detail(mission_dict)
+    mission = MissionModel(**{**mission_dict, "daily_summaries": summary_dicts(mission_dict)})
     ship = db.ships.find_one({"name": mission.ship_name, "user_id": user.id})
     ship_id = str(ship["_id"]) if ship else None
 
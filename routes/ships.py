@@ -6,6 +6,10 @@ from bson import ObjectId
 from config import MongoDBConfig
 from amos.manage_mission import create_new_ship, get_elements_mined, get_daily_value
 from amos.mine_asteroid import calculate_confidence, HOURS_PER_DAY
+from amos.sim_rng import new_mission_seed
+from amos.mission_numbers import next_mission_name
+from amos.mission_archive import load_mission_details
+from amos.day_series import mission_days
 from utils.auth import get_current_user, validate_alphanumeric
 from models.models import User, PyInt64
 import plotly.graph_objects as go
@@ -43,17 +47,7 @@ async def create_ship(
         logging.error(f"User {user.username}: No asteroid found with full_name {asteroid_full_name}")
         return RedirectResponse(url=f"/?travel_days={travel_days}&error=No asteroid found with name {asteroid_full_name}", status_code=status.HTTP_303_SEE_OTHER)
 
-    existing_missions = list(db.missions.find({"user_id": user.id, "asteroid_full_name": asteroid_full_name}))
-    mission_number = 1
-    for mission in existing_missions:
-        name_parts = mission["name"].split("Mission")
-        if len(name_parts) > 1:
-            try:
-                number = int(name_parts[-1].strip())
-                mission_number = max(mission_number, number + 1)
-            except ValueError:
-                continue
-    mission_name = f"{asteroid_full_name} Mission {mission_number}"
+    mission_name = next_mission_name(user.id, asteroid_full_name)
 
     db.ships.update_one({"_id": ObjectId(ship_id)}, {"$set": {"active": True}})
     mining_power = ship.mining_power
@@ -118,7 +112,9 @@ async def create_ship(
         "mission_cost": PyInt64(0),
         "mission_projection": mission_projection,
         "confidence": confidence,
-        "completed_at": None
+        "completed_at": None,
+        "version": 0,
+        "seed": new_mission_seed()
     }
     result = db.missions.insert_one(mission_data)
     mission_id = str(result.inserted_id)
@@ -137,10 +133,10 @@ async def get_ship_details(request: Request, ship_id: str, user: User = Depends(
     if not ship:
         raise HTTPException(status_code=404, detail="Ship not found")
     
-    missions = list(db.missions.find({"ship_name": ship["name"], "user_id": user.id}))
+    missions = load_mission_details(db.missions.find({"ship_name": ship["name"], "user_id": user.id}, {"graph_html": 0}))
     daily_yields = {}
     for mission in missions:
-        for summary in mission.get("daily_summaries", []):
+        for summary in mission_days(mission):
             day = summary["day"]
             elements = get_elements_mined(summary) or {}
             daily_yields[day] = daily_yields.get(day, {})
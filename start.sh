@@ -1,6 +1,10 @@
 #!/bin/bash
 # filepath: /home/fullaware/projects/beryl/start.sh
 
+# Metrics of a previous run would otherwise be summed into this one's
+export METRICS_DIR="${METRICS_DIR:-/tmp/amos-metrics}"
+rm -rf "$METRICS_DIR"
+
 # Run with Uvicorn (perfect for FastAPI)
 uvicorn app:app --host 0.0.0.0 --port 8000 --reload
 
@@ -1,13 +1,19 @@
 import logging
-import random
+import pymongo
 from config import MongoDBConfig
 
 db = MongoDBConfig.get_database()
 
-def get_random_asteroids(travel_days: int, limit: int = 3) -> list[dict]:
-    logging.info(f"Fetching asteroids with moid_days = {travel_days}")
-    matching_asteroids = list(db.asteroids.find({"moid_days": travel_days}))
-    if not matching_asteroids:
-        logging.warning(f"No asteroids found with moid_days = {travel_days}")
-        return []
-    return random.sample(matching_asteroids, min(limit, len(matching_asteroids)))
\ No newline at end of file
+def ensure_time_series(name: str, meta_field: str, granularity: str = "hours"):
+    """
+    Create `name` as a time-series collection on "timestamp" with `meta_field` as its metadata, indexed by
+    metadata then time. Servers without time-series support get a plain collection with the same index.
+    """
+    if name not in db.list_collection_names():
+        try:
+            db.create_collection(name, timeseries={"timeField": "timestamp", "metaField": meta_field, "granularity": granularity})
+        except pymongo.errors.CollectionInvalid:
+            pass  # Created by another process meanwhile
+        except pymongo.errors.OperationFailure as e:
+            logging.warning(f"Time-series collections unavailable, storing {name} in a plain collection: {e}")
+    db[name].create_index([(meta_field, pymongo.ASCENDING), ("timestamp", pymongo.DESCENDING)])
@@ -0,0 +1,266 @@
+"""
+Metrics in the Prometheus text format, served on /metrics.
+
+Counters and histograms are plain dicts of per-label-set values behind one lock each, so recording
+is a dict lookup and an add. uvicorn runs several worker processes behind one port and a scrape lands
+on any of them, so every process writes a snapshot of its cumulative values to its own file in
+METRICS_DIR (on a timer and before each scrape), and a scrape sums the files of all processes.
+A scrape folds the files of exited workers into one, so totals survive worker restarts and reloads without
+the directory growing. The launch scripts empty METRICS_DIR, so a server restart starts from zero.
+"""
+import fcntl
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Dict, List, Tuple
+from pymongo import monitoring
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+METRICS_DIR = os.getenv("METRICS_DIR", os.path.join(tempfile.gettempdir(), "amos-metrics"))
+METRICS_FLUSH_SECONDS = 5.0
+
+_metrics: List["Metric"] = []
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _label_text(names: Tuple[str, ...], values: Tuple[str, ...], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def snapshot(self) -> list:
+        with self._lock:
+            return [[list(labels), self._copy(value)] for labels, value in self._values.items()]
+
+    def _copy(self, value):
+        return value
+
+    def merge(self, merged: dict, snapshot: list):
+        raise NotImplementedError
+
+    def samples(self, values: dict) -> List[str]:
+        raise NotImplementedError
+
+    def render(self, values: dict) -> str:
+        return "\n".join([f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}", *self.samples(values)])
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def merge(self, merged: dict, snapshot: list):
+        for labels, value in snapshot:
+            merged[tuple(labels)] = merged.get(tuple(labels), 0) + value
+
+    def samples(self, values: dict) -> List[str]:
+        return [f"{self.name}{_label_text(self.labels, labels)} {value}" for labels, value in values.items()]
+
+class Histogram(Metric):
+    """
+    Cumulative-bucket histogram. Per label set it keeps one count per bucket (plus +Inf), the sum and the count.
+    """
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Tuple[str, ...] = (), buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values: Dict[Tuple[str, ...], list] = {}
+
+    def observe(self, value: float, *labels: str):
+        bucket = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = self._values[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][bucket] += 1
+            state[1] += value
+
+    @contextmanager
+    def time(self, *labels: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def _copy(self, value):
+        return [list(value[0]), value[1]]
+
+    def merge(self, merged: dict, snapshot: list):
+        for labels, (counts, total) in snapshot:
+            state = merged.get(tuple(labels))
+            if state is None:
+                merged[tuple(labels)] = [list(counts), total]
+                continue
+            state[0] = [a + b for a, b in zip(state[0], counts)]
+            state[1] += total
+
+    def samples(self, values: dict) -> List[str]:
+        lines = []
+        for labels, (counts, total) in values.items():
+            cumulative = 0
+            for bound, count in zip((*self.buckets, "+Inf"), counts):
+                cumulative += count
+                bucket_labels = _label_text(self.labels, labels, 'le="' + str(bound) + '"')
+                lines.append(f"{self.name}_bucket{bucket_labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_label_text(self.labels, labels)} {total}")
+            lines.append(f"{self.name}_count{_label_text(self.labels, labels)} {cumulative}")
+        return lines
+
+_process_file = {}
+_flush_lock = threading.Lock()
+
+def process_metrics_file() -> str:
+    # Keyed by pid so a forked worker does not overwrite its parent's file
+    pid = os.getpid()
+    if pid not in _process_file:
+        _process_file[pid] = os.path.join(METRICS_DIR, f"{pid}-{uuid.uuid4().hex[:8]}.json")
+    return _process_file[pid]
+
+def flush_metrics():
+    """
+    Write this process's cumulative values to its file, atomically so a concurrent scrape never reads half of it.
+    """
+    path = process_metrics_file()
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    snapshot = {metric.name: metric.snapshot() for metric in _metrics}
+    with _flush_lock:
+        with open(path + ".tmp", "w") as f:
+            json.dump(snapshot, f)
+        os.replace(path + ".tmp", path)
+
+EXITED_FILE = "exited.json"
+
+def _pid_alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def _file_pid(filename: str):
+    head = filename.split("-", 1)[0]
+    return int(head) if head.isdigit() else None
+
+@contextmanager
+def _directory_lock(exclusive: bool):
+    # Folding rewrites exited.json and deletes files, so readers and folders across processes take this lock
+    with open(os.path.join(METRICS_DIR, ".lock"), "a") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX if exclusive else fcntl.LOCK_SH)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+def _merge_files(filenames: List[str]) -> Dict[str, dict]:
+    merged = {metric.name: {} for metric in _metrics}
+    by_name = {metric.name: metric for metric in _metrics}
+    for filename in filenames:
+        try:
+            with open(os.path.join(METRICS_DIR, filename)) as f:
+                snapshot = json.load(f)
+        except FileNotFoundError:
+            continue
+        except (OSError, ValueError) as e:
+            logging.warning(f"Skipping unreadable metrics file {filename}: {e}")
+            continue
+        for name, values in snapshot.items():
+            if name in by_name:
+                by_name[name].merge(merged[name], values)
+    return merged
+
+def fold_exited_metrics() -> int:
+    """
+    Merge the files of worker processes that have exited into exited.json and delete them, so reloads and
+    restarted workers do not leave a growing pile of files. Returns the number of files folded.
+    """
+    with _directory_lock(exclusive=True):
+        exited = [
+            filename for filename in os.listdir(METRICS_DIR)
+            if filename.endswith(".json") and _file_pid(filename) is not None and not _pid_alive(_file_pid(filename))
+        ]
+        if not exited:
+            return 0
+        merged = _merge_files([EXITED_FILE, *exited])
+        path = os.path.join(METRICS_DIR, EXITED_FILE)
+        with open(path + ".tmp", "w") as f:
+            json.dump({name: [[list(labels), value] for labels, value in values.items()] for name, values in merged.items()}, f)
+        os.replace(path + ".tmp", path)
+        for filename in exited:
+            os.remove(os.path.join(METRICS_DIR, filename))
+    return len(exited)
+
+def render_metrics() -> str:
+    """
+    The sum over every process's latest snapshot, with this process's taken fresh, plus the folded totals of exited processes.
+    """
+    flush_metrics()
+    fold_exited_metrics()
+    with _directory_lock(exclusive=False):
+        merged = _merge_files([filename for filename in os.listdir(METRICS_DIR) if filename.endswith(".json")])
+    return "\n".join(metric.render(merged[metric.name]) for metric in _metrics) + "\n"
+
+def start_metrics_flusher(interval: float = METRICS_FLUSH_SECONDS) -> threading.Event:
+    """
+    Flush this process's metrics every `interval` seconds from a daemon thread; set the returned event to stop it.
+    """
+    stop = threading.Event()
+
+    def loop():
+        while not stop.wait(interval):
+            try:
+                flush_metrics()
+            except OSError as e:
+                logging.error(f"Failed to write metrics to {METRICS_DIR}: {e}")
+
+    threading.Thread(target=loop, name="metrics-flusher", daemon=True).start()
+    return stop
+
+REQUEST_LATENCY = Histogram("amos_http_request_duration_seconds", "HTTP request latency by route template, method and status.", ("method", "route", "status"))
+MISSION_PHASE_LATENCY = Histogram("amos_mission_phase_duration_seconds", "Time spent per phase of process_single_mission; simulate includes events and chart.", ("phase",))
+MONGO_COMMAND_LATENCY = Histogram("amos_mongo_command_duration_seconds", "MongoDB command round trips by command and outcome.", ("command", "outcome"))
+CACHE_REQUESTS = Counter("amos_cache_requests_total", "Cache lookups by cache and result (hit or miss).", ("cache", "result"))
+
+def record_cache(cache: str, hit: bool):
+    CACHE_REQUESTS.inc(cache, "hit" if hit else "miss")
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """
+    Times every command the driver sends from the durations pymongo already measures, so it adds no clock reads.
+    """
+    def started(self, event):
+        pass
+
+    def succeeded(self, event):
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1e6, event.command_name, "ok")
+
+    def failed(self, event):
+        MONGO_COMMAND_LATENCY.observe(event.duration_micros / 1e6, event.command_name, "error")